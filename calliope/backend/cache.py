@@ -0,0 +1,92 @@
+"""
+Copyright (C) since 2013 Calliope contributors listed in AUTHORS.
+Licensed under the Apache 2.0 License (see LICENSE file).
+
+cache.py
+~~~~~~~~
+
+On-disk cache of built backend models, so that a model with unchanged inputs
+can be run again (e.g. with a different solver) without regenerating its
+backend model.
+
+"""
+
+import hashlib
+import json
+import logging
+
+import numpy as np
+
+from calliope.core.util.cache import PickleCache
+
+logger = logging.getLogger(__name__)
+
+# Run configuration options which have no effect on the built backend model
+RUN_CONFIG_IGNORED = [
+    "backend_cache",
+    "results",
+    "save_logs",
+    "solver",
+    "solver_io",
+    "solver_options",
+    "zero_threshold",
+]
+
+
+def get_fingerprint(model_data, run_config):
+    """
+    Content hash of everything used to build a backend model from `model_data`:
+    the coordinates and input data variables, the `defaults` and `subsets`
+    attributes, and the run configuration options that affect the build.
+
+    Parameters
+    ----------
+    model_data : xarray.Dataset
+    run_config : AttrDict
+
+    Returns
+    -------
+    fingerprint : str
+
+    """
+    hasher = hashlib.sha256()
+
+    config = {k: v for k, v in run_config.items() if k not in RUN_CONFIG_IGNORED}
+    for attr in ["calliope_version", "defaults", "subsets"]:
+        config[attr] = model_data.attrs.get(attr, None)
+    hasher.update(json.dumps(config, sort_keys=True, default=str).encode())
+
+    for name, coord in sorted(model_data.coords.items()):
+        _update_hash(hasher, name, coord)
+    for name, var in sorted(model_data.data_vars.items()):
+        if var.attrs.get("is_result", 0) == 0 or var.attrs.get("operate_param", 0):
+            _update_hash(hasher, name, var)
+
+    return hasher.hexdigest()
+
+
+def _update_hash(hasher, name, array):
+    description = "{}:{}:{}:{}".format(name, array.dims, array.shape, array.dtype)
+    hasher.update(description.encode())
+    values = array.values
+    if values.dtype.kind == "O":
+        values = np.array([str(i) for i in values.ravel()], dtype=str)
+    hasher.update(np.ascontiguousarray(values).tobytes())
+
+
+class BackendModelCache(PickleCache):
+    """
+    Least recently used cache of pickled backend models in a directory.
+
+    Parameters
+    ----------
+    path : str
+        Directory in which to store backend models. Created if it does not exist.
+    max_size : float, optional
+        Maximum total size of the cached backend models, in bytes.
+        The least recently used backend models are removed to keep within it.
+
+    """
+
+    suffix = ".backend.pickle"
+    description = "backend model"
@@ -0,0 +1,168 @@
+"""
+Copyright (C) since 2013 Calliope contributors listed in AUTHORS.
+Licensed under the Apache 2.0 License (see LICENSE file).
+
+checkpoint.py
+~~~~~~~~~~~~~
+
+Checkpoints of operate mode runs, from which a run can be resumed after the
+last completed optimisation window.
+
+"""
+
+import glob
+import logging
+import os
+
+import xarray as xr
+
+from calliope import exceptions
+from calliope.backend.cache import get_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Model data which is updated at the end of each window, for use in the next
+CARRIED_OVER = ["storage_initial", "operated_units"]
+
+# Operation options which have no effect on the results of a run
+OPERATION_IGNORED = ["checkpoint", "results_path"]
+
+
+class OperateCheckpoint:
+    """
+    Checkpoints of an operate mode run, saved in a directory. Each checkpoint
+    holds the number of completed windows, the model data carried over to the
+    next window, and the results of the windows completed since the previous
+    checkpoint.
+
+    Parameters
+    ----------
+    path : str
+        Directory in which to save checkpoints. Created if it does not exist.
+    model_data : xarray.Dataset
+        Model data at the start of the run.
+    run_config : AttrDict
+        Run configuration of the run. Together with `model_data`, used to
+        ensure that a run is only resumed from its own checkpoints.
+
+    """
+
+    state_filename = "state.nc"
+
+    def __init__(self, path, model_data, run_config):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        run_config = run_config.copy()
+        run_config["operation"] = {
+            k: v
+            for k, v in run_config["operation"].items()
+            if k not in OPERATION_IGNORED
+        }
+        self.fingerprint = get_fingerprint(model_data, run_config)
+
+    def _get_results_filenames(self):
+        return sorted(glob.glob(os.path.join(self.path, "results_*.nc")))
+
+    def clear(self):
+        """
+        Remove all checkpoints, e.g. those of a previous run.
+        """
+        for filename in self._get_results_filenames() + [
+            os.path.join(self.path, self.state_filename)
+        ]:
+            if os.path.exists(filename):
+                os.remove(filename)
+
+    def save(self, window, model_data, terminations, results=None, num_timesteps=0):
+        """
+        Save a checkpoint after `window` windows have been completed.
+
+        Parameters
+        ----------
+        window : int
+            Number of completed windows.
+        model_data : xarray.Dataset
+            Model data, including the values carried over to the next window.
+        terminations : list of str
+            Termination conditions of all completed windows.
+        results : list of xarray.Dataset, optional
+            Results of the windows completed since the previous checkpoint.
+        num_timesteps : int, optional
+            Number of timesteps of results written to `run.operation.results_path`,
+            if results are written to file as the run progresses.
+
+        """
+        # Results are saved first, so that the state never refers to missing
+        # results if the run is stopped in between
+        if results:
+            _save(
+                xr.concat(results, dim="timesteps"),
+                os.path.join(self.path, "results_{:06d}.nc".format(window)),
+            )
+
+        state = xr.Dataset({k: model_data[k] for k in CARRIED_OVER if k in model_data})
+        state.attrs = {
+            "fingerprint": self.fingerprint,
+            "window": window,
+            "terminations": ",".join(terminations),
+            "num_timesteps": num_timesteps,
+        }
+        _save(state, os.path.join(self.path, self.state_filename))
+        logger.debug("Saved operate mode checkpoint after window {}".format(window))
+
+    def load(self):
+        """
+        Load the last checkpoint, or return None if there is none.
+
+        Returns
+        -------
+        checkpoint : dict or None
+            With keys `window` (number of completed windows), `carried_over`
+            (xarray Dataset of model data to carry over to the next window),
+            `terminations`, `num_timesteps` and `results` (list of xarray
+            Datasets of the results of the completed windows, if they were
+            not written to `run.operation.results_path`).
+
+        """
+        state_filename = os.path.join(self.path, self.state_filename)
+        if not os.path.exists(state_filename):
+            return None
+        with xr.open_dataset(state_filename) as state:
+            state.load()
+
+        if state.attrs["fingerprint"] != self.fingerprint:
+            raise exceptions.ModelError(
+                "Cannot resume from the checkpoint in `{}`, as it was saved by a "
+                "run with different model data or run configuration.".format(self.path)
+            )
+
+        window = int(state.attrs["window"])
+        results = []
+        for filename in self._get_results_filenames():
+            # Later results are from a checkpoint whose state was not saved,
+            # so their windows will be run again
+            if int(os.path.basename(filename)[8:-3]) <= window:
+                with xr.open_dataset(filename) as _results:
+                    results.append(_results.load())
+
+        return {
+            "window": window,
+            "carried_over": state,
+            "terminations": [i for i in state.attrs["terminations"].split(",") if i],
+            "num_timesteps": int(state.attrs["num_timesteps"]),
+            "results": results,
+        }
+
+
+def _save(dataset, filename):
+    dataset = dataset.copy()
+    for var in dataset.variables.values():
+        var.attrs = {
+            k: int(v) if isinstance(v, bool) else "None" if v is None else v
+            for k, v in var.attrs.items()
+        }
+    # Replacing the file in one step means that a checkpoint is never
+    # partially written
+    tmp_filename = filename + ".tmp"
+    dataset.to_netcdf(tmp_filename)
+    os.replace(tmp_filename, filename)
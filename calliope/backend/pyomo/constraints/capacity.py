@@ -9,41 +9,46 @@ Capacity constraints for technologies (output, resource, area, and storage).
 
 """
 
+import functools
+
 import pyomo.core as po
 
-from calliope.backend.pyomo.util import get_param, invalid
+from calliope.backend.pyomo.util import get_param, get_valid_members, invalid
 
 
 def get_capacity_bounds(bounds):
-    def _get_bounds(backend_model, *idx):
-        def _get_bound(bound):
-            if bounds.get(bound) is not None:
-                return get_param(backend_model, bounds.get(bound), idx)
-            else:
-                return None
-
-        scale = _get_bound("scale")
-        _equals = _get_bound("equals")
-        _min = _get_bound("min")
-        _max = _get_bound("max")
-
-        if not invalid(_equals):
-            if not invalid(scale):
-                _equals *= scale
-            bound_tuple = (_equals, _equals)
+    # A partial function rather than a closure, so that the bounds rule (and
+    # hence the whole backend model) can be pickled
+    return functools.partial(_get_capacity_bounds, bounds)
+
+
+def _get_capacity_bounds(bounds, backend_model, *idx):
+    def _get_bound(bound):
+        if bounds.get(bound) is not None:
+            return get_param(backend_model, bounds.get(bound), idx)
         else:
-            if invalid(_min):
-                _min = None
-            if invalid(_max):
-                _max = None
-            bound_tuple = (_min, _max)
+            return None
 
+    scale = _get_bound("scale")
+    _equals = _get_bound("equals")
+    _min = _get_bound("min")
+    _max = _get_bound("max")
+
+    if not invalid(_equals):
         if not invalid(scale):
-            bound_tuple = tuple(i * scale for i in bound_tuple)
+            _equals *= scale
+        bound_tuple = (_equals, _equals)
+    else:
+        if invalid(_min):
+            _min = None
+        if invalid(_max):
+            _max = None
+        bound_tuple = (_min, _max)
 
-        return bound_tuple
+    if not invalid(scale):
+        bound_tuple = tuple(i * scale for i in bound_tuple)
 
-    return _get_bounds
+    return bound_tuple
 
 
 def energy_capacity_per_storage_capacity_min_constraint_rule(backend_model, node, tech):
@@ -176,8 +181,9 @@ def resource_area_capacity_per_loc_constraint_rule(backend_model, node):
     return (
         po.quicksum(
             backend_model.resource_area[node, tech]
-            for tech in backend_model.techs
-            if [node, tech] in backend_model.resource_area.index_set()
+            for tech in get_valid_members(
+                backend_model, "resource_area", "techs", (node,)
+            )
         )
         <= available_area
     )
@@ -209,8 +215,7 @@ def energy_capacity_systemwide_constraint_rule(backend_model, tech):
     equals_systemwide = get_param(backend_model, "energy_cap_equals_systemwide", tech)
     energy_cap = po.quicksum(
         backend_model.energy_cap[node, tech]
-        for node in backend_model.nodes
-        if [node, tech] in backend_model.energy_cap.index_set()
+        for node in get_valid_members(backend_model, "energy_cap", "nodes", (tech,))
     )
     if not invalid(equals_systemwide):
         return energy_cap == equals_systemwide
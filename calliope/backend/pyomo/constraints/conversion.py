@@ -9,7 +9,7 @@ Conversion technology constraints.
 
 """
 
-from calliope.backend.pyomo.util import get_param
+from calliope.backend.pyomo.util import get_param, get_valid_members
 
 
 def balance_conversion_constraint_rule(backend_model, node, tech, timestep):
@@ -28,8 +28,12 @@ def balance_conversion_constraint_rule(backend_model, node, tech, timestep):
             \\forall timestep \\in timesteps
     """
 
-    carrier_out = backend_model.carrier["out", :, tech].index()[0][1]
-    carrier_in = backend_model.carrier["in", :, tech].index()[0][1]
+    carrier_out = get_valid_members(
+        backend_model, "carrier", "carriers", ("out", tech)
+    )[0]
+    carrier_in = get_valid_members(backend_model, "carrier", "carriers", ("in", tech))[
+        0
+    ]
 
     energy_eff = get_param(backend_model, "energy_eff", (node, tech, timestep))
 
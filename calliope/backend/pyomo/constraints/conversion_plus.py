@@ -14,6 +14,7 @@ import pyomo.core as po
 from calliope.backend.pyomo.util import (
     get_param,
     get_conversion_plus_io,
+    get_valid_members,
 )
 
 
@@ -36,14 +37,15 @@ def balance_conversion_plus_primary_constraint_rule(
             \\quad \\forall loc::tech \\in loc::techs_{conversion^{+}}, \\forall timestep \\in timesteps
     """
 
-    carriers_out = backend_model.carrier["out", :, tech].index()
-    carriers_in = backend_model.carrier["in", :, tech].index()
+    carriers_out = get_valid_members(
+        backend_model, "carrier", "carriers", ("out", tech)
+    )
+    carriers_in = get_valid_members(backend_model, "carrier", "carriers", ("in", tech))
 
     energy_eff = get_param(backend_model, "energy_eff", (node, tech, timestep))
 
     carrier_prod = []
-    for idx in carriers_out:
-        carrier = idx[1]
+    for carrier in carriers_out:
         carrier_ratio = get_param(
             backend_model, "carrier_ratios", ("out", carrier, node, tech, timestep)
         )
@@ -54,11 +56,11 @@ def balance_conversion_plus_primary_constraint_rule(
             )
 
     carrier_con = po.quicksum(
-        backend_model.carrier_con[idx[1], node, tech, timestep]
+        backend_model.carrier_con[carrier, node, tech, timestep]
         * get_param(
-            backend_model, "carrier_ratios", ("in", idx[1], node, tech, timestep)
+            backend_model, "carrier_ratios", ("in", carrier, node, tech, timestep)
         )
-        for idx in carriers_in
+        for carrier in carriers_in
     )
 
     return po.quicksum(carrier_prod) == -1 * carrier_con * energy_eff
@@ -82,10 +84,13 @@ def carrier_production_max_conversion_plus_constraint_rule(
     """
 
     timestep_resolution = backend_model.timestep_resolution[timestep]
-    carriers_out = backend_model.carrier["out", :, tech].index()
+    carriers_out = get_valid_members(
+        backend_model, "carrier", "carriers", ("out", tech)
+    )
 
     carrier_prod = po.quicksum(
-        backend_model.carrier_prod[idx[1], node, tech, timestep] for idx in carriers_out
+        backend_model.carrier_prod[carrier, node, tech, timestep]
+        for carrier in carriers_out
     )
 
     return carrier_prod <= timestep_resolution * backend_model.energy_cap[node, tech]
@@ -112,10 +117,13 @@ def carrier_production_min_conversion_plus_constraint_rule(
     timestep_resolution = backend_model.timestep_resolution[timestep]
     min_use = get_param(backend_model, "energy_cap_min_use", (node, tech, timestep))
 
-    carriers_out = backend_model.carrier["out", :, tech].index()
+    carriers_out = get_valid_members(
+        backend_model, "carrier", "carriers", ("out", tech)
+    )
 
     carrier_prod = po.quicksum(
-        backend_model.carrier_prod[idx[1], node, tech, timestep] for idx in carriers_out
+        backend_model.carrier_prod[carrier, node, tech, timestep]
+        for carrier in carriers_out
     )
 
     return carrier_prod >= (
@@ -162,28 +170,30 @@ def balance_conversion_plus_non_primary_constraint_rule(
     """
     primary_tier, decision_variable = get_conversion_plus_io(backend_model, tier)
 
-    carriers_1 = backend_model.carrier[primary_tier, :, tech].index()
-    carriers_2 = backend_model.carrier[tier, :, tech].index()
+    carriers_1 = get_valid_members(
+        backend_model, "carrier", "carriers", (primary_tier, tech)
+    )
+    carriers_2 = get_valid_members(backend_model, "carrier", "carriers", (tier, tech))
 
     c_1 = []
     c_2 = []
-    for idx in carriers_1:
+    for carrier in carriers_1:
         carrier_ratio_1 = get_param(
             backend_model,
             "carrier_ratios",
-            (primary_tier, idx[1], node, tech, timestep),
+            (primary_tier, carrier, node, tech, timestep),
         )
         if po.value(carrier_ratio_1) != 0:
             c_1.append(
-                decision_variable[idx[1], node, tech, timestep] / carrier_ratio_1
+                decision_variable[carrier, node, tech, timestep] / carrier_ratio_1
             )
-    for idx in carriers_2:
+    for carrier in carriers_2:
         carrier_ratio_2 = get_param(
-            backend_model, "carrier_ratios", (tier, idx[1], node, tech, timestep)
+            backend_model, "carrier_ratios", (tier, carrier, node, tech, timestep)
         )
         if po.value(carrier_ratio_2) != 0:
             c_2.append(
-                decision_variable[idx[1], node, tech, timestep] / carrier_ratio_2
+                decision_variable[carrier, node, tech, timestep] / carrier_ratio_2
             )
     if len(c_2) == 0:
         return po.Constraint.Skip
@@ -11,7 +11,12 @@ Cost constraints.
 
 import pyomo.core as po
 
-from calliope.backend.pyomo.util import get_param, get_timestep_weight, loc_tech_is_in
+from calliope.backend.pyomo.util import (
+    get_param,
+    get_timestep_weight,
+    get_valid_members,
+    loc_tech_is_in,
+)
 
 
 def cost_expression_rule(backend_model, cost, node, tech):
@@ -35,8 +40,9 @@ def cost_expression_rule(backend_model, cost, node, tech):
     if hasattr(backend_model, "cost_var"):
         cost_var = po.quicksum(
             backend_model.cost_var[cost, node, tech, timestep]
-            for timestep in backend_model.timesteps
-            if [cost, node, tech, timestep] in backend_model.cost_var.index_set()
+            for timestep in get_valid_members(
+                backend_model, "cost_var", "timesteps", (cost, node, tech)
+            )
         )
     else:
         cost_var = 0
@@ -176,19 +182,23 @@ def cost_var_expression_rule(backend_model, cost, node, tech, timestep):
 
     all_costs = []
 
-    def _sum(var_name, carriers=backend_model.carriers):
+    def _sum(var_name, carriers=None):
+        valid_carriers = get_valid_members(
+            backend_model, var_name, "carriers", (node, tech, timestep)
+        )
         return po.quicksum(
             getattr(backend_model, var_name)[carrier, node, tech, timestep]
-            for carrier in carriers
-            if [carrier, node, tech, timestep]
-            in getattr(backend_model, f"{var_name}_index")
+            for carrier in valid_carriers
+            if carriers is None or carrier in carriers
         )
 
     cost_om_prod = get_param(
         backend_model, "cost_om_prod", (cost, node, tech, timestep)
     )
     if po.value(backend_model.inheritance[tech]).endswith("conversion_plus"):
-        carriers = [backend_model.primary_carrier_out[:, tech].index()[0][0]]
+        carriers = get_valid_members(
+            backend_model, "primary_carrier_out", "carriers", (tech,)
+        )[:1]
         all_costs.append(cost_om_prod * _sum("carrier_prod", carriers=carriers))
     else:
         all_costs.append(cost_om_prod * _sum("carrier_prod"))
@@ -205,20 +215,21 @@ def cost_var_expression_rule(backend_model, cost, node, tech, timestep):
             if po.value(energy_eff) > 0:
                 all_costs.append(cost_om_con * (_sum("carrier_prod") / energy_eff))
         elif po.value(backend_model.inheritance[tech]).endswith("conversion_plus"):
-            carriers = [backend_model.primary_carrier_in[:, tech].index()[0][0]]
+            carriers = get_valid_members(
+                backend_model, "primary_carrier_in", "carriers", (tech,)
+            )[:1]
             all_costs.append(
                 cost_om_con * (-1) * _sum("carrier_con", carriers=carriers)
             )
         else:
             all_costs.append(cost_om_con * (-1) * _sum("carrier_con"))
-    if hasattr(backend_model, "export_carrier"):
-        export_carrier = backend_model.export_carrier[:, node, tech].index()
-    else:
-        export_carrier = []
+    export_carrier = get_valid_members(
+        backend_model, "export_carrier", "carriers", (node, tech)
+    )
     if len(export_carrier) > 0:
         all_costs.append(
             get_param(backend_model, "cost_export", (cost, node, tech, timestep))
-            * backend_model.carrier_export[export_carrier[0][0], node, tech, timestep]
+            * backend_model.carrier_export[export_carrier[0], node, tech, timestep]
         )
 
     return po.quicksum(all_costs) * weight
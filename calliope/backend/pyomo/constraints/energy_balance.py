@@ -14,6 +14,7 @@ import pyomo.core as po
 from calliope.backend.pyomo.util import (
     get_param,
     get_previous_timestep,
+    get_valid_members,
 )
 
 
@@ -36,9 +37,9 @@ def system_balance_constraint_rule(backend_model, carrier, node, timestep):
     def _sum(var_name):
         return po.quicksum(
             getattr(backend_model, var_name)[carrier, node, tech, timestep]
-            for tech in backend_model.techs
-            if [carrier, node, tech, timestep]
-            in getattr(backend_model, var_name).index_set()
+            for tech in get_valid_members(
+                backend_model, var_name, "techs", (carrier, node, timestep)
+            )
         )
 
     carrier_prod = _sum("carrier_prod")
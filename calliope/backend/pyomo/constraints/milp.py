@@ -11,7 +11,7 @@ Constraints for binary and integer decision variables
 
 import pyomo.core as po
 
-from calliope.backend.pyomo.util import get_param
+from calliope.backend.pyomo.util import get_param, get_valid_members
 
 
 def unit_commitment_milp_constraint_rule(backend_model, node, tech, timestep):
@@ -90,10 +90,13 @@ def carrier_production_max_conversion_plus_milp_constraint_rule(
     """
     timestep_resolution = backend_model.timestep_resolution[timestep]
     energy_cap = get_param(backend_model, "energy_cap_per_unit", (node, tech))
-    carriers_out = backend_model.carrier["out", :, tech].index()
+    carriers_out = get_valid_members(
+        backend_model, "carrier", "carriers", ("out", tech)
+    )
 
     carrier_prod = po.quicksum(
-        backend_model.carrier_prod[idx[1], node, tech, timestep] for idx in carriers_out
+        backend_model.carrier_prod[carrier, node, tech, timestep]
+        for carrier in carriers_out
     )
 
     return carrier_prod <= (
@@ -154,10 +157,13 @@ def carrier_production_min_conversion_plus_milp_constraint_rule(
     timestep_resolution = backend_model.timestep_resolution[timestep]
     energy_cap = get_param(backend_model, "energy_cap_per_unit", (node, tech))
     min_use = get_param(backend_model, "energy_cap_min_use", (node, tech, timestep))
-    carriers_out = backend_model.carrier["out", :, tech].index()
+    carriers_out = get_valid_members(
+        backend_model, "carrier", "carriers", ("out", tech)
+    )
 
     carrier_prod = po.quicksum(
-        backend_model.carrier_prod[idx[1], node, tech, timestep] for idx in carriers_out
+        backend_model.carrier_prod[carrier, node, tech, timestep]
+        for carrier in carriers_out
     )
 
     return carrier_prod >= (
@@ -386,14 +392,10 @@ def unit_capacity_systemwide_milp_constraint_rule(backend_model, tech):
     equals_systemwide = get_param(backend_model, "units_equals_systemwide", tech)
 
     def _sum(var_name):
-        if hasattr(backend_model, var_name):
-            return po.quicksum(
-                getattr(backend_model, var_name)[node, tech]
-                for node in backend_model.nodes
-                if [node, tech] in getattr(backend_model, var_name).index_set()
-            )
-        else:
-            return 0
+        return po.quicksum(
+            getattr(backend_model, var_name)[node, tech]
+            for node in get_valid_members(backend_model, var_name, "nodes", (tech,))
+        )
 
     sum_expr_units = _sum("units")
     sum_expr_purchase = _sum("purchased")
@@ -422,9 +424,9 @@ def asynchronous_con_milp_constraint_rule(backend_model, node, tech, timestep):
     def _sum(var_name):
         return po.quicksum(
             getattr(backend_model, var_name)[carrier, node, tech, timestep]
-            for carrier in backend_model.carriers
-            if [carrier, node, tech, timestep]
-            in getattr(backend_model, var_name).index_set()
+            for carrier in get_valid_members(
+                backend_model, var_name, "carriers", (node, tech, timestep)
+            )
         )
 
     return (
@@ -452,9 +454,9 @@ def asynchronous_prod_milp_constraint_rule(backend_model, node, tech, timestep):
     def _sum(var_name):
         return po.quicksum(
             getattr(backend_model, var_name)[carrier, node, tech, timestep]
-            for carrier in backend_model.carriers
-            if [carrier, node, tech, timestep]
-            in getattr(backend_model, var_name).index_set()
+            for carrier in get_valid_members(
+                backend_model, var_name, "carriers", (node, tech, timestep)
+            )
         )
 
     return (
@@ -10,7 +10,7 @@ Policy constraints.
 """
 import pyomo.core as po
 
-from calliope.backend.pyomo.util import get_param
+from calliope.backend.pyomo.util import get_param, get_valid_members
 
 
 def reserve_margin_constraint_rule(backend_model, carrier):
@@ -32,17 +32,20 @@ def reserve_margin_constraint_rule(backend_model, carrier):
     reserve_margin = get_param(backend_model, "reserve_margin", carrier)
     max_demand_timestep = backend_model.max_demand_timesteps[carrier]
     max_demand_time_res = backend_model.timestep_resolution[max_demand_timestep]
-    techs = [idx[-1] for idx in backend_model.carrier["out", carrier, :].index()]
+    techs = get_valid_members(backend_model, "carrier", "techs", ("out", carrier))
     return po.quicksum(  # Sum all supply capacity for this carrier
         backend_model.energy_cap[node, tech]
         for node, tech in backend_model.energy_cap.index_set()
         if tech in techs
     ) >= po.quicksum(  # Sum all demand for this carrier and timestep
         backend_model.carrier_con[carrier, node, tech, max_demand_timestep]
-        for tech in techs
-        for node in backend_model.nodes
-        if [carrier, node, tech, max_demand_timestep]
-        in backend_model.carrier_con.index_set()
+        for node, tech in get_valid_members(
+            backend_model,
+            "carrier_con",
+            ("nodes", "techs"),
+            (carrier, max_demand_timestep),
+        )
+        if tech in techs
     ) * -1 * (
         1 / max_demand_time_res
     ) * (
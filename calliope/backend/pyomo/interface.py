@@ -1,17 +1,27 @@
+import itertools
 import logging
 
+import numpy as np
+import pandas as pd
 import xarray as xr
 import pyomo.core as po
 
 import calliope
-from calliope.backend.pyomo.util import get_var, string_to_datetime
+from calliope.backend.pyomo.util import (
+    get_var,
+    get_param_dependencies,
+    reset_param_dependencies,
+    string_to_datetime,
+)
 from calliope.backend import run as backend_run
 from calliope.backend.pyomo import model as run_pyomo
 import calliope.backend.pyomo.interface as pyomo_interface
 
 from calliope.core.util.dataset import reorganise_xarray_dimensions
-from calliope.core.util.logging import log_time
-from calliope.postprocess.results import postprocess_model_results
+from calliope.postprocess.results import (
+    get_backend_result_names,
+    postprocess_model_results,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -57,7 +67,9 @@ def update_pyomo_param(backend_model, opt, param, update_dict):
     Returns
     -------
     Value(s) will be updated in-place, requiring the user to run the model again to
-    see the effect on results.
+    see the effect on results. The updated Param items are recorded, so that
+    only the constraints, variable bounds and objective function which refer to
+    them are regenerated in a persistent solver on rerunning the model.
 
     """
     if not hasattr(backend_model, param):
@@ -75,21 +87,31 @@ def update_pyomo_param(backend_model, opt, param, update_dict):
         raise TypeError("`update_dict` must be a dictionary")
     else:
         getattr(backend_model, param).store_values(update_dict)
-
-    if opt is not None and "persistent" in opt.name:
-        calliope.exceptions.warn(
-            "Updating the Pyomo parameter won't affect the optimisation run without also "
-            "regenerating the relevant constraints or the objective function (see `regenerate_persistent_solver`)."
+        get_updated_params(backend_model).setdefault(param, set()).update(
+            update_dict.keys()
         )
 
 
+def get_updated_params(backend_model):
+    """
+    Param items which have been updated with `update_param` since the model
+    was last sent to the solver, as a dict with Param names as keys and sets
+    of Param indices as values.
+    """
+    if getattr(backend_model, "__calliope_updated_params", None) is None:
+        backend_model.__calliope_updated_params = {}
+    return backend_model.__calliope_updated_params
+
+
 def regenerate_persistent_pyomo_solver(
     backend_model, opt, constraints=None, variables=None, obj=False
 ):
     """
     Having updated a Pyomo Param or several of them, this function can be used
     to regenerate associated constraints in a persistent solver interface, such
-    as "gurobi_persistent", before rerunning the model.
+    as "gurobi_persistent", before rerunning the model. This is not necessary
+    for Params updated with `update_param`, whose dependent constraints,
+    variable bounds and objective function are regenerated on rerunning the model.
     The entire constraint need not be regenerated, it is possible to only point to
     those indexes whose associated parameters have changed.
 
@@ -127,6 +149,53 @@ def regenerate_persistent_pyomo_solver(
     return opt
 
 
+def update_persistent_pyomo_solver(backend_model, opt, updated_params):
+    """
+    Having updated Pyomo Params, update a persistent solver interface with
+    only those constraints, variable bounds and objective function which refer
+    to the updated Param items, instead of sending the entire model to the
+    solver again.
+
+    Parameters
+    ----------
+    updated_params : dict
+        Keys are Param names, values are lists of the indices of the Param
+        items that have been updated,
+        e.g. `{"resource": [("X1", "pv", "2005-01-01 00:00")]}`.
+
+    Returns
+    -------
+    opt : Pyomo persistent solver object
+    num_constraints : int
+        Number of constraints updated in the solver.
+    num_variables : int
+        Number of variables whose bounds were updated in the solver.
+    """
+    if opt is None or "persistent" not in opt.name:
+        raise calliope.exceptions.ModelError(
+            "Can only update persistent solvers. No persistent solver object found for this model run."
+        )
+
+    dependencies = get_param_dependencies(backend_model, updated_params.keys())
+    constraints, variables, objective = dependencies.get(updated_params)
+    for constraint in constraints:
+        opt.remove_constraint(constraint)
+        opt.add_constraint(constraint)
+    for var in variables:
+        opt.update_var(var)
+    if objective:
+        opt.set_objective(backend_model.obj)
+
+    pending_params = get_updated_params(backend_model)
+    for param, indices in updated_params.items():
+        if param in pending_params:
+            pending_params[param].difference_update(indices)
+            if not pending_params[param]:
+                del pending_params[param]
+
+    return opt, len(constraints), len(variables)
+
+
 def activate_pyomo_constraint(backend_model, constraint, active=True):
     """
     Takes a constraint or objective name, finds it in the backend model and sets
@@ -154,6 +223,8 @@ def activate_pyomo_constraint(backend_model, constraint, active=True):
         getattr(backend_model, constraint).deactivate()
     else:
         raise ValueError("Argument `active` must be True or False")
+    # Only active constraints are tracked as dependent on Params
+    reset_param_dependencies(backend_model)
 
 
 def rerun_pyomo_model(model_data, backend_model, opt):
@@ -162,6 +233,10 @@ def rerun_pyomo_model(model_data, backend_model, opt):
     (de)activating a constraint/objective or updating run options in the model
     model_data object (e.g. `run.solver`).
 
+    With a persistent solver, only the constraints, variable bounds and
+    objective function which refer to Params updated with `update_param` are
+    regenerated in the solver before rerunning the model.
+
     Returns
     -------
     new_model : calliope.Model
@@ -170,65 +245,161 @@ def rerun_pyomo_model(model_data, backend_model, opt):
     backend_model.__calliope_run_config = calliope.AttrDict.from_yaml_string(
         model_data.attrs["run_config"]
     )
-    timings = {}
-    log_time(logger, timings, "model_creation")
-    inputs = access_pyomo_model_inputs(backend_model)
-
-    run_mode = backend_model.__calliope_run_config["mode"]
-    if run_mode == "plan":
-        kwargs = {}
-    elif run_mode == "spores":
-        kwargs = {"interface": pyomo_interface}
-    else:
-        raise calliope.exceptions.ModelError(
-            "Cannot rerun the backend in {} run mode. Only `plan` or `spores` modes are "
-            "possible.".format(run_mode)
+    updated_params = get_updated_params(backend_model)
+    if updated_params and opt is not None and "persistent" in opt.name:
+        opt, num_constraints, num_variables = update_persistent_pyomo_solver(
+            backend_model, opt, updated_params
         )
-    run_func = getattr(backend_run, f"run_{run_mode}")
-    results, backend_model, opt = run_func(
-        model_data=model_data,
+        logger.debug(
+            "Regenerated {} constraints and the bounds of {} variables in the "
+            "persistent solver".format(num_constraints, num_variables)
+        )
+    # Otherwise, the whole model is sent to the solver
+    updated_params.clear()
+
+    return backend_run.rerun_backend_model(
+        model_data,
+        backend_model,
+        opt,
         run_config=backend_model.__calliope_run_config,
-        timings=timings,
+        inputs=access_pyomo_model_inputs(backend_model),
         backend=run_pyomo,
-        build_only=False,
-        backend_rerun=backend_model,
-        opt=opt,
-        **kwargs,
+        interface=pyomo_interface,
     )
 
-    # Add additional post-processed result variables to results
-    if results.attrs.get("termination_condition", None) in ["optimal", "feasible"]:
-        results = postprocess_model_results(results, model_data, timings)
-
-    for var in results.data_vars.values():
-        var.attrs["is_result"] = 1
 
-    for var in inputs.data_vars.values():
-        var.attrs["is_result"] = 0
-
-    new_model_data = xr.merge((results, inputs), compat="override")
-    new_model_data.attrs.update(model_data.attrs)
-    new_model_data.attrs.update(results.attrs)
+def sweep_pyomo_model(model_data, backend_model, opt, param_grid, results=None):
+    """
+    Solve the Pyomo backend for every combination of the Param values in
+    `param_grid`, updating only the changed Params between optimisations and
+    warm starting each optimisation from the previous solution.
+    With a persistent solver, only the constraints, variable bounds and
+    objective function which refer to the changed Params are regenerated in
+    the solver. The Params are reset to their original values afterwards.
 
-    # Only add coordinates from the original model_data that don't already exist
-    new_coords = [
-        i for i in model_data.coords.keys() if i not in new_model_data.coords.keys()
-    ]
-    new_model_data = new_model_data.update(model_data[new_coords])
+    Parameters
+    ----------
+    param_grid : dict
+        Keys are names of Params to sweep. Values are dicts with Param indices
+        as keys and lists of values to sweep as values, e.g.
+        `{"energy_cap_max": {("X1", "pv"): [10, 20, 30]}}`. The items of one
+        Param are swept together, so their lists must be of the same length.
+    results : list or dict, optional
+        Results to keep at each point of the sweep, in the same format as the
+        `run.results` option (e.g. `["energy_cap", "cost"]`). Defaults to the
+        `run.results` option of the model.
 
-    # Reorganise the coordinates so that model data and new model data share
-    # the same order of items in each dimension
-    new_model_data = new_model_data.reindex(model_data.coords)
+    Returns
+    -------
+    results : xarray.Dataset
+        Results of all points of the sweep, with one dimension per swept
+        Param, together with the termination condition and objective function
+        value at each point. Coordinates of a Param dimension are its swept
+        values if it has only one swept item and these are unique, otherwise
+        their positions.
+    """
+    run_config = calliope.AttrDict.from_yaml_string(model_data.attrs["run_config"])
+    if run_config["mode"] != "plan":
+        raise calliope.exceptions.ModelError(
+            "Cannot sweep the backend in {} run mode. Only `plan` mode is "
+            "possible.".format(run_config["mode"])
+        )
+    if results is not None:
+        run_config["results"] = results
+    # Post-processing takes the results to keep from the model data
+    sweep_model_data = model_data.copy()
+    sweep_model_data.attrs = {**model_data.attrs, "run_config": run_config.to_yaml()}
+    names = get_backend_result_names(run_config)
+
+    coords = {}
+    for param, items in param_grid.items():
+        lengths = set(len(values) for values in items.values())
+        if len(lengths) != 1:
+            raise calliope.exceptions.ModelError(
+                "All items of Param `{}` must be swept over the same number of "
+                "values.".format(param)
+            )
+        values = list(next(iter(items.values())))
+        # Duplicate coordinates would be merged when unstacking the results
+        if len(items) == 1 and pd.Index(values).is_unique:
+            coords[param] = values
+        else:
+            coords[param] = list(range(lengths.pop()))
+    original_values = {
+        param: {idx: po.value(getattr(backend_model, param)[idx]) for idx in items}
+        for param, items in param_grid.items()
+        if hasattr(backend_model, param)
+    }
 
-    calliope.exceptions.warn(
-        "The results of rerunning the backend model are only available within "
-        "the Calliope model returned by this function call."
+    sweep_results = []
+    previous_point = None
+    # The Params are reset even if solving the model fails
+    try:
+        for point in itertools.product(*[range(len(i)) for i in coords.values()]):
+            for i, (param, items) in enumerate(param_grid.items()):
+                if previous_point is None or point[i] != previous_point[i]:
+                    update_pyomo_param(
+                        backend_model,
+                        opt,
+                        param,
+                        {idx: values[point[i]] for idx, values in items.items()},
+                    )
+            updated_params = get_updated_params(backend_model)
+            if opt is not None and "persistent" in opt.name:
+                opt, _, _ = update_persistent_pyomo_solver(
+                    backend_model, opt, updated_params
+                )
+            # Otherwise, the whole model is sent to the solver
+            updated_params.clear()
+
+            backend_results, opt = run_pyomo.solve_model(
+                backend_model,
+                solver=run_config["solver"],
+                solver_io=run_config.get("solver_io", None),
+                solver_options=run_config.get("solver_options", None),
+                warmstart=True,
+                opt=opt,
+            )
+            termination = run_pyomo.load_results(backend_model, backend_results, opt)
+            if termination in ["optimal", "feasible"]:
+                point_results = postprocess_model_results(
+                    run_pyomo.get_result_array(backend_model, sweep_model_data, names),
+                    sweep_model_data,
+                    timings={},
+                )
+                if "persistent" in opt.name:
+                    objective = opt.get_model_attr("ObjVal")
+                else:
+                    objective = backend_model.obj()
+            else:
+                point_results, objective = None, np.nan
+            sweep_results.append((point_results, termination, objective))
+            previous_point = point
+    finally:
+        for param, values in original_values.items():
+            update_pyomo_param(backend_model, opt, param, values)
+
+    return _combine_sweep_results(sweep_results, coords)
+
+
+def _combine_sweep_results(sweep_results, coords):
+    template = next((i[0] for i in sweep_results if i[0] is not None), xr.Dataset())
+    point_results = []
+    for results, termination, objective in sweep_results:
+        if results is None:
+            # Infeasible points have no results
+            results = xr.full_like(template, np.nan, dtype=float)
+        results = results.drop_vars(["termination_condition"], errors="ignore")
+        results["termination_condition"] = termination
+        results["objective_function_value"] = objective
+        results.attrs = {}
+        point_results.append(results)
+
+    combined = xr.concat(point_results, dim="sweep")
+    combined.coords["sweep"] = pd.MultiIndex.from_product(
+        coords.values(), names=list(coords.keys())
     )
-
-    new_calliope_model = calliope.Model(config=None, model_data=new_model_data)
-    new_calliope_model._timings = timings
-
-    return new_calliope_model
+    return combined.unstack("sweep")
 
 
 def add_pyomo_constraint(
@@ -301,6 +472,7 @@ def add_pyomo_constraint(
         constraint_name,
         po.Constraint(*sets, **{"rule": constraint_rule}),
     )
+    reset_param_dependencies(backend_model)
 
     return backend_model
 
@@ -339,6 +511,12 @@ def get_all_pyomo_model_attrs(subsets, backend_model):
     return objects
 
 
+# Backend-agnostic names, as used when running iteratively in `calliope.backend.run`
+access_model_inputs = access_pyomo_model_inputs
+update_param = update_pyomo_param
+update_persistent_solver = update_persistent_pyomo_solver
+
+
 class BackendInterfaceMethods:
     def __init__(self, model):
         self._backend = model._backend_model
@@ -376,6 +554,23 @@ class BackendInterfaceMethods:
 
     regenerate_persistent_solver.__doc__ = regenerate_persistent_pyomo_solver.__doc__
 
+    def update_persistent_solver(self, *args, **kwargs):
+        (
+            self._opt,
+            num_constraints,
+            num_variables,
+        ) = update_persistent_pyomo_solver(self._backend, self._opt, *args, **kwargs)
+        return num_constraints, num_variables
+
+    update_persistent_solver.__doc__ = update_persistent_pyomo_solver.__doc__
+
+    def sweep(self, *args, **kwargs):
+        return sweep_pyomo_model(
+            self._model_data, self._backend, self._opt, *args, **kwargs
+        )
+
+    sweep.__doc__ = sweep_pyomo_model.__doc__
+
     def add_constraint(self, *args, **kwargs):
         self._backend = add_pyomo_constraint(self._backend, *args, **kwargs)
 
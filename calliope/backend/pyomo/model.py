@@ -9,10 +9,12 @@ import logging
 import os
 from contextlib import redirect_stdout, redirect_stderr
 
+import numpy as np
 import pandas as pd
 import xarray as xr
 
 import pyomo.core as po
+from pyomo.core.expr.visitor import identify_variables
 from pyomo.opt import SolverFactory
 
 # pyomo.environ is needed for pyomo solver plugins
@@ -23,14 +25,17 @@ from pyomo.common.tempfiles import TempfileManager  # pylint: disable=import-err
 
 from calliope.backend.pyomo.util import (
     get_var,
+    get_primal_vector,
     get_domain,
+    get_param_resolver,
+    get_param_dependencies,
     string_to_datetime,
     datetime_to_string,
 )
-from calliope.backend.subsets import create_valid_subset
+from calliope.backend.subsets import create_valid_subset, MaskCache
 from calliope.backend.pyomo import constraints
 from calliope.core.util.tools import load_function
-from calliope.core.util.logging import LogWriter
+from calliope.core.util.logging import LogWriter, BuildProfiler
 from calliope.core.util.dataset import reorganise_xarray_dimensions
 from calliope import exceptions
 from calliope.core.attrdict import AttrDict
@@ -71,12 +76,14 @@ def build_params(model_data, backend_model):
             if not pd.isnull(backend_model.__calliope_defaults.get(k, None)):
                 _kwargs["default"] = backend_model.__calliope_defaults[k]
             dims = [getattr(backend_model, i) for i in v.dims]
+            backend_model.__calliope_index_dims[k] = list(v.dims)
             if hasattr(backend_model, k):
                 logger.debug(
                     f"The parameter {k} is already an attribute of the Pyomo model."
                     "It will be prepended with `calliope_` for differentiatation."
                 )
                 k = f"calliope_{k}"
+                backend_model.__calliope_index_dims[k] = list(v.dims)
             setattr(backend_model, k, po.Param(*dims, **_kwargs))
 
     for option_name, option_val in backend_model.__calliope_run_config[
@@ -103,21 +110,30 @@ def build_params(model_data, backend_model):
     )
 
 
-def build_variables(backend_model, model_data, variable_definitions):
+def build_variables(
+    backend_model, model_data, variable_definitions, profiler, mask_cache
+):
     for var_name, var_config in variable_definitions.items():
-        subset = create_valid_subset(model_data, var_name, var_config)
-        if subset is None:
-            continue
-        if "bounds" in var_config:
-            kwargs = {"bounds": get_capacity_bounds(var_config.bounds)}
-        else:
-            kwargs = {}
-
-        setattr(
-            backend_model,
-            var_name,
-            po.Var(subset, domain=getattr(po, var_config.domain), **kwargs),
-        )
+        with profiler.component("variable", var_name) as record:
+            with record.timer("subset_time"):
+                subset = create_valid_subset(
+                    model_data, var_name, var_config, mask_cache
+                )
+            if subset is None:
+                continue
+            if "bounds" in var_config:
+                kwargs = {"bounds": get_capacity_bounds(var_config.bounds)}
+            else:
+                kwargs = {}
+            backend_model.__calliope_index_dims[var_name] = list(subset.names)
+
+            with record.timer("rule_time"):
+                setattr(
+                    backend_model,
+                    var_name,
+                    po.Var(subset, domain=getattr(po, var_config.domain), **kwargs),
+                )
+            record["indices"] = len(subset)
 
 
 def _load_rule_function(name):
@@ -127,22 +143,43 @@ def _load_rule_function(name):
         return None
 
 
-def build_constraints(backend_model, model_data, constraint_definitions):
+def _count_nonzeros(expressions):
+    return sum(
+        len(list(identify_variables(expr, include_fixed=False))) for expr in expressions
+    )
+
+
+def build_constraints(
+    backend_model, model_data, constraint_definitions, profiler, mask_cache
+):
     for constraint_name, constraint_config in constraint_definitions.items():
-        subset = create_valid_subset(model_data, constraint_name, constraint_config)
-        if subset is None:
-            continue
-        setattr(
-            backend_model,
-            f"{constraint_name}_constraint",
-            po.Constraint(
-                subset,
-                rule=_load_rule_function(f"{constraint_name}_constraint_rule"),
-            ),
-        )
+        with profiler.component("constraint", constraint_name) as record:
+            with record.timer("subset_time"):
+                subset = create_valid_subset(
+                    model_data, constraint_name, constraint_config, mask_cache
+                )
+            if subset is None:
+                continue
+            with record.timer("rule_time"):
+                setattr(
+                    backend_model,
+                    f"{constraint_name}_constraint",
+                    po.Constraint(
+                        subset,
+                        rule=_load_rule_function(f"{constraint_name}_constraint_rule"),
+                    ),
+                )
+            if profiler.enabled:
+                constraint = getattr(backend_model, f"{constraint_name}_constraint")
+                record["indices"] = len(constraint)
+                record["nonzeros"] = _count_nonzeros(
+                    c.body for c in constraint.values()
+                )
 
 
-def build_expressions(backend_model, model_data, expression_definitions):
+def build_expressions(
+    backend_model, model_data, expression_definitions, profiler, mask_cache
+):
     build_order_dict = {
         expr: config.get("build_order", 0)
         for expr, config in expression_definitions.items()
@@ -150,17 +187,30 @@ def build_expressions(backend_model, model_data, expression_definitions):
     build_order = sorted(build_order_dict, key=build_order_dict.get)
 
     for expr_name in build_order:
-        subset = create_valid_subset(
-            model_data, expr_name, expression_definitions[expr_name]
-        )
-        if subset is None:
-            continue
-        expression_function = _load_rule_function(f"{expr_name}_expression_rule")
-        if expression_function:
-            kwargs = dict(rule=expression_function)
-        else:
-            kwargs = dict(initialize=0.0)
-        setattr(backend_model, expr_name, po.Expression(subset, **kwargs))
+        with profiler.component("expression", expr_name) as record:
+            with record.timer("subset_time"):
+                subset = create_valid_subset(
+                    model_data,
+                    expr_name,
+                    expression_definitions[expr_name],
+                    mask_cache,
+                )
+            if subset is None:
+                continue
+            backend_model.__calliope_index_dims[expr_name] = list(subset.names)
+            expression_function = _load_rule_function(f"{expr_name}_expression_rule")
+            if expression_function:
+                kwargs = dict(rule=expression_function)
+            else:
+                kwargs = dict(initialize=0.0)
+            with record.timer("rule_time"):
+                setattr(backend_model, expr_name, po.Expression(subset, **kwargs))
+            if profiler.enabled:
+                expression = getattr(backend_model, expr_name)
+                record["indices"] = len(expression)
+                record["nonzeros"] = _count_nonzeros(
+                    e.expr for e in expression.values()
+                )
 
 
 def build_objective(backend_model):
@@ -181,12 +231,39 @@ def generate_model(model_data):
     model_data = datetime_to_string(backend_model, model_data)
 
     subsets_config = AttrDict.from_yaml_string(model_data.attrs["subsets"])
+    # Dimension names of all indexed components, and grouped lookups of their
+    # valid index items (see `calliope.backend.pyomo.util.get_valid_members`)
+    backend_model.__calliope_index_dims = {}
+    backend_model.__calliope_index_lookups = {}
     build_sets(model_data, backend_model)
     build_params(model_data, backend_model)
-    build_variables(backend_model, model_data, subsets_config["variables"])
-    build_expressions(backend_model, model_data, subsets_config["expressions"])
-    build_constraints(backend_model, model_data, subsets_config["constraints"])
+    get_param_resolver(backend_model)
+    profiler = BuildProfiler(
+        enabled=backend_model.__calliope_run_config.get("build_profile", False)
+    )
+    # `where` masks shared by the subsets of all components
+    mask_cache = MaskCache(model_data)
+    build_variables(
+        backend_model, model_data, subsets_config["variables"], profiler, mask_cache
+    )
+    build_expressions(
+        backend_model, model_data, subsets_config["expressions"], profiler, mask_cache
+    )
+    build_constraints(
+        backend_model, model_data, subsets_config["constraints"], profiler, mask_cache
+    )
+    backend_model.__calliope_build_profiler = profiler
     build_objective(backend_model)
+    # With a persistent solver, the components which refer to each Param item
+    # are found up front, so that only those need to be updated in the solver
+    # after updating Param values
+    if "persistent" in backend_model.__calliope_run_config.get("solver", ""):
+        get_param_dependencies(backend_model)
+    logger.debug(
+        "Parameter lookups on building the backend model: {}".format(
+            get_param_resolver(backend_model).cache_info()
+        )
+    )
     # FIXME: Optional constraints
     # FIXME re-enable loading custom objectives
 
@@ -196,6 +273,80 @@ def generate_model(model_data):
     return backend_model
 
 
+def get_build_profile(backend_model):
+    """
+    Time, size and memory use of building each variable, expression and
+    constraint, as a pandas DataFrame, if the model was generated with
+    `run.build_profile` set to True. None otherwise.
+    """
+    profiler = getattr(backend_model, "__calliope_build_profiler", None)
+    if profiler is not None and profiler.enabled:
+        return profiler.to_dataframe()
+    else:
+        return None
+
+
+def get_timeseries_params(backend_model, window_model_data, timeseries_data_vars):
+    """
+    Get the values of timeseries Params for a new operate mode window, indexed
+    over the timesteps of the Pyomo model. Does not modify the Pyomo model, so
+    can be run while another window is being solved.
+
+    Returns
+    -------
+    param_values : dict
+        Keys are Param names, values are dictionaries of Param values.
+    """
+    timesteps = dict(
+        zip(window_model_data.timesteps.to_index(), backend_model.timesteps)
+    )
+    return {
+        var: window_model_data[var]
+        .to_series()
+        .dropna()
+        .replace("inf", np.inf)
+        .rename(index=timesteps, level="timesteps")
+        .to_dict()
+        for var in timeseries_data_vars
+    }
+
+
+def update_timeseries_params(
+    backend_model, window_model_data, timeseries_data_vars, param_values=None
+):
+    """
+    Update timeseries Params with the values of a new operate mode window.
+    The Pyomo model sees the same timesteps each time, we just change the
+    values associated with those timesteps.
+
+    If `param_values` is given, they are used as already prepared with
+    `get_timeseries_params`.
+
+    Returns
+    -------
+    updated_params : dict
+        Keys are Param names, values are lists of the indices of the Param
+        items whose values have changed.
+    """
+    if param_values is None:
+        param_values = get_timeseries_params(
+            backend_model, window_model_data, timeseries_data_vars
+        )
+    updated_params = {}
+    for var in timeseries_data_vars:
+        param = getattr(backend_model, var)
+        current_values = param.extract_values()
+        updated_values = {
+            idx: val
+            for idx, val in param_values[var].items()
+            if current_values.get(idx, None) != val
+        }
+        param.store_values(updated_values)
+        updated_params[var] = list(updated_values.keys())
+
+    return updated_params
+
+
 def solve_model(
     backend_model,
     solver,
@@ -213,8 +364,9 @@ def solve_model(
     if opt is None:
         opt = SolverFactory(solver, solver_io=solver_io)
         if "persistent" in solver:
-            solve_kwargs.update({"save_results": False, "load_solutions": False})
             opt.set_instance(backend_model)
+    if "persistent" in solver:
+        solve_kwargs.update({"save_results": False, "load_solutions": False})
 
     if solver_options:
         for k, v in solver_options.items():
@@ -224,10 +376,15 @@ def solve_model(
         solve_kwargs.update({"symbolic_solver_labels": True, "keepfiles": True})
         os.makedirs(save_logs, exist_ok=True)
         TempfileManager.tempdir = save_logs  # Sets log output dir
-    if "warmstart" in solve_kwargs.keys() and solver in ["glpk", "cbc"]:
-        if solve_kwargs.pop("warmstart") is True:
-            exceptions.warn(
-                "The chosen solver, {}, does not suport warmstart, which may "
+    # Warm starts from the values of the decision variables (i.e. the last
+    # solution) are requested whenever a model is rerun, so are only skipped
+    # quietly if the solver cannot use them
+    if solve_kwargs.pop("warmstart", False) is True:
+        if opt.warm_start_capable():
+            solve_kwargs["warmstart"] = True
+        else:
+            logger.debug(
+                "The chosen solver, {}, does not support warmstart, which may "
                 "impact performance.".format(solver)
             )
 
@@ -243,6 +400,59 @@ def solve_model(
     return results, opt
 
 
+def get_solver_statistics(results):
+    """
+    Number of iterations and time taken by the solver, as reported in the
+    Pyomo `results` object. NaN if not reported by the solver.
+    """
+
+    def _get_number(getter):
+        try:
+            return float(getter())
+        except (AttributeError, TypeError, ValueError):
+            return np.nan
+
+    return {
+        "iterations": _get_number(
+            lambda: results.solver.statistics.black_box.number_of_iterations
+        ),
+        "solver_time": _get_number(lambda: results.solver.time),
+    }
+
+
+def shift_solution(backend_model, num_timesteps):
+    """
+    Shift the values of all decision variables indexed over timesteps back by
+    `num_timesteps` timesteps. This is used to warm start an operate mode window,
+    whose timeseries parameters have been updated in place, from the solution of
+    the previous window, which starts `num_timesteps` timesteps earlier.
+    Values at the last `num_timesteps` timesteps are kept as they are.
+    """
+    timesteps = list(backend_model.timesteps)
+    timestep_set = set(timesteps)
+    next_timesteps = dict(zip(timesteps[:-num_timesteps], timesteps[num_timesteps:]))
+    for var in backend_model.component_objects(ctype=po.Var):
+        values = var.get_values()
+        first_idx = next(iter(values), None)
+        if not isinstance(first_idx, tuple):
+            continue
+        positions = [i for i, item in enumerate(first_idx) if item in timestep_set]
+        if not positions:
+            continue
+        position = positions[0]
+
+        shifted_values = {}
+        for idx in values:
+            if idx[position] not in next_timesteps:
+                continue
+            next_idx = (
+                idx[:position] + (next_timesteps[idx[position]],) + idx[position + 1 :]
+            )
+            if values.get(next_idx, None) is not None:
+                shifted_values[idx] = values[next_idx]
+        var.set_values(shifted_values, skip_validation=True)
+
+
 def load_results(backend_model, results, opt):
     """Load results into model instance for access via model variables."""
     termination = results.solver.termination_condition
@@ -272,25 +482,32 @@ def load_results(backend_model, results, opt):
     return str(termination)
 
 
-def get_result_array(backend_model, model_data):
+def get_result_array(backend_model, model_data, names=None):
     """
     From a Pyomo model object, extract decision variable data and return it as
     an xarray Dataset. Any rogue input parameters that are constructed inside
     the backend (instead of being passed by calliope.Model().inputs) are also
     added to calliope.Model()._model_data in-place.
+    If `names` is given, only the variables and expressions it contains are
+    extracted.
     """
     subsets_config = AttrDict.from_yaml_string(model_data.attrs["subsets"])
 
     def _get_dim_order(foreach):
         return tuple([i for i in model_data.dims.keys() if i in foreach])
 
+    # Values of all decision variables, gathered once for all results
+    primal = get_primal_vector(backend_model)
+
     all_variables = {
         i.name: get_var(
             backend_model,
             i.name,
             dims=_get_dim_order(subsets_config.variables[i.name].foreach),
+            primal=primal,
         )
         for i in backend_model.component_objects(ctype=po.Var)
+        if names is None or i.name in names
     }
     # Add in expressions, which are combinations of variables (e.g. costs)
     all_variables.update(
@@ -300,8 +517,10 @@ def get_result_array(backend_model, model_data):
                 i.name,
                 dims=_get_dim_order(subsets_config.expressions[i.name].foreach),
                 expr=True,
+                primal=primal,
             )
             for i in backend_model.component_objects(ctype=po.Expression)
+            if names is None or i.name in names
         }
     )
 
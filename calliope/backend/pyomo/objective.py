@@ -12,6 +12,7 @@ Objective functions.
 
 import pyomo.core as po
 from calliope.core.util.tools import load_function
+from calliope.backend.pyomo.util import get_valid_members
 
 
 def minmax_cost_optimization(backend_model):
@@ -46,11 +47,7 @@ def minmax_cost_optimization(backend_model):
                         - backend_model.unused_supply[carrier, node, timestep]
                     )
                     * backend_model.timestep_weights[timestep]
-                    for [carrier, node, timestep] in backend_model.carriers
-                    * backend_model.nodes
-                    * backend_model.timesteps
-                    if [carrier, node, timestep]
-                    in backend_model.unmet_demand.index_set()
+                    for [carrier, node, timestep] in backend_model.unmet_demand.keys()
                 )
                 * backend_model.bigM
             )
@@ -63,8 +60,9 @@ def minmax_cost_optimization(backend_model):
             po.quicksum(
                 po.quicksum(
                     backend_model.cost[class_name, node, tech]
-                    for [node, tech] in backend_model.nodes * backend_model.techs
-                    if [class_name, node, tech] in backend_model.cost.index_set()
+                    for [node, tech] in get_valid_members(
+                        backend_model, "cost", ("nodes", "techs"), (class_name,)
+                    )
                 )
                 * weight
                 for class_name, weight in backend_model.objective_cost_class.items()
@@ -72,9 +70,11 @@ def minmax_cost_optimization(backend_model):
             + unmet_demand
         )
 
+    # Objectives are given as expressions rather than rules, so that the backend
+    # model does not hold on to local functions and can be pickled
     backend_model.obj = po.Objective(
         sense=load_function("pyomo.core." + backend_model.objective_sense),
-        rule=obj_rule,
+        expr=obj_rule(backend_model),
     )
     backend_model.obj.domain = po.Reals
 
@@ -94,5 +94,5 @@ def check_feasibility(backend_model):
     def obj_rule(backend_model):
         return 1
 
-    backend_model.obj = po.Objective(sense=po.minimize, rule=obj_rule)
+    backend_model.obj = po.Objective(sense=po.minimize, expr=obj_rule(backend_model))
     backend_model.obj.domain = po.Reals
@@ -4,6 +4,7 @@ Licensed under the Apache 2.0 License (see LICENSE file).
 
 """
 
+import collections
 import logging
 import re
 
@@ -11,20 +12,27 @@ import numpy as np
 import pandas as pd
 from pandas.api.types import is_numeric_dtype
 import xarray as xr
+from scipy import sparse
 import pyomo.core as po
+from pyomo.core.expr.visitor import identify_mutable_parameters
+from pyomo.repn import generate_standard_repn
 
-from calliope.core.util.tools import memoize
+from calliope.core.util.tools import memoize_instancemethod
 from calliope import exceptions
 
 logger = logging.getLogger(__name__)
 
 
-@memoize
 def get_param(backend_model, var, dims):
     """
     Get an input parameter held in a Pyomo object, or held in the defaults
     dictionary if that Pyomo object doesn't exist.
 
+    If `dims` includes a timestep but the parameter is not indexed over
+    timesteps, the parameter value is taken from the remaining dimensions.
+    Lookups are answered and cached by the parameter resolver of
+    `backend_model` (see :class:`ParamResolver`).
+
     Parameters
     ----------
     backend_model : Pyomo model instance
@@ -32,26 +40,157 @@ def get_param(backend_model, var, dims):
     dims : single value or tuple
 
     """
-    try:
-        return getattr(backend_model, var)[dims]
-    except AttributeError:  # i.e. parameter doesn't exist at all
+    return get_param_resolver(backend_model).get(var, dims)
+
+
+def get_param_resolver(backend_model):
+    """
+    Get the parameter resolver of `backend_model`, initialising it if the
+    model does not yet have one.
+    """
+    if not hasattr(backend_model, "__calliope_param_resolver"):
+        backend_model.__calliope_param_resolver = ParamResolver(
+            backend_model,
+            getattr(backend_model, "__calliope_defaults", {}),
+            getattr(backend_model, "__calliope_index_dims", {}),
+        )
+    return backend_model.__calliope_param_resolver
+
+
+ParamCacheInfo = collections.namedtuple(
+    "ParamCacheInfo", ["hits", "misses", "currsize"]
+)
+
+
+class ParamResolver(object):
+    """
+    Resolve lookups of input parameters in a Pyomo backend model, falling back
+    to static values and defaults without relying on exceptions.
+
+    Each parameter is classified once, as one of:
+
+    * ``"timeseries"``: a Pyomo Param indexed over timesteps,
+    * ``"static"``: a Pyomo Param that is not indexed over timesteps, so
+      a lookup including a timestep drops the timestep,
+    * ``"default"``: not a Pyomo Param, so lookups return the default value.
+
+    Resolved lookups are cached for the lifetime of the resolver, which is an
+    attribute of the backend model and is therefore released with it.
+    Resolved values of Pyomo Params are mutable Param data, so updating a
+    Param in the backend model is reflected in cached lookups.
+
+    Parameters
+    ----------
+    backend_model : Pyomo model instance
+    defaults : dict
+        Default value of each parameter.
+    index_dims : dict
+        Dimension names of each Pyomo Param, as set when building the model.
+        If not given for a Param, they are taken from its index set.
+
+    """
+
+    def __init__(self, backend_model, defaults, index_dims):
+        self._defaults = defaults
+        self._params = {}
+        self._cache = {}
+        self.hits = 0
+        self.misses = 0
+        # Items of each dimension, shared by all Params indexed over it
+        dim_items = {}
+        for param in backend_model.component_objects(po.Param, descend_into=False):
+            self._params[param.name] = self._classify(
+                backend_model, param, index_dims.get(param.name, None), dim_items
+            )
+
+    @staticmethod
+    def _classify(backend_model, param, dims, dim_items):
+        if not param.is_indexed():
+            return "static", param, None
+        if dims is None:
+            index_set = param.index_set()
+            if index_set.dimen == 1:
+                dims = [index_set.name]
+            else:
+                dims = [i.name for i in index_set.subsets()]
+        for dim in dims:
+            if dim not in dim_items:
+                dim_items[dim] = frozenset(getattr(backend_model, dim))
+        kind = "timeseries" if "timesteps" in dims else "static"
+        return kind, param, tuple(dim_items[dim] for dim in dims)
+
+    def kind(self, var):
+        """
+        Classification of parameter `var`: one of "timeseries", "static" or
+        "default".
+        """
+        if var in self._params:
+            return self._params[var][0]
+        else:
+            return "default"
+
+    def get(self, var, dims):
+        """
+        Get the value of parameter `var` at index `dims`, see :func:`get_param`.
+        """
+        key = (var, dims)
+        if key in self._cache:
+            self.hits += 1
+            return self._cache[key]
+
+        self.misses += 1
+        value = self._resolve(var, dims)
+        self._cache[key] = value
+        return value
+
+    def _resolve(self, var, dims):
+        if var not in self._params:  # i.e. parameter doesn't exist at all
+            return self._default(var, dims)
+
+        kind, param, dim_items = self._params[var]
+        if dim_items is None:
+            return param[dims]
+        if self._is_valid_index(dims, dim_items):
+            return param[dims]
+
+        # try removing timestep
+        if isinstance(dims, tuple) and len(dims) > 2:
+            dims = dims[:-1]
+        elif isinstance(dims, tuple) and len(dims) > 0:
+            dims = dims[0]
+        else:
+            return self._default(var, dims)
+        if self._is_valid_index(dims, dim_items):
+            return param[dims]
+        else:  # Static default value
+            return self._default(var, dims)
+
+    @staticmethod
+    def _is_valid_index(dims, dim_items):
+        if not isinstance(dims, tuple):
+            dims = (dims,)
+        return len(dims) == len(dim_items) and all(
+            i in items for i, items in zip(dims, dim_items)
+        )
+
+    def _default(self, var, dims):
         logger.debug(
             "get_param: var {} and dims {} leading to default lookup".format(var, dims)
         )
-        return backend_model.__calliope_defaults[var]
-    except KeyError:  # try removing timestep
-        try:
-            if len(dims) > 2:
-                return getattr(backend_model, var)[dims[:-1]]
-            else:
-                return getattr(backend_model, var)[dims[0]]
-        except KeyError:  # Static default value
-            logger.debug(
-                "get_param: var {} and dims {} leading to default lookup".format(
-                    var, dims
-                )
-            )
-            return backend_model.__calliope_defaults[var]
+        return self._defaults[var]
+
+    def cache_info(self):
+        """
+        Report parameter lookup cache statistics, as a named tuple of
+        (hits, misses, currsize).
+        """
+        return ParamCacheInfo(self.hits, self.misses, len(self._cache))
+
+    def clear(self):
+        """Clear the lookup cache and reset its statistics."""
+        self._cache.clear()
+        self.hits = 0
+        self.misses = 0
 
 
 def get_previous_timestep(timesteps, timestep):
@@ -59,7 +198,7 @@ def get_previous_timestep(timesteps, timestep):
     return timesteps.at(timesteps.ord(timestep) - 1)
 
 
-@memoize
+@memoize_instancemethod
 def get_timestep_weight(backend_model):
     """
     Get the total number of years this model considers, by summing all
@@ -72,7 +211,7 @@ def get_timestep_weight(backend_model):
     return sum(np.multiply(time_res, weights)) / 8760
 
 
-@memoize
+@memoize_instancemethod
 def get_conversion_plus_io(backend_model, tier):
     """
     from a carrier_tier, return the primary tier (of `in`, `out`) and
@@ -84,7 +223,7 @@ def get_conversion_plus_io(backend_model, tier):
         return "in", backend_model.carrier_con
 
 
-def get_var(backend_model, var, dims=None, sparse=False, expr=False):
+def get_var(backend_model, var, dims=None, sparse=False, expr=False, primal=None):
     """
     Return output for variable `var` as a pandas.Series (1d),
     pandas.Dataframe (2d), or xarray.DataArray (3d and higher).
@@ -101,6 +240,9 @@ def get_var(backend_model, var, dims=None, sparse=False, expr=False):
     expr : bool, optional
         If True, treat var as a pyomo expression, which requires calculating
         the result of the expression before translating into nd data structure
+    primal : PrimalVector, optional
+        Values of all decision variables, to reuse when extracting several
+        variables and expressions (see `get_primal_vector`).
     """
     try:
         var_container = getattr(backend_model, var)
@@ -113,6 +255,25 @@ def get_var(backend_model, var, dims=None, sparse=False, expr=False):
         else:
             dims = [var_container.index_set().name]
 
+    # Values of variables and expressions are scattered straight into an array
+    index_dims = getattr(backend_model, "__calliope_index_dims", {}).get(var, None)
+    if (
+        index_dims is not None
+        and not sparse
+        and var_container.ctype in [po.Var, po.Expression]
+        and set(index_dims) == set(dims)
+        and len(var_container) > 0
+    ):
+        if primal is None:
+            primal = get_primal_vector(backend_model)
+        if var_container.ctype is po.Var:
+            values = primal.get_values(var)
+        else:
+            values = primal.evaluate(var_container)
+        return _component_to_array(
+            backend_model, var_container, index_dims, values
+        ).transpose(*dims)
+
     if sparse and not expr:
         if invalid(var_container.default()):
             result = pd.Series(var_container._data).apply(
@@ -141,6 +302,207 @@ def get_var(backend_model, var, dims=None, sparse=False, expr=False):
     return da_resorted
 
 
+def _component_to_array(backend_model, component, dims, values):
+    """
+    Scatter `values`, one per item of the indexed Pyomo `component` (in the
+    order of `component._data`), into an array over all items of the Pyomo
+    Sets of its dimensions `dims`, NaN elsewhere.
+    """
+    coords = [
+        pd.Index(getattr(backend_model, dim)._ordered_values, name=dim) for dim in dims
+    ]
+    if len(dims) == 1:
+        index_items = [list(component._data.keys())]
+    else:
+        index_items = zip(*component._data.keys())
+    positions = tuple(
+        coord.get_indexer(list(items)) for coord, items in zip(coords, index_items)
+    )
+    array = np.full([len(coord) for coord in coords], np.nan)
+    array[positions] = values
+    return xr.DataArray(array, coords=coords)
+
+
+def get_primal_vector(backend_model):
+    """
+    Get the values of all decision variables of a Pyomo model at once, as a
+    :class:`PrimalVector`.
+    """
+    return PrimalVector(backend_model)
+
+
+class PrimalVector(object):
+    """
+    Values of all decision variables of a Pyomo model, gathered once into one
+    array (NaN where a variable has no value), with the position of each
+    variable in that array. Variable values are slices of the array and
+    expressions are evaluated as a sparse matrix-vector product with it.
+
+    """
+
+    def __init__(self, backend_model):
+        self._slices = {}
+        self._positions = {}
+        values = []
+        for var in backend_model.component_objects(ctype=po.Var):
+            start = len(values)
+            for var_data in var._data.values():
+                self._positions[id(var_data)] = len(values)
+                values.append(var_data.value)
+            self._slices[var.name] = slice(start, len(values))
+        self.values = np.array(values, dtype=float)
+
+    def get_values(self, var):
+        """Values of all items of the Var `var`, in the order of `var._data`."""
+        return self.values[self._slices[var]]
+
+    def get_coefficient_matrix(self, expression):
+        """
+        Linear representation of all items of the (indexed) Pyomo `expression`,
+        with current parameter values, as a sparse matrix of coefficients on
+        the primal vector and a vector of constants. Items that are not linear
+        are left empty and returned as a list of their row positions.
+        """
+        rows, columns, coeffs = [], [], []
+        constants = np.zeros(len(expression))
+        nonlinear = []
+        for row, expression_data in enumerate(expression._data.values()):
+            repn = generate_standard_repn(
+                expression_data.expr, compute_values=True, quadratic=False
+            )
+            if repn.nonlinear_expr is not None or any(
+                id(i) not in self._positions for i in repn.linear_vars
+            ):
+                nonlinear.append(row)
+                continue
+            constants[row] = repn.constant
+            rows.extend([row] * len(repn.linear_vars))
+            columns.extend(self._positions[id(i)] for i in repn.linear_vars)
+            coeffs.extend(repn.linear_coefs)
+        matrix = sparse.csr_matrix(
+            (coeffs, (rows, columns)), shape=(len(expression), len(self.values))
+        )
+        return matrix, constants, nonlinear
+
+    def evaluate(self, expression):
+        """Values of all items of the (indexed) Pyomo `expression`."""
+        matrix, constants, nonlinear = self.get_coefficient_matrix(expression)
+        result = matrix @ np.nan_to_num(self.values) + constants
+        # Items that depend on a variable without a value have no value either
+        result[abs(matrix) @ np.isnan(self.values).astype(float) > 0] = np.nan
+        if nonlinear:
+            expression_data = list(expression._data.values())
+            result[nonlinear] = [po.value(expression_data[i]) for i in nonlinear]
+        return result
+
+
+def get_param_dependencies(backend_model, params=None):
+    """
+    Get the :class:`ParamDependencies` of `backend_model` that track all the
+    Params in `params` (all mutable indexed Params if None), initialising them
+    if the model does not yet have any that do.
+    """
+    if params is None:
+        params = [
+            i.name
+            for i in backend_model.component_objects(ctype=po.Param)
+            if i.is_indexed() and i.mutable
+        ]
+    dependencies = getattr(backend_model, "__calliope_param_dependencies", None)
+    if dependencies is None or not dependencies.params.issuperset(params):
+        dependencies = ParamDependencies(backend_model, params)
+        backend_model.__calliope_param_dependencies = dependencies
+    return dependencies
+
+
+def reset_param_dependencies(backend_model):
+    """
+    Discard the :class:`ParamDependencies` of `backend_model`, e.g. after
+    constraints have been added or (de)activated, so that they are found
+    again on next use.
+    """
+    backend_model.__calliope_param_dependencies = None
+
+
+class ParamDependencies(object):
+    """
+    The active constraints, variables (by their bounds) and objective of a
+    Pyomo model which refer to each item of a set of mutable Params, found by
+    walking all their expressions once.
+
+    Parameters
+    ----------
+    backend_model : Pyomo model instance
+    params : iterable of str
+        Names of the Params to track.
+
+    """
+
+    def __init__(self, backend_model, params):
+        self.params = set(params)
+        tracked = {
+            id(param_data): (param, idx)
+            for param in self.params
+            for idx, param_data in getattr(backend_model, param)._data.items()
+        }
+
+        def _dependencies(*exprs):
+            return set(
+                tracked[id(i)]
+                for expr in exprs
+                if expr is not None
+                for i in identify_mutable_parameters(expr)
+                if id(i) in tracked
+            )
+
+        self._constraints = collections.defaultdict(list)
+        for constraint in backend_model.component_data_objects(
+            ctype=po.Constraint, active=True
+        ):
+            for key in _dependencies(
+                constraint.body, constraint.lower, constraint.upper
+            ):
+                self._constraints[key].append(constraint)
+
+        self._variables = collections.defaultdict(list)
+        for var in backend_model.component_data_objects(ctype=po.Var):
+            for key in _dependencies(var.lower, var.upper):
+                self._variables[key].append(var)
+
+        self._objective = set()
+        for objective in backend_model.component_data_objects(
+            ctype=po.Objective, active=True
+        ):
+            self._objective.update(_dependencies(objective.expr))
+
+    def get(self, updated_params):
+        """
+        Get the components which refer to the given Param items.
+
+        Parameters
+        ----------
+        updated_params : dict
+            Keys are Param names, values are lists of Param indices.
+
+        Returns
+        -------
+        constraints : list of Pyomo constraint data
+        variables : list of Pyomo variable data
+        objective : bool
+            Whether the objective refers to any of the Param items.
+
+        """
+        constraints, variables = {}, {}
+        objective = False
+        for param, indices in updated_params.items():
+            for idx in indices:
+                key = (param, idx)
+                constraints.update((id(i), i) for i in self._constraints.get(key, []))
+                variables.update((id(i), i) for i in self._variables.get(key, []))
+                objective = objective or key in self._objective
+        return list(constraints.values()), list(variables.values()), objective
+
+
 def loc_tech_is_in(backend_model, loc_tech, model_set):
     """
     Check if set exists and if loc_tech is in the set
@@ -159,6 +521,67 @@ def loc_tech_is_in(backend_model, loc_tech, model_set):
         return False
 
 
+def get_valid_members(backend_model, component, over, idx):
+    """
+    Get the items of dimension(s) `over` for which a variable, expression or
+    parameter is defined, given the index items of all its other dimensions.
+    E.g. all technologies with `carrier_prod` at a given carrier, node and
+    timestep: `get_valid_members(backend_model, "carrier_prod", "techs", idx)`,
+    with `idx = (carrier, node, timestep)`.
+
+    The grouped lookup is built once per component and dimension(s) on first
+    use, so summing over valid members scales with the number of nonzero
+    elements rather than with the dense product of all dimensions.
+
+    Parameters
+    ----------
+    component : str
+    over : str or tuple of str
+        If more than one dimension is given, members are tuples of index items.
+    idx : tuple
+        Index items of all other dimensions of `component`, in the order of
+        its dimensions.
+
+    Returns
+    -------
+    list, which is empty if `component` does not exist in the backend model.
+    """
+    lookups = backend_model.__calliope_index_lookups
+    if (component, over) not in lookups:
+        lookups[(component, over)] = _build_index_lookup(backend_model, component, over)
+    return lookups[(component, over)].get(idx, [])
+
+
+def _build_index_lookup(backend_model, component, over):
+    lookup = {}
+    if not hasattr(backend_model, component):
+        return lookup
+
+    pyomo_obj = getattr(backend_model, component)
+    dims = backend_model.__calliope_index_dims.get(component, None)
+    if dims is None:
+        dims = [i.name for i in pyomo_obj.index_set().subsets()]
+    if isinstance(pyomo_obj, po.base.param.IndexedParam):
+        keys = pyomo_obj.sparse_keys()
+    else:
+        keys = pyomo_obj.keys()
+
+    over_dims = [over] if isinstance(over, str) else list(over)
+    over_pos = [dims.index(i) for i in over_dims]
+    other_pos = [i for i in range(len(dims)) if i not in over_pos]
+
+    for key in keys:
+        if not isinstance(key, tuple):
+            key = (key,)
+        if isinstance(over, str):
+            member = key[over_pos[0]]
+        else:
+            member = tuple(key[i] for i in over_pos)
+        lookup.setdefault(tuple(key[i] for i in other_pos), []).append(member)
+
+    return lookup
+
+
 def get_domain(var: xr.DataArray) -> str:
     def check_sign(var):
         if re.match("resource|node_coordinates|cost*", var.name):
@@ -4,6 +4,8 @@ Licensed under the Apache 2.0 License (see LICENSE file).
 
 """
 import logging
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 
 import numpy as np
 import pandas as pd
@@ -12,16 +14,57 @@ import xarray as xr
 from calliope.core.util.logging import log_time
 from calliope import exceptions
 from calliope.backend import checks
+from calliope.backend.cache import BackendModelCache, get_fingerprint
+from calliope.backend.checkpoint import CARRIED_OVER, OperateCheckpoint
 from calliope.backend.pyomo import interface as pyomo_interface
 from calliope.backend.pyomo import model as run_pyomo
+from calliope.backend.sparse import interface as sparse_interface
+from calliope.backend.sparse import model as run_sparse
 from calliope.core import io
 from calliope.core.attrdict import AttrDict
 from calliope.core.util.observed_dict import UpdateObserverDict
+from calliope.postprocess.results import (
+    apply_zero_threshold,
+    postprocess_model_results,
+    get_backend_result_names,
+)
 
 logger = logging.getLogger(__name__)
 
+# Results needed within each run mode, whether or not they are kept in the
+# final results (see `run.results`)
+REQUIRED_RESULTS = {
+    "plan": (),
+    "spores": ("energy_cap", "cost"),
+    "operate": ("storage", "operating_units"),
+}
 
-def run(model_data, timings, build_only=False):
+BACKEND = {"pyomo": run_pyomo, "sparse": run_sparse}
+
+INTERFACE = {"pyomo": pyomo_interface, "sparse": sparse_interface}
+
+
+class NoBackendInterfaceMethods:
+    """
+    Backend interface of a model run whose backend models only existed in
+    worker processes (operate mode run in parallel blocks of windows), so that
+    there is no backend model to access or rerun.
+    """
+
+    def __init__(self, model):
+        pass
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        raise exceptions.ModelError(
+            "The backend model is not available, as the operate mode windows "
+            "were run in parallel blocks in worker processes. Set "
+            "`run.operation.parallel.blocks` to null to access the backend model."
+        )
+
+
+def run(model_data, timings, build_only=False, resume=False):
     """
     Parameters
     ----------
@@ -33,15 +76,19 @@ def run(model_data, timings, build_only=False):
         If True, the backend only constructs its in-memory representation
         of the problem rather than solving it. Used for debugging and
         testing.
+    resume : bool, optional
+        If True, resume an operate mode run from its last checkpoint.
 
     """
 
-    BACKEND = {"pyomo": run_pyomo}
-
-    INTERFACE = {"pyomo": pyomo_interface}
-
     run_config = AttrDict.from_yaml_string(model_data.attrs["run_config"])
 
+    if resume and run_config["mode"] != "operate":
+        exceptions.warn(
+            "Only operate mode runs can be resumed from a checkpoint. "
+            "The model will be run from the start."
+        )
+
     if run_config["mode"] == "plan":
         results, backend, opt = run_plan(
             model_data,
@@ -56,8 +103,10 @@ def run(model_data, timings, build_only=False):
             model_data,
             run_config,
             timings,
+            interface=INTERFACE[run_config.backend],
             backend=BACKEND[run_config.backend],
             build_only=build_only,
+            resume=resume,
         )
 
     elif run_config["mode"] == "spores":
@@ -70,9 +119,166 @@ def run(model_data, timings, build_only=False):
             build_only=build_only,
         )
 
+    if backend is None and not build_only:
+        return results, backend, opt, NoBackendInterfaceMethods
     return results, backend, opt, INTERFACE[run_config.backend].BackendInterfaceMethods
 
 
+def rerun_backend_model(
+    model_data, backend_model, opt, run_config, inputs, backend, interface
+):
+    """
+    Rerun an already built backend model, perhaps after updating a parameter value,
+    (de)activating a constraint/objective or updating run options in the model
+    model_data object (e.g. `run.solver`).
+
+    Parameters
+    ----------
+    model_data : xarray.Dataset
+        Calliope model data the backend model was built from.
+    backend_model : backend model instance
+    opt : backend solver object, or None
+    run_config : AttrDict
+        Run configuration with which to rerun the model.
+    inputs : xarray.Dataset
+        Inputs as currently held by the backend model, to combine with the results.
+    backend : module
+        Backend model module, e.g. `calliope.backend.pyomo.model`.
+    interface : module
+        Backend interface module, e.g. `calliope.backend.pyomo.interface`.
+
+    Returns
+    -------
+    new_model : calliope.Model
+        New calliope model, including both inputs and results, but no backend interface.
+    """
+    from calliope.core.model import Model
+
+    timings = {}
+    log_time(logger, timings, "model_creation")
+
+    run_mode = run_config["mode"]
+    if run_mode == "plan":
+        # Warm start from the previous solution, if there is one
+        kwargs = {"allow_warmstart": True}
+    elif run_mode == "spores":
+        kwargs = {"interface": interface}
+    else:
+        raise exceptions.ModelError(
+            "Cannot rerun the backend in {} run mode. Only `plan` or `spores` modes are "
+            "possible.".format(run_mode)
+        )
+    run_func = globals()[f"run_{run_mode}"]
+    results, backend_model, opt = run_func(
+        model_data=model_data,
+        run_config=run_config,
+        timings=timings,
+        backend=backend,
+        build_only=False,
+        backend_rerun=backend_model,
+        opt=opt,
+        **kwargs,
+    )
+
+    # Add additional post-processed result variables to results
+    if results.attrs.get("termination_condition", None) in ["optimal", "feasible"]:
+        results = postprocess_model_results(results, model_data, timings)
+
+    for var in results.data_vars.values():
+        var.attrs["is_result"] = 1
+
+    for var in inputs.data_vars.values():
+        var.attrs["is_result"] = 0
+
+    new_model_data = xr.merge((results, inputs), compat="override")
+    new_model_data.attrs.update(model_data.attrs)
+    new_model_data.attrs.update(results.attrs)
+
+    # Only add coordinates from the original model_data that don't already exist
+    new_coords = [
+        i for i in model_data.coords.keys() if i not in new_model_data.coords.keys()
+    ]
+    new_model_data = new_model_data.update(model_data[new_coords])
+
+    # Reorganise the coordinates so that model data and new model data share
+    # the same order of items in each dimension
+    new_model_data = new_model_data.reindex(model_data.coords)
+
+    exceptions.warn(
+        "The results of rerunning the backend model are only available within "
+        "the Calliope model returned by this function call."
+    )
+
+    new_calliope_model = Model(config=None, model_data=new_model_data)
+    new_calliope_model._timings = timings
+
+    return new_calliope_model
+
+
+def _store_build_profile(backend, backend_model, timings):
+    """
+    If `run.build_profile` is True, add the per-component build profile of
+    the backend model to `timings`, as a pandas DataFrame under the key
+    `backend_build_profile`.
+    """
+    build_profile = backend.get_build_profile(backend_model)
+    if build_profile is not None:
+        timings["backend_build_profile"] = build_profile
+        logger.debug(
+            "Backend: slowest components to build:\n{}".format(
+                build_profile.assign(
+                    time=build_profile.subset_time + build_profile.rule_time
+                )
+                .nlargest(5, "time")
+                .to_string(index=False)
+            )
+        )
+
+
+def _add_to_solve_profile(timings, **solve_stats):
+    """
+    Add the statistics of a solver run (whether it was warm started, the
+    time taken to solve, and the number of iterations and time reported by the
+    solver) to `timings["solve_profile"]`, a pandas DataFrame with a row per
+    solver run.
+    """
+    timings["solve_profile"] = pd.concat(
+        [timings.get("solve_profile", None), pd.DataFrame([solve_stats])],
+        ignore_index=True,
+    )
+
+
+def _generate_backend_model(backend, model_data, run_config):
+    """
+    Generate the backend model, or load it from the cache in
+    `run.backend_cache.path` if a model with the same inputs has been built
+    before.
+
+    Returns
+    -------
+    backend_model : backend model instance
+    cache_status : str or None
+        "hit" if the backend model was loaded from the cache, "miss" if it was
+        generated and added to the cache, None if there is no cache.
+
+    """
+    cache_config = run_config.get("backend_cache", None) or {}
+    if cache_config.get("path", None) is None:
+        return backend.generate_model(model_data), None
+
+    cache = BackendModelCache(
+        cache_config["path"], cache_config.get("max_size", None) or np.inf
+    )
+    key = "{}.{}".format(get_fingerprint(model_data, run_config), run_config.backend)
+    backend_model = cache.load(key)
+    if backend_model is not None:
+        return backend_model, "hit"
+
+    backend_model = backend.generate_model(model_data)
+    cache.save(key, backend_model)
+    return backend_model, "miss"
+
+
 def run_plan(
     model_data,
     run_config,
@@ -88,15 +294,21 @@ def run_plan(
     log_time(logger, timings, "run_start", comment="Backend: starting model run")
 
     warmstart = False
+    cache_status = None
     if not backend_rerun:
-        backend_model = backend.generate_model(model_data)
+        backend_model, cache_status = _generate_backend_model(
+            backend, model_data, run_config
+        )
         log_time(
             logger,
             timings,
             "run_backend_model_generated",
             time_since_run_start=True,
-            comment="Backend: model generated",
+            comment="Backend: model loaded from cache"
+            if cache_status == "hit"
+            else "Backend: model generated",
         )
+        _store_build_profile(backend, backend_model, timings)
 
     else:
         backend_model = backend_rerun
@@ -130,6 +342,7 @@ def run_plan(
             comment="Backend: sending model to solver",
         )
 
+        solve_start = time.perf_counter()
         backend_results, opt = backend.solve_model(
             backend_model,
             solver=solver,
@@ -139,6 +352,12 @@ def run_plan(
             warmstart=warmstart,
             opt=opt,
         )
+        _add_to_solve_profile(
+            timings,
+            warmstart=warmstart,
+            solve_time=time.perf_counter() - solve_start,
+            **backend.get_solver_statistics(backend_results),
+        )
 
         log_time(
             logger,
@@ -155,7 +374,13 @@ def run_plan(
         )
 
         if termination in ["optimal", "feasible"]:
-            results = backend.get_result_array(backend_model, model_data)
+            results = backend.get_result_array(
+                backend_model,
+                model_data,
+                names=get_backend_result_names(
+                    run_config, required=REQUIRED_RESULTS[run_config["mode"]]
+                ),
+            )
             results.attrs["termination_condition"] = termination
             if "persistent" in opt.name and persistent is True:
                 results.attrs["objective_function_value"] = opt.get_model_attr("ObjVal")
@@ -172,6 +397,9 @@ def run_plan(
             comment="Backend: generated solution array",
         )
 
+    if cache_status is not None:
+        results.attrs["backend_cache"] = cache_status
+
     return results, backend_model, opt
 
 
@@ -209,12 +437,19 @@ def run_spores(
 
     # Define function to update "spores_score" after each iteration of the method
     def _update_spores_score(backend_model, cap_loc_score):
-        print("Updating node-technology spores scores")
-        cap_loc_score_dict = cap_loc_score.to_dict()
-
-        interface.update_pyomo_param(
-            backend_model, opt, "cost_energy_cap", cap_loc_score_dict
+        cap_loc_score_dict = _get_changed_spores_scores(
+            cap_loc_score, applied_spores_scores
+        )
+        print(
+            "Updating {} node-technology spores scores".format(len(cap_loc_score_dict))
         )
+        # A persistent solver is updated separately, with only those
+        # constraints and objective which refer to the updated scores
+        interface.update_param(
+            backend_model, None, "cost_energy_cap", cap_loc_score_dict
+        )
+        applied_spores_scores.update(cap_loc_score_dict)
+        updated_params.setdefault("cost_energy_cap", []).extend(cap_loc_score_dict)
 
     def _warn_on_infeasibility():
         return exceptions.warn(
@@ -223,14 +458,17 @@ def run_spores(
         )
 
     def _get_updated_spores_inputs(backend_model):
-        inputs = interface.access_pyomo_model_inputs(backend_model)
+        inputs = interface.access_model_inputs(backend_model)
         inputs_to_keep = ["cost_energy_cap"]
         return inputs[inputs_to_keep]
 
     def _combine_spores_results_and_inputs(
-        backend_model, results, spore_num, model_data=None
+        backend_model, results, spore_num, model_data=None, inputs=None
     ):
-        inputs_to_keep = _get_updated_spores_inputs(backend_model)
+        if inputs is None:
+            inputs_to_keep = _get_updated_spores_inputs(backend_model)
+        else:
+            inputs_to_keep = inputs
         for var_data in results.data_vars.values():
             if "is_result" not in var_data.attrs.keys():
                 var_data.attrs["is_result"] = 1
@@ -243,16 +481,26 @@ def run_spores(
         )
         return new_ds.assign_coords(spores=("spores", [spore_num]))
 
-    def _add_results_to_list(backend_model, spores_results, results, spore_num):
+    def _add_results_to_list(
+        backend_model, spores_results, results, spore_num, inputs=None
+    ):
         results_to_add = _combine_spores_results_and_inputs(
-            backend_model, results, spore_num
+            backend_model, results, spore_num, inputs=inputs
         )
+        if results_writer is not None:
+            apply_zero_threshold(
+                results_to_add.filter_by_attrs(is_result=1),
+                run_config.get("zero_threshold", 0),
+            )
+            results_writer.append(results_to_add)
+            # Only the attributes of the results are kept in memory
+            results_to_add = xr.Dataset(attrs=results_to_add.attrs)
         spores_results[spore_num] = results_to_add
 
-    def _save_spore(backend_model, results, spore_num, model_data=None):
+    def _save_spore(backend_model, results, spore_num, model_data=None, inputs=None):
         _path = spores_config["save_per_spore_path"].format(spore_num)
         new_ds = _combine_spores_results_and_inputs(
-            backend_model, results, spore_num, model_data
+            backend_model, results, spore_num, model_data, inputs=inputs
         )
         print(f"Saving SPORE {spore_num} to {_path}")
         io.save_netcdf(new_ds, _path)
@@ -261,7 +509,7 @@ def run_spores(
         slack_costs = model_data.group_cost_max.loc[
             {"group_names_cost_max": spores_config["slack_cost_group"]}
         ].dropna("costs")
-        interface.update_pyomo_param(
+        interface.update_param(
             backend_model,
             opt,
             "group_cost_max",
@@ -277,13 +525,65 @@ def run_spores(
         )
 
     def _update_to_spores_objective(backend_model):
-        interface.update_pyomo_param(
+        interface.update_param(
             backend_model,
             opt,
             "objective_cost_class",
             spores_config["objective_cost_class"],
         )
 
+    def _run_spores_batches(backend_model, cumulative_spores_scores, spores):
+        # Each batch of SPORES is solved in parallel, in worker processes which
+        # each hold a copy of the backend model, starting from alternative
+        # scores. All their capacity scores are then added at once.
+        rng = np.random.default_rng(spores_config.get("seed", None))
+        with ProcessPoolExecutor(
+            max_workers=spores_config.get("processes", None),
+            initializer=_init_spores_worker,
+            initargs=(backend_model, model_data, run_config, applied_spores_scores),
+        ) as executor:
+            for start in range(0, len(spores), batch_size):
+                batch = spores[start : start + batch_size]
+                print(f"Running SPORES {batch[0]} to {batch[-1]} in parallel")
+                futures = [
+                    executor.submit(_run_spores_candidate, scores)
+                    for scores in _get_spores_batch_scores(
+                        cumulative_spores_scores, len(batch), rng
+                    )
+                ]
+                infeasible = False
+                # Feasible SPORES of the batch are numbered consecutively
+                _spore = batch[0]
+                for future in futures:
+                    results, inputs = future.result()
+                    if results.attrs["termination_condition"] not in [
+                        "optimal",
+                        "feasible",
+                    ]:
+                        infeasible = True
+                        continue
+                    if spores_config["save_per_spore"] is True:
+                        _save_spore(backend_model, results, _spore, inputs=inputs)
+                    _add_results_to_list(
+                        backend_model, spores_results, results, _spore, inputs=inputs
+                    )
+                    cumulative_spores_scores += _cap_loc_score_default(
+                        results, init_spores_scores.index.droplevel("costs")
+                    )
+                    _spore += 1
+                _update_spores_score(backend_model, cumulative_spores_scores)
+                if infeasible:
+                    _warn_on_infeasibility()
+                    break
+                log_time(
+                    logger,
+                    timings,
+                    "run_solution_returned",
+                    time_since_run_start=True,
+                    comment="Backend: generated solution arrays for the SPORES "
+                    f"{batch[0]} to {batch[-1]}",
+                )
+
     def _initialise_backend_model():
         if backend_rerun:
             kwargs = {"backend_rerun": backend_rerun, "opt": opt}
@@ -346,12 +646,28 @@ def run_spores(
         .to_series()
         .dropna()
     )
+    # Scores as last applied to the backend model, and the items of
+    # `cost_energy_cap` updated since the last run
+    applied_spores_scores = init_spores_scores.to_dict()
+    updated_params = {}
     spores_results = {}
 
     results, backend_model, opt = _initialise_backend_model()
     if build_only:
         return results, backend_model, opt
 
+    results_path = spores_config.get("results_path", None)
+    if results_path is not None:
+        # Inputs which are the same for all SPORES are only written once
+        results_writer = io.NetCDFSporesWriter(
+            results_path,
+            model_data.filter_by_attrs(is_result=0).drop_vars(
+                ["cost_energy_cap", "spores"], errors="ignore"
+            ),
+        )
+    else:
+        results_writer = None
+
     init_spore = _initialise_spores_number()
 
     if spores_config["skip_cost_op"]:
@@ -384,67 +700,205 @@ def run_spores(
         return results, backend_model, opt
 
     # Iterate over the number of SPORES requested by the user
-    for _spore in range(init_spore + 1, spores_config["spores_number"] + 1):
-        print(f"Running SPORES {_spore}")
-        if opt is not None and "persistent" in opt.type:
-            opt = interface.regenerate_persistent_pyomo_solver(
-                backend_model,
-                opt,
-                obj=True,
-                constraints={
-                    "cost_investment_constraint": cumulative_spores_scores.index,
-                    "cost_constraint": cumulative_spores_scores.index,
-                },
+    spores = range(init_spore + 1, spores_config["spores_number"] + 1)
+    batch_size = spores_config.get("batch_size", None) or 1
+    if batch_size > 1:
+        _run_spores_batches(backend_model, cumulative_spores_scores, spores)
+    else:
+        for _spore in spores:
+            print(f"Running SPORES {_spore}")
+            if opt is not None and "persistent" in opt.name:
+                opt, num_constraints, _ = interface.update_persistent_solver(
+                    backend_model, opt, updated_params
+                )
+                logger.debug(
+                    "Updated {} constraints in the persistent solver".format(
+                        num_constraints
+                    )
+                )
+            else:
+                opt = None
+            updated_params = {}
+            results, backend_model, opt = run_plan(
+                model_data,
+                run_config,
+                timings,
+                backend,
+                build_only=False,
+                backend_rerun=backend_model,
+                allow_warmstart=True,
+                persistent=True,
+                opt=opt,
             )
-        else:
-            opt = None
-        results, backend_model, opt = run_plan(
-            model_data,
-            run_config,
-            timings,
-            backend,
-            build_only=False,
-            backend_rerun=backend_model,
-            allow_warmstart=False,
-            persistent=True,
-            opt=opt,
-        )
 
-        if results.attrs["termination_condition"] in ["optimal", "feasible"]:
-            results.attrs["objective_function_value"] = backend_model.obj()
-            if spores_config["save_per_spore"] is True:
-                _save_spore(backend_model, results, _spore)
-            # Storing results and scores in the specific dictionaries
-            _add_results_to_list(backend_model, spores_results, results, _spore)
-            print(f"Updating capacity scores from {cumulative_spores_scores.sum()}...")
-            cumulative_spores_scores += _cap_loc_score_default(
-                results, init_spores_scores.index.droplevel("costs")
+            if results.attrs["termination_condition"] in ["optimal", "feasible"]:
+                results.attrs["objective_function_value"] = backend_model.obj()
+                if spores_config["save_per_spore"] is True:
+                    _save_spore(backend_model, results, _spore)
+                # Storing results and scores in the specific dictionaries
+                _add_results_to_list(backend_model, spores_results, results, _spore)
+                print(
+                    "Updating capacity scores from "
+                    f"{cumulative_spores_scores.sum()}..."
+                )
+                cumulative_spores_scores += _cap_loc_score_default(
+                    results, init_spores_scores.index.droplevel("costs")
+                )
+                print(f"... to {cumulative_spores_scores.sum()}")
+                # Update "spores_score" based on previous iteration
+                _update_spores_score(backend_model, cumulative_spores_scores)
+            else:
+                _warn_on_infeasibility()
+                break
+            log_time(
+                logger,
+                timings,
+                "run_solution_returned",
+                time_since_run_start=True,
+                comment=f"Backend: generated solution array for the SPORE {_spore}",
             )
-            print(f"... to {cumulative_spores_scores.sum()}")
-            # Update "spores_score" based on previous iteration
-            _update_spores_score(backend_model, cumulative_spores_scores)
-        else:
-            _warn_on_infeasibility()
-            break
-        log_time(
-            logger,
-            timings,
-            "run_solution_returned",
-            time_since_run_start=True,
-            comment=f"Backend: generated solution array for the SPORE {_spore}",
+
+    if results_writer is not None:
+        results = results_writer.open_dataset()
+        results.attrs = next(iter(spores_results.values())).attrs
+    else:
+        results = xr.concat(
+            spores_results.values(), dim=pd.Index(spores_results.keys(), name="spores")
         )
 
-    results = xr.concat(
-        spores_results.values(), dim=pd.Index(spores_results.keys(), name="spores")
+    return results, backend_model, opt
+
+
+def _get_spores_batch_scores(scores, batch_size, rng):
+    """
+    Get `batch_size` alternative spores scores from the cumulative spores
+    scores `scores` (a pandas Series), from which to generate a batch of
+    SPORES in parallel.
+
+    The first are the cumulative scores themselves. For each of the others,
+    the scores of one of `batch_size - 1` random groups of the node-technology
+    combinations scored so far are doubled, so that each SPORE of the batch
+    moves away from a different part of the previous SPORES.
+    """
+    batch = [scores]
+    scored = scores.index[scores > 0]
+    groups = np.array_split(rng.permutation(len(scored)), max(batch_size - 1, 1))
+    for group in groups[: batch_size - 1]:
+        _scores = scores.copy()
+        _scores.loc[scored[group]] *= 2
+        batch.append(_scores)
+    return batch
+
+
+# State of a SPORES worker process, see `_init_spores_worker`
+_spores_worker = {}
+
+
+def _init_spores_worker(backend_model, model_data, run_config, applied_scores):
+    """
+    Initialise a worker process in which to generate SPORES with a copy of
+    `backend_model`, whose spores scores are currently `applied_scores`.
+    """
+    _spores_worker.update(
+        backend_model=backend_model,
+        model_data=model_data,
+        run_config=run_config,
+        applied_scores=dict(applied_scores),
+        opt=None,
     )
 
-    return results, backend_model, opt
+
+def _run_spores_candidate(scores):
+    """
+    Generate a SPORE in a worker process (see `_init_spores_worker`), with
+    the spores scores `scores`.
+
+    Returns the results and the updated `cost_energy_cap` input.
+    """
+    backend_model = _spores_worker["backend_model"]
+    run_config = _spores_worker["run_config"]
+    interface = INTERFACE[run_config.backend]
+
+    changed_scores = _get_changed_spores_scores(
+        scores, _spores_worker["applied_scores"]
+    )
+    interface.update_param(backend_model, None, "cost_energy_cap", changed_scores)
+    _spores_worker["applied_scores"].update(changed_scores)
+
+    opt = _spores_worker["opt"]
+    if opt is not None and "persistent" in opt.name:
+        opt, _, _ = interface.update_persistent_solver(
+            backend_model, opt, {"cost_energy_cap": list(changed_scores)}
+        )
+    else:
+        opt = None
+    results, _, _spores_worker["opt"] = run_plan(
+        _spores_worker["model_data"],
+        run_config,
+        {},
+        BACKEND[run_config.backend],
+        build_only=False,
+        backend_rerun=backend_model,
+        allow_warmstart=True,
+        persistent=True,
+        opt=opt,
+    )
+    if results.attrs["termination_condition"] in ["optimal", "feasible"]:
+        results.attrs["objective_function_value"] = backend_model.obj()
+
+    inputs = interface.access_model_inputs(backend_model)
+    return results, inputs[["cost_energy_cap"]]
+
+
+def _get_changed_spores_scores(scores, applied_scores):
+    """
+    Get those items of the pandas Series `scores` whose values differ from
+    the values in the dict `applied_scores`, as a dict.
+    """
+    return {
+        idx: score
+        for idx, score in scores.items()
+        if idx not in applied_scores or applied_scores[idx] != score
+    }
 
 
-def run_operate(model_data, run_config, timings, backend, build_only):
+class _SerialExecutor:
+    """
+    Runs functions as soon as they are submitted, in place of a thread pool.
+    """
+
+    def submit(self, func, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(func(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self, wait=True):
+        pass
+
+
+def run_operate(
+    model_data,
+    run_config,
+    timings,
+    interface,
+    backend,
+    build_only,
+    resume=False,
+    windows=None,
+):
     """
     For use when mode is 'operate', to allow the model to be built, edited, and
-    iteratively run within Pyomo.
+    iteratively run within the backend.
+
+    If `resume` is True, the run continues from its last checkpoint (see
+    `run.operation.checkpoint`), if there is one.
+
+    If `windows` is given, only that range of optimisation windows is run,
+    starting from the model data carried over between windows (e.g.
+    `storage_initial`) as currently in `model_data`.
 
     """
     log_time(
@@ -502,14 +956,20 @@ def run_operate(model_data, run_config, timings, backend, build_only):
             cap.attrs["operate_param"] = 1
         model_data.update(caps)
 
-    comments, warnings, errors = checks.check_operate_params(model_data)
-    exceptions.print_warnings_and_raise_errors(warnings=warnings, errors=errors)
+    # Blocks of windows run in parallel start from model data that has already
+    # been checked
+    if windows is None:
+        comments, warnings, errors = checks.check_operate_params(model_data)
+        exceptions.print_warnings_and_raise_errors(warnings=warnings, errors=errors)
 
     # Initialize our variables
     solver = run_config["solver"]
     solver_io = run_config.get("solver_io", None)
     solver_options = run_config.get("solver_options", None)
     save_logs = run_config.get("save_logs", None)
+    result_names = get_backend_result_names(
+        run_config, required=REQUIRED_RESULTS["operate"]
+    )
     window = run_config["operation"]["window"]
     horizon = run_config["operation"]["horizon"]
     window_to_horizon = horizon - window
@@ -551,14 +1011,133 @@ def run_operate(model_data, run_config, timings, backend, build_only):
     result_array = []
     # track whether each iteration finds an optimal solution or not
     terminations = []
+    # With a persistent solver, one solver instance is kept for all windows
+    # that share a backend model. Between windows, it is only updated with
+    # the components that refer to updated parameters. Persistent solvers are
+    # only available with the Pyomo backend.
+    persistent = "persistent" in solver and run_config["backend"] == "pyomo"
+    _opt = None
+    updated_params = {}
+    window_profile = []
 
     if build_only:
         iterations = [0]
+    elif windows is not None:
+        iterations = windows
     else:
         iterations = range(len(window_starts))
+    last_window = len(window_starts) - 1
+
+    # Contiguous blocks of windows can be run in parallel processes
+    parallel_config = run_config["operation"].get("parallel", None) or {}
+    if (parallel_config.get("blocks", None) or 1) > 1 and not (
+        build_only or windows is not None
+    ):
+        if resume:
+            raise exceptions.ModelError(
+                "Operate mode runs in parallel blocks cannot be resumed."
+            )
+        return _run_operate_parallel(
+            model_data, run_config, timings, len(window_starts), parallel_config
+        )
+
+    # Periodically save the model data carried over between windows and the
+    # results so far, from which the run can be resumed if it is stopped
+    checkpoint_config = run_config["operation"].get("checkpoint", None) or {}
+    checkpoint_frequency = checkpoint_config.get("frequency", 1)
+    checkpoint = None
+    num_timesteps = 0
+    if checkpoint_config.get("path", None) is not None and not build_only:
+        checkpoint = OperateCheckpoint(
+            checkpoint_config["path"], model_data, run_config
+        )
+        saved = checkpoint.load() if resume else None
+        if saved is not None:
+            for k, v in saved["carried_over"].data_vars.items():
+                model_data[k] = v.assign_attrs(model_data[k].attrs)
+            result_array = saved["results"]
+            terminations = saved["terminations"]
+            num_timesteps = saved["num_timesteps"]
+            iterations = range(saved["window"], len(window_starts))
+            log_time(
+                logger,
+                timings,
+                "run_resumed",
+                comment="Backend: resuming run from the checkpoint after "
+                "iteration {}".format(saved["window"]),
+            )
+        else:
+            if resume:
+                logger.info(
+                    "Backend: no checkpoint to resume from in `{}`, starting "
+                    "from the first iteration".format(checkpoint_config["path"])
+                )
+            checkpoint.clear()
+    elif resume:
+        raise exceptions.ModelError(
+            "Cannot resume an operate mode run without checkpoints. "
+            "Set `run.operation.checkpoint.path` to save them."
+        )
+    checkpointed_results = len(result_array)
+
+    # Append each window's result to file instead, to not keep them in memory
+    results_path = run_config["operation"].get("results_path", None)
+    if results_path is not None and not build_only:
+        results_writer = io.NetCDFTimestepWriter(results_path, num_timesteps)
+    else:
+        results_writer = None
+
+    # While a window is being solved, the timeseries parameter values of the
+    # next window are prepared and the results of the previous window are
+    # processed in background threads. Results are processed by a single
+    # thread, which keeps them (and checkpoints) in window order.
+    if run_config["operation"].get("pipeline", True) and not build_only:
+        prepare_executor = ThreadPoolExecutor(max_workers=1)
+        output_executor = ThreadPoolExecutor(max_workers=1)
+    else:
+        prepare_executor = output_executor = _SerialExecutor()
+    # Timeseries data is not updated during the run, so it can be read by a
+    # background thread while the model data is being updated
+    timeseries_data = model_data[timeseries_data_vars]
+    prepared = {}
+    output_future = None
+
+    def _is_update_window(i):
+        return (
+            0 < i <= len(horizon_ends) - 1 and i != iterations[0] and i != last_window
+        )
+
+    def _prepare_window(i, backend_model):
+        timesteps = slice(window_starts.index[i], horizon_ends.index[i])
+        window_model_data = timeseries_data.loc[dict(timesteps=timesteps)]
+        param_values = backend.get_timeseries_params(
+            backend_model, window_model_data, timeseries_data_vars
+        )
+        return window_model_data, param_values
+
+    def _process_results(i, _results, carried_over, terminations):
+        nonlocal checkpointed_results
+        if results_writer is not None:
+            # Applied before writing, since results read back from file
+            # are not held in memory to be updated later
+            apply_zero_threshold(_results, run_config.get("zero_threshold", 0))
+            results_writer.append(_results)
+        else:
+            result_array.append(_results)
+
+        if carried_over is not None:
+            checkpoint.save(
+                i + 1,
+                carried_over,
+                terminations,
+                results=result_array[checkpointed_results:],
+                num_timesteps=getattr(results_writer, "num_timesteps", 0),
+            )
+            checkpointed_results = len(result_array)
 
     for i in iterations:
         start_timestep = window_starts.index[i]
+        update_start = time.perf_counter()
 
         # Build full model in first instance
         if i == 0:
@@ -575,10 +1154,12 @@ def run_operate(model_data, run_config, timings, backend, build_only):
             )
 
             backend_model = backend.generate_model(window_model_data)
+            _store_build_profile(backend, backend_model, timings)
+            _opt = None
 
         # Build the full model in the last instance(s),
         # where the number of timesteps may be less than the horizon length
-        elif i > len(horizon_ends) - 1 or i == iterations[-1]:
+        elif i > len(horizon_ends) - 1 or i == last_window:
             warmstart = False
             end_timestep = window_ends.index[i]
             timesteps = slice(start_timestep, end_timestep)
@@ -597,14 +1178,32 @@ def run_operate(model_data, run_config, timings, backend, build_only):
             )
 
             backend_model = backend.generate_model(window_model_data)
+            _opt = None
 
-        # Update relevent Pyomo Params in intermediate instances
-        else:
-            warmstart = True
+        # Build the model over the horizon of the first window after resuming
+        # from a checkpoint, to then be updated as in the intermediate instances
+        elif i == iterations[0]:
+            warmstart = False
             end_timestep = horizon_ends.index[i]
             timesteps = slice(start_timestep, end_timestep)
             window_model_data = model_data.loc[dict(timesteps=timesteps)]
 
+            log_time(
+                logger,
+                timings,
+                "model_gen_{}".format(i + 1),
+                comment="Backend: iteration {}: generating model to resume "
+                "the run".format(i + 1),
+            )
+
+            backend_model = backend.generate_model(window_model_data)
+            _opt = None
+
+        # Update relevent Pyomo Params in intermediate instances
+        else:
+            warmstart = True
+            window_model_data, param_values = prepared.pop(i).result()
+
             log_time(
                 logger,
                 timings,
@@ -613,23 +1212,40 @@ def run_operate(model_data, run_config, timings, backend, build_only):
                     i + 1
                 ),
             )
-            # Pyomo model sees the same timestamps each time, we just change the
+            # Backend model sees the same timestamps each time, we just change the
             # values associated with those timestamps
-            for var in timeseries_data_vars:
-                # New values
-                var_series = (
-                    window_model_data[var].to_series().dropna().replace("inf", np.inf)
-                )
-                # Same timestamps
-                var_series.index = backend_model.__calliope_model_data["data"][
-                    var
-                ].keys()
-                var_dict = var_series.to_dict()
-                # Update pyomo Param with new dictionary
+            _updated_params = backend.update_timeseries_params(
+                backend_model, window_model_data, timeseries_data_vars, param_values
+            )
+            for param, indices in (_updated_params or {}).items():
+                updated_params.setdefault(param, []).extend(indices)
+            # The solution of the previous window is used as a warm start,
+            # with the timesteps it shares with this window aligned
+            timestep_index = model_data.timesteps.to_index()
+            backend.shift_solution(
+                backend_model,
+                timestep_index.get_loc(start_timestep)
+                - timestep_index.get_loc(window_starts.index[i - 1]),
+            )
 
-                getattr(backend_model, var).store_values(var_dict)
+        if i + 1 in iterations and _is_update_window(i + 1):
+            prepared[i + 1] = prepare_executor.submit(
+                _prepare_window, i + 1, backend_model
+            )
 
         if not build_only:
+            num_constraints, num_variables = np.nan, np.nan
+            if persistent and _opt is not None:
+                (
+                    _opt,
+                    num_constraints,
+                    num_variables,
+                ) = interface.update_persistent_solver(
+                    backend_model, _opt, updated_params
+                )
+            updated_params = {}
+            update_time = time.perf_counter() - update_start
+
             log_time(
                 logger,
                 timings,
@@ -638,7 +1254,8 @@ def run_operate(model_data, run_config, timings, backend, build_only):
                 comment="Backend: iteration {}: sending model to solver".format(i + 1),
             )
             # After iteration 1, warmstart = True, which should speed up the process
-            # Note: Warmstart isn't possible with GLPK (dealt with later on)
+            # Note: Warmstart isn't possible with all solvers (dealt with later on)
+            solve_start = time.perf_counter()
             _results, _opt = backend.solve_model(
                 backend_model,
                 solver=solver,
@@ -646,6 +1263,26 @@ def run_operate(model_data, run_config, timings, backend, build_only):
                 solver_options=solver_options,
                 save_logs=save_logs,
                 warmstart=warmstart,
+                opt=_opt if persistent else None,
+            )
+            solve_time = time.perf_counter() - solve_start
+            window_profile.append(
+                {
+                    "window": i + 1,
+                    "update_time": update_time,
+                    "solve_time": solve_time,
+                    "updated_constraints": num_constraints,
+                    "updated_variables": num_variables,
+                    "warmstart": warmstart,
+                    **backend.get_solver_statistics(_results),
+                }
+            )
+            logger.debug(
+                "Backend: iteration {}: {:.2f}s to generate or update the model, "
+                "{:.2f}s to solve it ({} constraints and {} variable bounds "
+                "updated in the solver)".format(
+                    i + 1, update_time, solve_time, num_constraints, num_variables
+                )
             )
 
             log_time(
@@ -659,7 +1296,9 @@ def run_operate(model_data, run_config, timings, backend, build_only):
             _termination = backend.load_results(backend_model, _results, _opt)
             terminations.append(_termination)
             if _termination in ["optimal", "feasible"]:
-                _results = backend.get_result_array(backend_model, model_data)
+                _results = backend.get_result_array(
+                    backend_model, model_data, names=result_names
+                )
             else:
                 _results = xr.Dataset()
             # We give back the actual timesteps for this iteration and take a slice
@@ -670,7 +1309,6 @@ def run_operate(model_data, run_config, timings, backend, build_only):
             # the window_to_horizon timesteps. In the last window(s), optimistion will
             # only be occurring over a window length anyway
             _results = _results.loc[dict(timesteps=slice(None, window_ends.index[i]))]
-            result_array.append(_results)
 
             # Set up initial storage for the next iteration
             if (
@@ -685,9 +1323,11 @@ def run_operate(model_data, run_config, timings, backend, build_only):
                 model_data["storage_initial"].loc[
                     storage_initial.coords
                 ] = storage_initial.values
-                backend_model.storage_initial.store_values(
-                    storage_initial.to_series().dropna().to_dict()
+                storage_initial_values = storage_initial.to_series().dropna().to_dict()
+                interface.update_param(
+                    backend_model, None, "storage_initial", storage_initial_values
                 )
+                updated_params["storage_initial"] = list(storage_initial_values)
 
             # Set up total operated units for the next iteration
             if (
@@ -695,9 +1335,31 @@ def run_operate(model_data, run_config, timings, backend, build_only):
             ).any() and _termination in ["optimal", "feasible"]:
                 operated_units = _results.operating_units.sum("timesteps").astype(int)
                 model_data["operated_units"].loc[{}] += operated_units.values
-                backend_model.operated_units.store_values(
-                    operated_units.to_series().dropna().to_dict()
+                operated_units_values = operated_units.to_series().dropna().to_dict()
+                interface.update_param(
+                    backend_model, None, "operated_units", operated_units_values
                 )
+                updated_params["operated_units"] = list(operated_units_values)
+
+            # Checkpoints are not needed after the last iteration, as there is
+            # nothing left to resume
+            if (
+                checkpoint is not None
+                and (i + 1) % checkpoint_frequency == 0
+                and i != iterations[-1]
+            ):
+                carried_over = model_data[
+                    [k for k in CARRIED_OVER if k in model_data]
+                ].copy(deep=True)
+            else:
+                carried_over = None
+
+            # Only one window's results are waiting to be processed at a time
+            if output_future is not None:
+                output_future.result()
+            output_future = output_executor.submit(
+                _process_results, i, _results, carried_over, list(terminations)
+            )
 
             log_time(
                 logger,
@@ -707,19 +1369,25 @@ def run_operate(model_data, run_config, timings, backend, build_only):
                 comment="Backend: iteration {}: generated solution array".format(i + 1),
             )
 
+    if output_future is not None:
+        output_future.result()
+    prepare_executor.shutdown()
+    output_executor.shutdown()
+
     if build_only:
         results = xr.Dataset()
         _opt = None
     else:
         # Concatenate results over the timestep dimension to get a single
         # xarray Dataset of interest
-        results = xr.concat(result_array, dim="timesteps")
-        if all(i == "optimal" for i in terminations):
-            results.attrs["termination_condition"] = "optimal"
-        elif all(i in ["optimal", "feasible"] for i in terminations):
-            results.attrs["termination_condition"] = "feasible"
+        if results_writer is not None:
+            results = results_writer.open_dataset(model_data.timesteps.values)
         else:
-            results.attrs["termination_condition"] = ",".join(terminations)
+            results = xr.concat(result_array, dim="timesteps")
+        timings["operate_window_profile"] = pd.DataFrame(window_profile)
+        results.attrs["termination_condition"] = _get_termination_condition(
+            terminations
+        )
 
         log_time(
             logger,
@@ -730,3 +1398,222 @@ def run_operate(model_data, run_config, timings, backend, build_only):
         )
 
     return results, backend_model, _opt
+
+
+def _get_termination_condition(terminations):
+    if all(i == "optimal" for i in terminations):
+        return "optimal"
+    elif all(i in ["optimal", "feasible"] for i in terminations):
+        return "feasible"
+    else:
+        return ",".join(terminations)
+
+
+def _run_operate_parallel(model_data, run_config, timings, num_windows, config):
+    """
+    Run operate mode in contiguous blocks of optimisation windows, solved in
+    parallel processes.
+
+    Each block starts from an estimate of the model data carried over from the
+    previous block (e.g. `storage_initial`). These are estimated by first
+    running the `config.warmup_windows` windows before each block, in parallel,
+    starting from the values at the start of the run, and discarding their
+    results. Once all blocks have been run, blocks whose estimate differs
+    from the values at the end of the previous block by more than
+    `config.tolerance` are run again, starting from those values. This is
+    repeated until all differences are within the tolerance or there have been
+    `config.max_reconciliations` of these passes. The largest remaining
+    difference is returned as the `operate_boundary_mismatch` attribute of the
+    results.
+    """
+    num_blocks = min(config["blocks"], num_windows)
+    tolerance = config.get("tolerance", None) or 0
+    max_reconciliations = config.get("max_reconciliations", None)
+    if max_reconciliations is None:
+        # Enough for all blocks to start from the exact values
+        max_reconciliations = num_blocks - 1
+    blocks = [
+        range(i[0], i[-1] + 1)
+        for i in np.array_split(np.arange(num_windows), num_blocks)
+    ]
+
+    if run_config["operation"].get("checkpoint", {}).get("path", None) is not None:
+        exceptions.warn(
+            "Checkpoints are not saved when running operate mode in parallel blocks."
+        )
+    block_run_config = run_config.copy()
+    block_run_config.set_key("operation.checkpoint.path", None)
+    block_run_config.set_key("operation.results_path", None)
+
+    initial = model_data[[k for k in CARRIED_OVER if k in model_data]].copy(deep=True)
+    estimates = [initial] * num_blocks
+    block_results = [None] * num_blocks
+    block_ends = [None] * num_blocks
+    mismatches = [0.0] * num_blocks
+    profile = []
+    warmup_windows = config.get("warmup_windows", None) or 0
+    warmup_blocks = {
+        k: range(max(blocks[k][0] - warmup_windows, 0), blocks[k][0])
+        for k in range(1, num_blocks)
+    }
+
+    to_run = list(range(num_blocks))
+    # The model data is sent to each worker process once, and only the windows
+    # and carried over estimates of each block are sent to run it
+    with ProcessPoolExecutor(
+        max_workers=config.get("processes", None),
+        initializer=_init_operate_worker,
+        initargs=(model_data, block_run_config),
+    ) as executor:
+        if warmup_windows > 0 and initial.data_vars:
+            log_time(
+                logger,
+                timings,
+                "model_run_blocks_warmup",
+                time_since_run_start=True,
+                comment="Backend: running the {} windows before each block to "
+                "estimate the values carried over to it".format(warmup_windows),
+            )
+            futures = {
+                k: executor.submit(_run_operate_block, windows, initial)
+                for k, windows in warmup_blocks.items()
+            }
+            for k, future in futures.items():
+                _, estimates[k], block_time = future.result()
+                profile.append(
+                    {
+                        "reconciliation": 0,
+                        "block": k,
+                        "first_window": warmup_blocks[k][0] + 1,
+                        "last_window": warmup_blocks[k][-1] + 1,
+                        "time": block_time,
+                        "warmup": True,
+                    }
+                )
+
+        for reconciliation in range(max_reconciliations + 1):
+            log_time(
+                logger,
+                timings,
+                "model_run_blocks_{}".format(reconciliation + 1),
+                time_since_run_start=True,
+                comment="Backend: running {} of {} blocks of windows in "
+                "parallel".format(len(to_run), num_blocks),
+            )
+            futures = {
+                k: executor.submit(_run_operate_block, blocks[k], estimates[k])
+                for k in to_run
+            }
+            for k, future in futures.items():
+                block_results[k], block_ends[k], block_time = future.result()
+                profile.append(
+                    {
+                        "reconciliation": reconciliation,
+                        "block": k,
+                        "first_window": blocks[k][0] + 1,
+                        "last_window": blocks[k][-1] + 1,
+                        "time": block_time,
+                        "warmup": False,
+                    }
+                )
+
+            mismatches = [0.0] + [
+                _get_boundary_mismatch(estimates[k], block_ends[k - 1])
+                for k in range(1, num_blocks)
+            ]
+            to_run = [k for k in range(num_blocks) if mismatches[k] > tolerance]
+            if not to_run or reconciliation == max_reconciliations:
+                break
+            for k in to_run:
+                estimates[k] = block_ends[k - 1]
+
+    mismatch = max(mismatches)
+    timings["operate_block_profile"] = pd.DataFrame(profile)
+    log_time(
+        logger,
+        timings,
+        "run_solution_returned",
+        time_since_run_start=True,
+        comment="Backend: generated full solution array, with a maximum "
+        "mismatch in values carried over between blocks of {}".format(mismatch),
+    )
+    if mismatch > tolerance:
+        exceptions.warn(
+            "Values carried over between blocks of operate mode windows differ "
+            "by up to {}, more than the tolerance of {}. Increase "
+            "`run.operation.parallel.max_reconciliations` to reduce this "
+            "difference.".format(mismatch, tolerance)
+        )
+
+    results_path = run_config["operation"].get("results_path", None)
+    if results_path is not None:
+        results_writer = io.NetCDFTimestepWriter(results_path)
+        for _results in block_results:
+            apply_zero_threshold(_results, run_config.get("zero_threshold", 0))
+            results_writer.append(_results)
+        results = results_writer.open_dataset(model_data.timesteps.values)
+    else:
+        results = xr.concat(block_results, dim="timesteps")
+
+    results.attrs["termination_condition"] = _get_termination_condition(
+        [
+            i
+            for _results in block_results
+            for i in _results.attrs["termination_condition"].split(",")
+        ]
+    )
+    results.attrs["operate_boundary_mismatch"] = mismatch
+
+    return results, None, None
+
+
+# State of an operate mode worker process, see `_init_operate_worker`
+_operate_worker = {}
+
+
+def _init_operate_worker(model_data, run_config):
+    """
+    Initialise a worker process in which to run blocks of operate mode windows
+    with a copy of `model_data`.
+    """
+    _operate_worker.update(model_data=model_data, run_config=run_config)
+
+
+def _run_operate_block(windows, carried_over):
+    """
+    Run a contiguous block of operate mode windows in a worker process (see
+    `_init_operate_worker`), starting from the `carried_over` model data.
+
+    Returns the results, the model data carried over at the end of the block
+    and the time taken.
+    """
+    start = time.perf_counter()
+    # Each block starts from the model data of the worker process, with only
+    # the carried over values replaced
+    model_data = _operate_worker["model_data"].copy()
+    run_config = _operate_worker["run_config"]
+    # The carried over values are updated in place while running the windows,
+    # so they must not share their arrays with any other block
+    for k, v in carried_over.data_vars.items():
+        model_data[k] = v.copy(deep=True).assign_attrs(model_data[k].attrs)
+    results, _, _ = run_operate(
+        model_data,
+        run_config,
+        {},
+        interface=INTERFACE[run_config.backend],
+        backend=BACKEND[run_config.backend],
+        build_only=False,
+        windows=windows,
+    )
+    return (
+        results,
+        model_data[list(carried_over.data_vars)],
+        time.perf_counter() - start,
+    )
+
+
+def _get_boundary_mismatch(estimate, actual):
+    mismatches = [
+        abs(actual[k] - estimate[k]).max(skipna=True).item() for k in estimate.data_vars
+    ]
+    return max([i for i in mismatches if not np.isnan(i)], default=0.0)
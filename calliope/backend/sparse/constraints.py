@@ -0,0 +1,829 @@
+"""
+Copyright (C) since 2013 Calliope contributors listed in AUTHORS.
+Licensed under the Apache 2.0 License (see LICENSE file).
+
+constraints.py
+~~~~~~~~~~~~~~
+
+Vectorised equivalents of the Pyomo backend constraint and expression rules
+(:mod:`calliope.backend.pyomo.constraints`). Rather than being called once per
+index item, each rule is called once per component and returns arrays over the
+full set of model dimensions; only the elements in the component's subset are
+then added to the backend model.
+
+Expression rules (`<name>_expression`) return a LinearExpression.
+Constraint rules (`<name>_constraint`) return a list of
+`(LinearExpression, lower bound, upper bound)` tuples. Elements with neither a
+lower nor an upper bound are not added to the backend model, which is the
+equivalent of `po.Constraint.Skip`.
+
+"""
+
+import numpy as np
+import xarray as xr
+
+from calliope.backend.sparse.expression import as_expression
+from calliope import exceptions
+
+INF = np.inf
+
+
+def _select(cond, if_true, if_false):
+    """Elementwise choice between two (linear) expressions."""
+    cond = xr.DataArray(cond).astype(bool)
+    return as_expression(if_true).where(cond) + as_expression(if_false).where(~cond)
+
+
+def _inverse(param):
+    """1 / param, with zero where param is zero (to avoid infinite coefficients)."""
+    return (1 / param.where(param != 0)).fillna(0)
+
+
+def _is_truthy(param):
+    return param.notnull() & (param != 0)
+
+
+def _carrier_mask(backend_model, tier):
+    return backend_model.get_param("carrier").sel(carrier_tiers=tier).notnull()
+
+
+def _inheritance_endswith(backend_model, suffix):
+    inheritance = backend_model.inputs.inheritance.fillna("")
+    return xr.DataArray(
+        [i.endswith(suffix) for i in inheritance.values],
+        dims=inheritance.dims,
+        coords=inheritance.coords,
+    )
+
+
+def _param_equals(backend_model, name, value):
+    param = backend_model.get_param(name)
+    return xr.DataArray(param.values == value, dims=param.dims, coords=param.coords)
+
+
+def _timestep_weight(backend_model):
+    time_res = backend_model.get_param("timestep_resolution")
+    weights = backend_model.get_param("timestep_weights")
+    return (time_res * weights).sum().item() / 8760
+
+
+def _first_timestep(backend_model):
+    timesteps = backend_model.inputs.timesteps
+    return xr.DataArray(
+        np.arange(len(timesteps)) == 0,
+        dims=("timesteps",),
+        coords={"timesteps": timesteps},
+    )
+
+
+def _previous_timestep_positions(backend_model, cyclic=True):
+    """
+    Integer position of the previous timestep of each timestep.
+    The first timestep points to the last timestep, and the first timestep of
+    each cluster to the last timestep of that cluster.
+    """
+    timesteps = backend_model.inputs.timesteps
+    previous = np.arange(len(timesteps)) - 1
+    previous[0] = len(timesteps) - 1
+    if cyclic and "clusters" in backend_model.inputs.dims:
+        is_first = backend_model.inputs.lookup_cluster_first_timestep.values == 1
+        last = backend_model.inputs.lookup_cluster_last_timestep.values[is_first]
+        previous[is_first] = timesteps.to_index().get_indexer(last)
+    return xr.DataArray(previous, dims=("timesteps",))
+
+
+def _shift_timesteps(positions, timesteps):
+    def _shift(da):
+        if "timesteps" in da.dims:
+            return da.isel(timesteps=positions).assign_coords(timesteps=timesteps)
+        else:
+            return da
+
+    return _shift
+
+
+def _storage_previous_step(backend_model):
+    timesteps = backend_model.inputs.timesteps
+    shift = _shift_timesteps(_previous_timestep_positions(backend_model), timesteps)
+    storage_loss = backend_model.get_param("storage_loss")
+    time_resolution = shift(backend_model.get_param("timestep_resolution"))
+
+    storage_previous_step = (
+        backend_model.get_variable("storage").map(shift)
+        * (1 - storage_loss) ** time_resolution
+    )
+    if "storage_inter_cluster" in backend_model.variables:
+        cluster_first = backend_model.inputs.lookup_cluster_first_timestep == 1
+        storage_previous_step = storage_previous_step.where(~cluster_first)
+    if not backend_model.run_config["cyclic_storage"]:
+        storage_previous_step = _select(
+            _first_timestep(backend_model),
+            backend_model.get_variable("storage_cap")
+            * backend_model.get_param("storage_initial"),
+            storage_previous_step,
+        )
+    return storage_previous_step
+
+
+def _available_resource(backend_model):
+    resource = backend_model.get_param("resource") * backend_model.get_param(
+        "resource_scale"
+    )
+    return _select(
+        _param_equals(backend_model, "resource_unit", "energy_per_area"),
+        backend_model.get_variable("resource_area") * resource.fillna(0),
+        _select(
+            _param_equals(backend_model, "resource_unit", "energy_per_cap"),
+            backend_model.get_variable("energy_cap") * resource.fillna(0),
+            resource,
+        ),
+    )
+
+
+def _remote(backend_model, expression):
+    """Index an expression over (nodes, techs) by the remote end of each link."""
+    remote_nodes = backend_model.inputs.link_remote_nodes
+    remote_techs = backend_model.inputs.link_remote_techs
+    nodes = backend_model.inputs.nodes.to_index()
+    techs = backend_model.inputs.techs.to_index()
+    is_link = remote_nodes.notnull() & remote_techs.notnull()
+    node_positions = xr.DataArray(
+        nodes.get_indexer(remote_nodes.fillna(nodes[0]).values.ravel()).reshape(
+            remote_nodes.shape
+        ),
+        dims=remote_nodes.dims,
+    )
+    tech_positions = xr.DataArray(
+        techs.get_indexer(remote_techs.fillna(techs[0]).values.ravel()).reshape(
+            remote_techs.shape
+        ),
+        dims=remote_techs.dims,
+    )
+
+    def _isel(da):
+        if "nodes" in da.dims and "techs" in da.dims:
+            return (
+                da.drop_vars(["nodes", "techs"])
+                .isel(nodes=node_positions, techs=tech_positions)
+                .assign_coords(nodes=nodes, techs=techs)
+            )
+        else:
+            return da
+
+    return expression.map(_isel).where(is_link)
+
+
+def _conversion_plus_io(backend_model):
+    """
+    For each carrier tier, the primary tier (`in`/`out`) and corresponding
+    decision variable (`carrier_con`/`carrier_prod`).
+    """
+    tiers = backend_model.inputs.carrier_tiers
+    is_out = xr.DataArray(
+        ["out" in i for i in tiers.values], dims=tiers.dims, coords=tiers.coords
+    )
+    variable = _select(
+        is_out,
+        backend_model.get_variable("carrier_prod"),
+        backend_model.get_variable("carrier_con"),
+    )
+    return is_out, variable
+
+
+# Capacity constraints
+
+
+def energy_capacity_per_storage_capacity_min_constraint(backend_model):
+    expr = backend_model.get_variable("energy_cap") - backend_model.get_variable(
+        "storage_cap"
+    ) * backend_model.get_param("energy_cap_per_storage_cap_min")
+    return [(expr, 0, INF)]
+
+
+def energy_capacity_per_storage_capacity_max_constraint(backend_model):
+    expr = backend_model.get_variable("energy_cap") - backend_model.get_variable(
+        "storage_cap"
+    ) * backend_model.get_param("energy_cap_per_storage_cap_max")
+    return [(expr, -INF, 0)]
+
+
+def energy_capacity_per_storage_capacity_equals_constraint(backend_model):
+    expr = backend_model.get_variable("energy_cap") - backend_model.get_variable(
+        "storage_cap"
+    ) * backend_model.get_param("energy_cap_per_storage_cap_equals")
+    return [(expr, 0, 0)]
+
+
+def resource_capacity_equals_energy_capacity_constraint(backend_model):
+    expr = backend_model.get_variable("resource_cap") - backend_model.get_variable(
+        "energy_cap"
+    )
+    return [(expr, 0, 0)]
+
+
+def force_zero_resource_area_constraint(backend_model):
+    return [(backend_model.get_variable("resource_area"), 0, 0)]
+
+
+def resource_area_per_energy_capacity_constraint(backend_model):
+    expr = backend_model.get_variable("resource_area") - backend_model.get_variable(
+        "energy_cap"
+    ) * backend_model.get_param("resource_area_per_energy_cap")
+    return [(expr, 0, 0)]
+
+
+def resource_area_capacity_per_loc_constraint(backend_model):
+    expr = backend_model.get_variable("resource_area").sum("techs")
+    return [(expr, -INF, backend_model.get_param("available_area"))]
+
+
+def energy_capacity_systemwide_constraint(backend_model):
+    max_systemwide = backend_model.get_param("energy_cap_max_systemwide")
+    equals_systemwide = backend_model.get_param("energy_cap_equals_systemwide")
+    expr = backend_model.get_variable("energy_cap").sum("nodes")
+    has_equals = equals_systemwide.notnull()
+    return [
+        (
+            expr,
+            xr.where(has_equals, equals_systemwide, -INF),
+            xr.where(has_equals, equals_systemwide, max_systemwide),
+        )
+    ]
+
+
+# Dispatch constraints
+
+
+def carrier_production_max_constraint(backend_model):
+    expr = backend_model.get_variable("carrier_prod") - backend_model.get_variable(
+        "energy_cap"
+    ) * (
+        backend_model.get_param("timestep_resolution")
+        * backend_model.get_param("parasitic_eff")
+    )
+    return [(expr, -INF, 0)]
+
+
+def carrier_production_min_constraint(backend_model):
+    expr = backend_model.get_variable("carrier_prod") - backend_model.get_variable(
+        "energy_cap"
+    ) * (
+        backend_model.get_param("timestep_resolution")
+        * backend_model.get_param("energy_cap_min_use")
+    )
+    return [(expr, 0, INF)]
+
+
+def carrier_consumption_max_constraint(backend_model):
+    expr = backend_model.get_variable("carrier_con") + backend_model.get_variable(
+        "energy_cap"
+    ) * backend_model.get_param("timestep_resolution")
+    return [(expr, 0, INF)]
+
+
+def resource_max_constraint(backend_model):
+    expr = backend_model.get_variable("resource_con") - backend_model.get_variable(
+        "resource_cap"
+    ) * backend_model.get_param("timestep_resolution")
+    return [(expr, -INF, 0)]
+
+
+def storage_max_constraint(backend_model):
+    expr = backend_model.get_variable("storage") - backend_model.get_variable(
+        "storage_cap"
+    )
+    return [(expr, -INF, 0)]
+
+
+def storage_discharge_depth_constraint(backend_model):
+    expr = backend_model.get_variable("storage") - backend_model.get_variable(
+        "storage_cap"
+    ) * backend_model.get_param("storage_discharge_depth")
+    return [(expr, 0, INF)]
+
+
+def _ramping_diff(backend_model):
+    timesteps = backend_model.inputs.timesteps
+    shift = _shift_timesteps(
+        _previous_timestep_positions(backend_model, cyclic=False), timesteps
+    )
+    time_res = backend_model.get_param("timestep_resolution")
+    flow = backend_model.get_variable("carrier_prod") + backend_model.get_variable(
+        "carrier_con"
+    )
+    diff = flow / time_res - flow.map(shift) / shift(time_res)
+    max_ramping_rate = backend_model.get_variable(
+        "energy_cap"
+    ) * backend_model.get_param("energy_ramping")
+    return diff, max_ramping_rate, _first_timestep(backend_model)
+
+
+def ramping_up_constraint(backend_model):
+    diff, max_ramping_rate, is_first = _ramping_diff(backend_model)
+    return [(diff - max_ramping_rate, -INF, xr.where(is_first, INF, 0))]
+
+
+def ramping_down_constraint(backend_model):
+    diff, max_ramping_rate, is_first = _ramping_diff(backend_model)
+    return [(diff + max_ramping_rate, xr.where(is_first, -INF, 0), INF)]
+
+
+# Energy balance constraints
+
+
+def system_balance_constraint(backend_model):
+    expr = (
+        backend_model.get_variable("carrier_prod").sum("techs")
+        + backend_model.get_variable("carrier_con").sum("techs")
+        - backend_model.get_variable("carrier_export").sum("techs")
+        + backend_model.get_variable("unmet_demand")
+        + backend_model.get_variable("unused_supply")
+    )
+    return [(expr, 0, 0)]
+
+
+def balance_supply_constraint(backend_model):
+    energy_eff = backend_model.get_param("energy_eff")
+    min_use = backend_model.get_param("resource_min_use")
+    force_resource = _param_equals(backend_model, "force_resource", 1)
+    zero_eff = energy_eff == 0
+
+    carrier_prod = backend_model.get_variable("carrier_prod") * _inverse(energy_eff)
+    available_resource = _available_resource(backend_model)
+
+    max_expr = _select(
+        zero_eff,
+        backend_model.get_variable("carrier_prod"),
+        carrier_prod - available_resource,
+    )
+    min_expr = carrier_prod - available_resource * min_use.fillna(0)
+    has_min_use = ~zero_eff & ~force_resource & _is_truthy(min_use)
+
+    return [
+        (max_expr, xr.where(zero_eff | force_resource, 0, -INF), 0),
+        (min_expr, xr.where(has_min_use, 0, -INF), INF),
+    ]
+
+
+def balance_demand_constraint(backend_model):
+    carrier_con = backend_model.get_variable("carrier_con") * backend_model.get_param(
+        "energy_eff"
+    )
+    force_resource = _param_equals(backend_model, "force_resource", 1)
+    expr = carrier_con - backend_model.get_expression("required_resource")
+    return [(expr, 0, xr.where(force_resource, 0, INF))]
+
+
+def resource_availability_supply_plus_constraint(backend_model):
+    force_resource = _param_equals(backend_model, "force_resource", 1)
+    expr = backend_model.get_variable("resource_con") - _available_resource(
+        backend_model
+    )
+    return [(expr, xr.where(force_resource, 0, -INF), 0)]
+
+
+def balance_transmission_constraint(backend_model):
+    remote_carrier_con = _remote(
+        backend_model, backend_model.get_variable("carrier_con")
+    )
+    expr = backend_model.get_variable(
+        "carrier_prod"
+    ) + remote_carrier_con * backend_model.get_param("energy_eff")
+    return [(expr, 0, 0)]
+
+
+def balance_supply_plus_constraint(backend_model):
+    total_eff = backend_model.get_param("energy_eff") * backend_model.get_param(
+        "parasitic_eff"
+    )
+    carrier_prod = backend_model.get_variable("carrier_prod") * _inverse(total_eff)
+    resource = backend_model.get_variable("resource_con") * backend_model.get_param(
+        "resource_eff"
+    )
+    include_storage = _is_truthy(backend_model.get_param("include_storage"))
+
+    expr = _select(
+        include_storage,
+        backend_model.get_variable("storage")
+        - _storage_previous_step(backend_model)
+        - resource
+        + carrier_prod,
+        resource - carrier_prod,
+    )
+    return [(expr, 0, 0)]
+
+
+def balance_storage_constraint(backend_model):
+    energy_eff = backend_model.get_param("energy_eff")
+    carrier_prod = backend_model.get_variable("carrier_prod") * _inverse(energy_eff)
+    carrier_con = backend_model.get_variable("carrier_con") * energy_eff
+    expr = (
+        backend_model.get_variable("storage")
+        - _storage_previous_step(backend_model)
+        + carrier_prod
+        + carrier_con
+    )
+    return [(expr, 0, 0)]
+
+
+def storage_initial_constraint(backend_model):
+    if "storage_inter_cluster" in backend_model.variables:
+        raise exceptions.BackendError(
+            "Inter-cluster storage is not available in the sparse backend."
+        )
+    timesteps = backend_model.inputs.timesteps
+    final_step = {"timesteps": len(timesteps) - 1}
+    time_resolution = backend_model.get_param("timestep_resolution").isel(final_step)
+    storage_loss = backend_model.get_param("storage_loss")
+    if "timesteps" in storage_loss.dims:
+        storage_loss = storage_loss.isel(final_step)
+    expr = backend_model.get_variable("storage").map(
+        lambda da: da.isel(final_step, drop=True) if "timesteps" in da.dims else da
+    ) * (1 - storage_loss) ** time_resolution.item() - backend_model.get_variable(
+        "storage_cap"
+    ) * backend_model.get_param(
+        "storage_initial"
+    )
+    return [(expr, 0, 0)]
+
+
+# Conversion constraints
+
+
+def balance_conversion_constraint(backend_model):
+    carrier_prod = (
+        backend_model.get_variable("carrier_prod")
+        .where(_carrier_mask(backend_model, "out"))
+        .sum("carriers")
+    )
+    carrier_con = (
+        backend_model.get_variable("carrier_con")
+        .where(_carrier_mask(backend_model, "in"))
+        .sum("carriers")
+    )
+    expr = carrier_prod + carrier_con * backend_model.get_param("energy_eff")
+    return [(expr, 0, 0)]
+
+
+def balance_conversion_plus_primary_constraint(backend_model):
+    carrier_ratios = backend_model.get_param("carrier_ratios")
+    ratio_out = carrier_ratios.sel(carrier_tiers="out", drop=True)
+    ratio_in = carrier_ratios.sel(carrier_tiers="in", drop=True)
+
+    carrier_prod = (
+        (backend_model.get_variable("carrier_prod") * _inverse(ratio_out))
+        .where(_carrier_mask(backend_model, "out"))
+        .sum("carriers")
+    )
+    carrier_con = (
+        (backend_model.get_variable("carrier_con") * ratio_in)
+        .where(_carrier_mask(backend_model, "in"))
+        .sum("carriers")
+    )
+    expr = carrier_prod + carrier_con * backend_model.get_param("energy_eff")
+    return [(expr, 0, 0)]
+
+
+def _carrier_prod_conversion_plus(backend_model):
+    return (
+        backend_model.get_variable("carrier_prod")
+        .where(_carrier_mask(backend_model, "out"))
+        .sum("carriers")
+    )
+
+
+def carrier_production_max_conversion_plus_constraint(backend_model):
+    expr = _carrier_prod_conversion_plus(backend_model) - backend_model.get_variable(
+        "energy_cap"
+    ) * backend_model.get_param("timestep_resolution")
+    return [(expr, -INF, 0)]
+
+
+def carrier_production_min_conversion_plus_constraint(backend_model):
+    expr = _carrier_prod_conversion_plus(backend_model) - backend_model.get_variable(
+        "energy_cap"
+    ) * (
+        backend_model.get_param("timestep_resolution")
+        * backend_model.get_param("energy_cap_min_use")
+    )
+    return [(expr, 0, INF)]
+
+
+def balance_conversion_plus_non_primary_constraint(backend_model):
+    is_out, decision_variable = _conversion_plus_io(backend_model)
+    carrier_ratios = backend_model.get_param("carrier_ratios").broadcast_like(
+        backend_model.inputs.carrier_tiers
+    )
+    carrier = backend_model.get_param("carrier").notnull()
+
+    primary_ratios = xr.where(
+        is_out,
+        carrier_ratios.sel(carrier_tiers="out", drop=True),
+        carrier_ratios.sel(carrier_tiers="in", drop=True),
+    )
+    primary_carrier = xr.where(
+        is_out,
+        carrier.sel(carrier_tiers="out", drop=True),
+        carrier.sel(carrier_tiers="in", drop=True),
+    )
+    c_1 = (
+        (decision_variable * _inverse(primary_ratios))
+        .where(primary_carrier & (primary_ratios != 0))
+        .sum("carriers")
+    )
+    has_c_2 = carrier & (carrier_ratios != 0)
+    c_2 = (decision_variable * _inverse(carrier_ratios)).where(has_c_2).sum("carriers")
+
+    has_c_2 = has_c_2.any("carriers")
+    return [(c_1 - c_2, xr.where(has_c_2, 0, -INF), xr.where(has_c_2, 0, INF))]
+
+
+def conversion_plus_prod_con_to_zero_constraint(backend_model):
+    _, decision_variable = _conversion_plus_io(backend_model)
+    is_zero = backend_model.get_param("carrier_ratios") == 0
+    return [(decision_variable, xr.where(is_zero, 0, -INF), xr.where(is_zero, 0, INF))]
+
+
+# Export constraints
+
+
+def export_balance_constraint(backend_model):
+    expr = backend_model.get_variable("carrier_prod") - backend_model.get_variable(
+        "carrier_export"
+    )
+    return [(expr, 0, INF)]
+
+
+def export_max_constraint(backend_model):
+    operating_units = _select(
+        backend_model.variable_exists("operating_units"),
+        backend_model.get_variable("operating_units"),
+        1,
+    )
+    expr = backend_model.get_variable(
+        "carrier_export"
+    ) - operating_units * backend_model.get_param("export_max")
+    return [(expr, -INF, 0)]
+
+
+# Network constraints
+
+
+def symmetric_transmission_constraint(backend_model):
+    energy_cap = backend_model.get_variable("energy_cap")
+    expr = energy_cap - _remote(backend_model, energy_cap)
+    return [(expr, 0, 0)]
+
+
+# MILP constraints
+
+
+def unit_commitment_milp_constraint(backend_model):
+    expr = backend_model.get_variable("operating_units") - backend_model.get_variable(
+        "units"
+    )
+    return [(expr, -INF, 0)]
+
+
+def carrier_production_max_milp_constraint(backend_model):
+    expr = backend_model.get_variable("carrier_prod") - backend_model.get_variable(
+        "operating_units"
+    ) * (
+        backend_model.get_param("timestep_resolution")
+        * backend_model.get_param("energy_cap_per_unit")
+        * backend_model.get_param("parasitic_eff")
+    )
+    return [(expr, -INF, 0)]
+
+
+def carrier_production_max_conversion_plus_milp_constraint(backend_model):
+    expr = _carrier_prod_conversion_plus(backend_model) - backend_model.get_variable(
+        "operating_units"
+    ) * (
+        backend_model.get_param("timestep_resolution")
+        * backend_model.get_param("energy_cap_per_unit")
+    )
+    return [(expr, -INF, 0)]
+
+
+def carrier_production_min_milp_constraint(backend_model):
+    expr = backend_model.get_variable("carrier_prod") - backend_model.get_variable(
+        "operating_units"
+    ) * (
+        backend_model.get_param("timestep_resolution")
+        * backend_model.get_param("energy_cap_per_unit")
+        * backend_model.get_param("energy_cap_min_use")
+    )
+    return [(expr, 0, INF)]
+
+
+def carrier_production_min_conversion_plus_milp_constraint(backend_model):
+    expr = _carrier_prod_conversion_plus(backend_model) - backend_model.get_variable(
+        "operating_units"
+    ) * (
+        backend_model.get_param("timestep_resolution")
+        * backend_model.get_param("energy_cap_per_unit")
+        * backend_model.get_param("energy_cap_min_use")
+    )
+    return [(expr, 0, INF)]
+
+
+def carrier_consumption_max_milp_constraint(backend_model):
+    expr = backend_model.get_variable("carrier_con") + backend_model.get_variable(
+        "operating_units"
+    ) * (
+        backend_model.get_param("timestep_resolution")
+        * backend_model.get_param("energy_cap_per_unit")
+    )
+    return [(expr, 0, INF)]
+
+
+def energy_capacity_units_milp_constraint(backend_model):
+    expr = backend_model.get_variable("energy_cap") - backend_model.get_variable(
+        "units"
+    ) * backend_model.get_param("energy_cap_per_unit")
+    return [(expr, 0, 0)]
+
+
+def storage_capacity_units_milp_constraint(backend_model):
+    expr = backend_model.get_variable("storage_cap") - backend_model.get_variable(
+        "units"
+    ) * backend_model.get_param("storage_cap_per_unit")
+    return [(expr, 0, 0)]
+
+
+def energy_capacity_max_purchase_milp_constraint(backend_model):
+    energy_cap_equals = backend_model.get_param("energy_cap_equals")
+    has_equals = _is_truthy(energy_cap_equals)
+    energy_cap_max = xr.where(
+        has_equals, energy_cap_equals, backend_model.get_param("energy_cap_max")
+    )
+    expr = backend_model.get_variable("energy_cap") - backend_model.get_variable(
+        "purchased"
+    ) * (energy_cap_max * backend_model.get_param("energy_cap_scale"))
+    return [(expr, xr.where(has_equals, 0, -INF), 0)]
+
+
+def energy_capacity_min_purchase_milp_constraint(backend_model):
+    expr = backend_model.get_variable("energy_cap") - backend_model.get_variable(
+        "purchased"
+    ) * (
+        backend_model.get_param("energy_cap_min")
+        * backend_model.get_param("energy_cap_scale")
+    )
+    return [(expr, 0, INF)]
+
+
+def storage_capacity_max_purchase_milp_constraint(backend_model):
+    storage_cap_equals = backend_model.get_param("storage_cap_equals")
+    storage_cap_max = backend_model.get_param("storage_cap_max")
+    has_equals = _is_truthy(storage_cap_equals)
+    has_max = ~has_equals & _is_truthy(storage_cap_max)
+    expr = backend_model.get_variable("storage_cap") - backend_model.get_variable(
+        "purchased"
+    ) * xr.where(has_equals, storage_cap_equals, storage_cap_max.fillna(0))
+    return [
+        (
+            expr,
+            xr.where(has_equals, 0, -INF),
+            xr.where(has_equals | has_max, 0, INF),
+        )
+    ]
+
+
+def storage_capacity_min_purchase_milp_constraint(backend_model):
+    storage_cap_min = backend_model.get_param("storage_cap_min")
+    expr = backend_model.get_variable("storage_cap") - backend_model.get_variable(
+        "purchased"
+    ) * storage_cap_min.fillna(0)
+    return [(expr, xr.where(_is_truthy(storage_cap_min), 0, -INF), INF)]
+
+
+def unit_capacity_systemwide_milp_constraint(backend_model):
+    max_systemwide = backend_model.get_param("units_max_systemwide")
+    equals_systemwide = backend_model.get_param("units_equals_systemwide")
+    has_equals = _is_truthy(equals_systemwide)
+    expr = backend_model.get_variable("units").sum(
+        "nodes"
+    ) + backend_model.get_variable("purchased").sum("nodes")
+    return [
+        (
+            expr,
+            xr.where(has_equals, equals_systemwide, -INF),
+            xr.where(has_equals, equals_systemwide, max_systemwide),
+        )
+    ]
+
+
+def asynchronous_con_milp_constraint(backend_model):
+    bigM = backend_model.get_param("bigM")
+    expr = (
+        -1 * backend_model.get_variable("carrier_con").sum("carriers")
+        + backend_model.get_variable("prod_con_switch") * bigM
+    )
+    return [(expr, -INF, bigM)]
+
+
+def asynchronous_prod_milp_constraint(backend_model):
+    bigM = backend_model.get_param("bigM")
+    expr = (
+        backend_model.get_variable("carrier_prod").sum("carriers")
+        - backend_model.get_variable("prod_con_switch") * bigM
+    )
+    return [(expr, -INF, 0)]
+
+
+# Expressions
+
+
+def required_resource_expression(backend_model):
+    return _available_resource(backend_model)
+
+
+def cost_investment_expression(backend_model):
+    def _get_investment_cost(capacity_decision_variable):
+        return backend_model.get_variable(
+            capacity_decision_variable
+        ) * backend_model.get_param("cost_" + capacity_decision_variable)
+
+    cost_of_purchase = _select(
+        backend_model.variable_exists("units"),
+        backend_model.get_variable("units"),
+        backend_model.get_variable("purchased"),
+    ) * backend_model.get_param("cost_purchase")
+
+    ts_weight = _timestep_weight(backend_model)
+
+    cost_cap = (
+        _get_investment_cost("energy_cap")
+        + _get_investment_cost("storage_cap")
+        + _get_investment_cost("resource_cap")
+        + _get_investment_cost("resource_area")
+        + cost_of_purchase
+    ) * (backend_model.get_param("cost_depreciation_rate") * ts_weight)
+
+    # Transmission technologies exist at two locations, thus their cost is divided by 2
+    cost_cap = cost_cap * xr.where(
+        _inheritance_endswith(backend_model, "transmission"), 0.5, 1
+    )
+
+    cost_fractional_om = cost_cap * backend_model.get_param(
+        "cost_om_annual_investment_fraction"
+    )
+    cost_fixed_om = backend_model.get_variable("energy_cap") * (
+        backend_model.get_param("cost_om_annual") * ts_weight
+    )
+
+    return cost_fractional_om + cost_fixed_om + cost_cap
+
+
+def cost_var_expression(backend_model):
+    weight = backend_model.get_param("timestep_weights")
+    carrier_prod = backend_model.get_variable("carrier_prod")
+    carrier_con = backend_model.get_variable("carrier_con")
+    is_conversion_plus = _inheritance_endswith(backend_model, "conversion_plus")
+
+    if "primary_carrier_out" in backend_model.inputs.data_vars:
+        primary_carrier_out = backend_model.inputs.primary_carrier_out.notnull()
+        primary_carrier_in = backend_model.inputs.primary_carrier_in.notnull()
+    else:
+        primary_carrier_out = primary_carrier_in = xr.DataArray(False)
+
+    carrier_prod_out = _select(
+        is_conversion_plus,
+        carrier_prod.where(primary_carrier_out).sum("carriers"),
+        carrier_prod.sum("carriers"),
+    )
+    cost_prod = carrier_prod_out * backend_model.get_param("cost_om_prod")
+
+    energy_eff = backend_model.get_param("energy_eff")
+    prod_con_eff = _select(
+        backend_model.variable_exists("resource_con"),
+        backend_model.get_variable("resource_con"),
+        _select(
+            _inheritance_endswith(backend_model, "supply"),
+            carrier_prod.sum("carriers")
+            * _inverse(energy_eff.where(energy_eff > 0, 0)),
+            _select(
+                is_conversion_plus,
+                -1 * carrier_con.where(primary_carrier_in).sum("carriers"),
+                -1 * carrier_con.sum("carriers"),
+            ),
+        ),
+    )
+    cost_con = prod_con_eff * backend_model.get_param("cost_om_con").fillna(0)
+
+    if "export_carrier" in backend_model.inputs.data_vars:
+        cost_export = backend_model.get_variable("carrier_export").where(
+            backend_model.inputs.export_carrier.notnull()
+        ).sum("carriers") * backend_model.get_param("cost_export")
+    else:
+        cost_export = 0
+
+    return (cost_prod + cost_con + cost_export) * weight
+
+
+def cost_expression(backend_model):
+    return backend_model.get_expression(
+        "cost_investment"
+    ) + backend_model.get_expression("cost_var").sum("timesteps")
@@ -0,0 +1,175 @@
+"""
+Copyright (C) since 2013 Calliope contributors listed in AUTHORS.
+Licensed under the Apache 2.0 License (see LICENSE file).
+
+expression.py
+~~~~~~~~~~~~~
+
+Arrays of linear expressions, used to build whole constraint families
+with a handful of vectorised operations.
+
+"""
+
+import numpy as np
+import xarray as xr
+
+TERM_DIM = "_term"
+
+
+class LinearExpression:
+    """
+    An array of linear expressions over some of the model dimensions.
+
+    Every element of the array is
+    ``sum_i(coeffs[..., i] * x[variables[..., i]]) + constant``, where ``x`` is the
+    vector of all decision variables in the backend model. A variable position of
+    -1 marks an empty term (e.g. a variable that does not exist at that index).
+
+    `variables` and `coeffs` always share the dimensions of `constant`, plus
+    the term dimension, so that summing over a dimension never loses terms.
+
+    Parameters
+    ----------
+    variables : xarray.DataArray of int
+    coeffs : xarray.DataArray of float
+    constant : xarray.DataArray of float
+
+    """
+
+    def __init__(self, variables, coeffs, constant):
+        constant = xr.DataArray(constant)
+        variables, coeffs = xr.broadcast(variables, coeffs)
+        variables = variables.broadcast_like(constant, exclude=[TERM_DIM])
+        coeffs = coeffs.broadcast_like(constant, exclude=[TERM_DIM])
+        self.variables = variables
+        self.coeffs = coeffs
+        self.constant = constant.broadcast_like(variables, exclude=[TERM_DIM])
+
+    @classmethod
+    def from_variable(cls, positions):
+        """
+        Parameters
+        ----------
+        positions : xarray.DataArray of int
+            Column position of each variable, -1 where the variable does not exist.
+        """
+        variables = positions.expand_dims({TERM_DIM: 1}, axis=-1)
+        return cls(variables, xr.ones_like(variables, dtype=float), 0.0)
+
+    @classmethod
+    def from_constant(cls, value):
+        value = xr.DataArray(value).astype(float)
+        return cls(
+            xr.DataArray(np.empty(0, dtype=int), dims=[TERM_DIM]),
+            xr.DataArray(np.empty(0, dtype=float), dims=[TERM_DIM]),
+            value,
+        )
+
+    @property
+    def dims(self):
+        return self.constant.dims
+
+    def __add__(self, other):
+        other = as_expression(other)
+        variables_a, variables_b = xr.broadcast(
+            self.variables, other.variables, exclude=[TERM_DIM]
+        )
+        coeffs_a, coeffs_b = xr.broadcast(self.coeffs, other.coeffs, exclude=[TERM_DIM])
+        return LinearExpression(
+            xr.concat([variables_a, variables_b], dim=TERM_DIM),
+            xr.concat([coeffs_a, coeffs_b], dim=TERM_DIM),
+            self.constant + other.constant,
+        )
+
+    __radd__ = __add__
+
+    def __neg__(self):
+        return self * -1
+
+    def __sub__(self, other):
+        return self + (as_expression(other) * -1)
+
+    def __rsub__(self, other):
+        return as_expression(other) - self
+
+    def __mul__(self, other):
+        if isinstance(other, LinearExpression):
+            raise TypeError("Cannot multiply two linear expressions")
+        coeffs = self.coeffs * other
+        return LinearExpression(
+            self.variables.broadcast_like(coeffs), coeffs, self.constant * other
+        )
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        return self * (1 / other)
+
+    def sum(self, dims):
+        """Sum over the given dimension(s), by merging them into the term dimension."""
+        if isinstance(dims, str):
+            dims = [dims]
+        dims = [i for i in dims if i in self.dims]
+        if not dims:
+            return self
+        return LinearExpression(
+            _merge_into_terms(self.variables, dims),
+            _merge_into_terms(self.coeffs, dims),
+            self.constant.sum(dims),
+        )
+
+    def where(self, cond):
+        """Remove all terms (and the constant) of elements where `cond` is False."""
+        cond = xr.DataArray(cond)
+        return LinearExpression(
+            self.variables.where(cond, -1),
+            self.coeffs.where(cond, 0.0),
+            self.constant.where(cond, 0.0),
+        )
+
+    def map(self, func):
+        """Apply an indexing function (e.g. `isel`) to all underlying arrays."""
+        return LinearExpression(
+            func(self.variables), func(self.coeffs), func(self.constant)
+        )
+
+    def broadcast_like(self, other):
+        return LinearExpression(
+            self.variables.broadcast_like(other, exclude=[TERM_DIM]),
+            self.coeffs.broadcast_like(other, exclude=[TERM_DIM]),
+            self.constant.broadcast_like(other),
+        )
+
+    def evaluate(self, solution):
+        """
+        Evaluate the expression for a given vector of decision variable values.
+
+        Returns
+        -------
+        xarray.DataArray
+        """
+        positions = self.variables.values
+        coeffs = self.coeffs.transpose(*self.variables.dims).values
+        terms = xr.DataArray(
+            np.where(positions >= 0, coeffs * solution[np.clip(positions, 0, None)], 0),
+            dims=self.variables.dims,
+            coords=self.variables.coords,
+        )
+        return terms.sum(TERM_DIM) + self.constant
+
+
+def as_expression(value):
+    if isinstance(value, LinearExpression):
+        return value
+    else:
+        return LinearExpression.from_constant(value)
+
+
+def _merge_into_terms(da, dims):
+    remaining = [i for i in da.dims if i not in dims and i != TERM_DIM]
+    da = da.transpose(*remaining, *dims, TERM_DIM)
+    return xr.DataArray(
+        da.values.reshape([da.sizes[i] for i in remaining] + [-1]),
+        dims=remaining + [TERM_DIM],
+        coords={i: da.coords[i] for i in remaining if i in da.coords},
+    )
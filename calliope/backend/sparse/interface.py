@@ -0,0 +1,215 @@
+import logging
+
+import xarray as xr
+
+import calliope
+from calliope.backend import run as backend_run
+from calliope.backend.sparse import model as run_sparse
+import calliope.backend.sparse.interface as sparse_interface
+
+from calliope.core.util.dataset import reorganise_xarray_dimensions
+
+logger = logging.getLogger(__name__)
+
+
+def access_sparse_model_inputs(backend_model):
+    """
+    If the user wishes to inspect the parameter values used as inputs in the backend
+    model, they can access a new Dataset of all the backend model inputs, including
+    defaults applied where the user did not specify anything for a specific indexed element.
+    """
+    all_param_ds = reorganise_xarray_dimensions(
+        backend_model.inputs.drop_vars("bigM", errors="ignore")
+    )
+    for var in all_param_ds.data_vars:
+        all_param_ds[var].attrs["is_result"] = 0
+
+    return all_param_ds
+
+
+def update_sparse_param(backend_model, opt, param, update_dict):
+    """
+    A backend model input parameter value can be updated without the user
+    directly accessing the backend model.
+
+    Parameters
+    ----------
+    param : str
+        Name of the parameter to update
+    update_dict : dict
+        keys are parameter indeces (either strings or tuples of strings,
+        depending on whether there is one or more than one dimension). Values
+        are the new values being assigned to the parameter at the given indeces.
+
+    Returns
+    -------
+    Value(s) will be updated in-place, requiring the user to run the model again to
+    see the effect on results.
+
+    """
+    if param not in backend_model.inputs.data_vars:
+        raise calliope.exceptions.ModelError(
+            "Parameter `{}` not in the sparse backend. Check that the string "
+            "matches the corresponding constraint/cost in the model.inputs "
+            "xarray Dataset".format(param)
+        )
+    elif not backend_model.inputs[param].dims:
+        raise calliope.exceptions.ModelError(
+            "`{}` not an indexed parameter in the sparse backend and "
+            "cannot be updated by the user".format(param)
+        )
+    elif not isinstance(update_dict, dict):
+        raise TypeError("`update_dict` must be a dictionary")
+
+    # Work on a copy, so that arrays shared with the Calliope model_data
+    # are left untouched.
+    updated = backend_model.inputs[param].to_series()
+    invalid_indices = [idx for idx in update_dict.keys() if idx not in updated.index]
+    if invalid_indices:
+        raise KeyError(
+            "Index {} is not valid for parameter `{}` in the sparse backend".format(
+                ", ".join(str(idx) for idx in invalid_indices), param
+            )
+        )
+    for idx, val in update_dict.items():
+        updated.loc[idx] = val
+    backend_model.inputs[param] = xr.DataArray.from_series(updated).reindex_like(
+        backend_model.inputs[param]
+    )
+    backend_model.needs_rebuild = True
+
+
+def activate_sparse_constraint(backend_model, constraint, active=True):
+    """
+    Takes a constraint name, finds it in the backend model and sets
+    its status to either active or deactive.
+
+    Parameters
+    ----------
+    constraint : str
+        Name of the constraint to activate/deactivate
+        Built-in constraints include '_constraint'
+    active: bool, default=True
+        status to set the constraint
+    """
+    constraint_name = constraint.replace("_constraint", "")
+    if constraint_name not in backend_model.subsets.get("constraints", {}):
+        raise calliope.exceptions.ModelError(
+            "constraint `{}` not in the sparse backend.".format(constraint)
+        )
+    elif active is True:
+        backend_model.inactive_constraints.discard(constraint_name)
+    elif active is False:
+        backend_model.inactive_constraints.add(constraint_name)
+    else:
+        raise ValueError("Argument `active` must be True or False")
+    backend_model.needs_rebuild = True
+
+
+def rerun_sparse_model(model_data, backend_model, opt):
+    """
+    Rerun the sparse backend, perhaps after updating a parameter value,
+    (de)activating a constraint or updating run options in the model
+    model_data object.
+
+    Returns
+    -------
+    new_model : calliope.Model
+        New calliope model, including both inputs and results, but no backend interface.
+    """
+    backend_model.run_config = calliope.AttrDict.from_yaml_string(
+        model_data.attrs["run_config"]
+    )
+    backend_model.needs_rebuild = True
+    return backend_run.rerun_backend_model(
+        model_data,
+        backend_model,
+        opt,
+        run_config=backend_model.run_config,
+        inputs=access_sparse_model_inputs(backend_model),
+        backend=run_sparse,
+        interface=sparse_interface,
+    )
+
+
+def add_sparse_constraint(backend_model, *args, **kwargs):
+    """
+    Adding user-defined constraints is not available in the sparse backend.
+    """
+    raise calliope.exceptions.BackendError(
+        "Adding constraints is not available in the sparse backend. "
+        "Use the Pyomo backend (`run.backend: pyomo`) instead."
+    )
+
+
+def get_all_sparse_model_attrs(backend_model):
+    """
+    Get the name of all parameters, variables and expressions in the generated
+    sparse backend model.
+
+    Returns
+    -------
+    Dictionary differentiating between variables ('Var'), parameters ('Param'), and sets ('Set').
+    variables and parameters are given as a dictionaries of lists, where keys are the item names and
+    values are a list of dimensions over which they are indexed.
+    """
+    return {
+        "Var": {
+            k: backend_model.subsets.variables[k].foreach
+            for k in backend_model.variables
+        },
+        "Param": {
+            k: list(v.dims) for k, v in backend_model.inputs.data_vars.items() if v.dims
+        },
+        "Expression": {
+            k: backend_model.subsets.expressions[k].foreach
+            for k in backend_model.expressions
+        },
+        "Set": list(backend_model.inputs.coords),
+    }
+
+
+# Backend-agnostic names, as used when running iteratively in `calliope.backend.run`
+access_model_inputs = access_sparse_model_inputs
+update_param = update_sparse_param
+
+
+class BackendInterfaceMethods:
+    def __init__(self, model):
+        self._backend = model._backend_model
+        self._opt = model._backend_model_opt
+        self._model_data = model._model_data
+        self.run_config = model.run_config
+        self.subsets = model.subsets
+
+    def access_model_inputs(self):
+        return access_sparse_model_inputs(self._backend)
+
+    access_model_inputs.__doc__ = access_sparse_model_inputs.__doc__
+
+    def update_param(self, *args, **kwargs):
+        return update_sparse_param(self._backend, self._opt, *args, **kwargs)
+
+    update_param.__doc__ = update_sparse_param.__doc__
+
+    def activate_constraint(self, *args, **kwargs):
+        return activate_sparse_constraint(self._backend, *args, **kwargs)
+
+    activate_constraint.__doc__ = activate_sparse_constraint.__doc__
+
+    def rerun(self, *args, **kwargs):
+        return rerun_sparse_model(
+            self._model_data, self._backend, self._opt, *args, **kwargs
+        )
+
+    rerun.__doc__ = rerun_sparse_model.__doc__
+
+    def add_constraint(self, *args, **kwargs):
+        return add_sparse_constraint(self._backend, *args, **kwargs)
+
+    add_constraint.__doc__ = add_sparse_constraint.__doc__
+
+    def get_all_model_attrs(self, *args, **kwargs):
+        return get_all_sparse_model_attrs(self._backend, *args, **kwargs)
+
+    get_all_model_attrs.__doc__ = get_all_sparse_model_attrs.__doc__
@@ -0,0 +1,593 @@
+"""
+Copyright (C) since 2013 Calliope contributors listed in AUTHORS.
+Licensed under the Apache 2.0 License (see LICENSE file).
+
+model.py
+~~~~~~~~
+
+Array-native backend. Each variable, expression and constraint family is built
+with a handful of vectorised operations on the model data arrays, straight into
+a sparse coefficient matrix, which is then solved with HiGHS (via SciPy).
+
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+from scipy import sparse
+from scipy.optimize import Bounds, LinearConstraint, milp
+
+from calliope.backend.sparse import constraints
+from calliope.backend.sparse.expression import LinearExpression
+from calliope.backend.subsets import create_valid_imask, MaskCache
+from calliope.core.util.tools import load_function
+from calliope.core.util.logging import BuildProfiler
+from calliope.core.util.dataset import reorganise_xarray_dimensions
+from calliope import exceptions
+from calliope.core.attrdict import AttrDict
+
+logger = logging.getLogger(__name__)
+
+DOMAINS = {
+    "Reals": (-np.inf, np.inf, 0),
+    "NonNegativeReals": (0, np.inf, 0),
+    "NonPositiveReals": (-np.inf, 0, 0),
+    "NegativeReals": (-np.inf, 0, 0),
+    "NonNegativeIntegers": (0, np.inf, 1),
+    "Binary": (0, 1, 1),
+}
+
+TERMINATION_CONDITIONS = {
+    0: "optimal",
+    1: "maxIterations",
+    2: "infeasible",
+    3: "unbounded",
+}
+
+
+class SparseBackendModel:
+    """
+    Linear problem built directly from a Calliope model_data Dataset.
+
+    Decision variables are stored as integer arrays of column positions
+    (-1 where the variable does not exist), expressions as
+    :class:`~calliope.backend.sparse.expression.LinearExpression` arrays, and
+    constraints as integer arrays of row positions in the coefficient matrix.
+
+    """
+
+    def __init__(self, model_data):
+        self.model_data = model_data
+        self.defaults = AttrDict.from_yaml_string(model_data.attrs["defaults"])
+        self.run_config = AttrDict.from_yaml_string(model_data.attrs["run_config"])
+        self.subsets = AttrDict.from_yaml_string(model_data.attrs["subsets"])
+        self.inputs = _get_backend_inputs(model_data, self.run_config)
+        self.inactive_constraints = set()
+        self.solution = None
+        self.needs_rebuild = False
+        self.build_profiler = None
+        self._imasks = {}
+        self._mask_cache = MaskCache(model_data)
+        self.reset()
+
+    def reset(self):
+        self.variables = {}
+        self.expressions = {}
+        self.constraints = {}
+        self.objective = None
+        self.objective_sense = "minimize"
+        self._col_lower = []
+        self._col_upper = []
+        self._col_integrality = []
+        self._rows = []
+        self._cols = []
+        self._coeffs = []
+        self._row_lower = []
+        self._row_upper = []
+        self.num_cols = 0
+        self.num_rows = 0
+
+    def obj(self):
+        """Value of the objective function, mirroring `pyomo.Objective.__call__`."""
+        if self.solution is None:
+            raise ValueError("No value for uninitialized objective function")
+        return self.objective.evaluate(self.solution).item()
+
+    def get_imask(self, name, config):
+        if name not in self._imasks:
+            self._imasks[name] = create_valid_imask(
+                self.model_data, name, config, self._mask_cache
+            )
+        return self._imasks[name]
+
+    def get_param(self, name):
+        """
+        Get an input parameter as an array, with the default value applied where
+        it has not been defined.
+        Infinite values are treated as undefined, like in the Pyomo backend.
+
+        """
+        default = self.defaults.get(name, None)
+        if default is None:
+            default = np.nan
+        if name in self.inputs.data_vars:
+            param = self.inputs[name]
+            if param.dtype.kind == "f":
+                param = param.where(np.isfinite(param))
+            if not pd.isnull(default):
+                param = param.fillna(default)
+            return param
+        else:
+            return xr.DataArray(default)
+
+    def get_variable(self, name):
+        """
+        Get a decision variable as a LinearExpression. If the decision variable
+        does not exist but a parameter of the same name does (e.g. `energy_cap`
+        in operate mode), the parameter is returned as a constant expression.
+
+        """
+        if name in self.variables:
+            return LinearExpression.from_variable(self.variables[name])
+        elif name in self.inputs.data_vars:
+            return LinearExpression.from_constant(self.get_param(name).fillna(0))
+        else:
+            return LinearExpression.from_constant(0.0)
+
+    def get_expression(self, name):
+        if name in self.expressions:
+            return self.expressions[name]
+        else:
+            return LinearExpression.from_constant(0.0)
+
+    def variable_exists(self, name):
+        if name in self.variables:
+            return self.variables[name] >= 0
+        else:
+            return xr.DataArray(False)
+
+    def add_variable(self, name, imask, lower, upper, integrality):
+        positions = xr.full_like(imask, -1, dtype=int)
+        num_cols = int(imask.sum())
+        positions.values[imask.values] = np.arange(num_cols) + self.num_cols
+
+        for bounds, values in [(self._col_lower, lower), (self._col_upper, upper)]:
+            bounds.append(
+                xr.DataArray(values)
+                .broadcast_like(imask)
+                .transpose(*imask.dims)
+                .values[imask.values]
+            )
+        self._col_integrality.append(np.full(num_cols, integrality))
+        self.variables[name] = positions
+        self.num_cols += num_cols
+
+    def add_expression(self, name, imask, expression):
+        self.expressions[name] = expression.where(imask)
+
+    def add_constraint(self, name, imask, expression, lower, upper):
+        """
+        Add rows `lower <= expression <= upper` for all elements in `imask`.
+        Any constant in `expression` is moved to the bounds. Elements with
+        neither a lower nor an upper bound are skipped.
+
+        """
+        dims = imask.dims
+        extra_dims = set(expression.dims).difference(dims)
+        if extra_dims:
+            raise exceptions.BackendError(
+                f"Constraint `{name}` has unexpected dimension(s) {extra_dims}"
+            )
+        expression = expression.broadcast_like(imask)
+        constant = expression.constant.transpose(*dims).values
+        lower = xr.DataArray(lower).broadcast_like(imask).transpose(*dims).values
+        upper = xr.DataArray(upper).broadcast_like(imask).transpose(*dims).values
+        # Infinite bounds stay infinite, and infinite constants (e.g. the
+        # `energy_cap` of demand techs in operate mode) make a bound infinite
+        with np.errstate(invalid="ignore"):
+            lower = np.where(np.isinf(lower), lower, lower - constant)
+            upper = np.where(np.isinf(upper), upper, upper - constant)
+        mask = imask.values & ~(np.isneginf(lower) & np.isposinf(upper))
+
+        num_rows = int(mask.sum())
+        positions = xr.full_like(imask, -1, dtype=int)
+        positions.values[mask] = np.arange(num_rows) + self.num_rows
+
+        variables = expression.variables.transpose(*dims, "_term").values[mask]
+        coeffs = expression.coeffs.transpose(*dims, "_term").values[mask]
+        rows = np.broadcast_to(positions.values[mask][:, np.newaxis], variables.shape)
+        valid_terms = (variables >= 0) & (coeffs != 0)
+
+        self._rows.append(rows[valid_terms])
+        self._cols.append(variables[valid_terms])
+        self._coeffs.append(coeffs[valid_terms])
+        self._row_lower.append(lower[mask])
+        self._row_upper.append(upper[mask])
+        self.constraints.setdefault(name, []).append(positions)
+        self.num_rows += num_rows
+
+    def get_objective_vector(self):
+        """Objective function coefficient of each decision variable."""
+        c = np.zeros(self.num_cols)
+        variables = self.objective.variables.values.ravel()
+        coeffs = self.objective.coeffs.values.ravel()
+        np.add.at(c, variables[variables >= 0], coeffs[variables >= 0])
+        return c
+
+    def get_matrices(self):
+        """
+        Returns
+        -------
+        dict with the objective vector `c` (for minimisation), the constraint
+        matrix `A`, and the row, column and integrality bounds
+        """
+        c = self.get_objective_vector()
+        if self.objective_sense == "maximize":
+            c = -c
+
+        def _concat(arrays, dtype=float):
+            return np.concatenate(arrays) if arrays else np.empty(0, dtype=dtype)
+
+        return {
+            "c": c,
+            "A": sparse.csr_matrix(
+                (
+                    _concat(self._coeffs),
+                    (_concat(self._rows, int), _concat(self._cols, int)),
+                ),
+                shape=(self.num_rows, self.num_cols),
+            ),
+            "row_lower": _concat(self._row_lower),
+            "row_upper": _concat(self._row_upper),
+            "col_lower": _concat(self._col_lower),
+            "col_upper": _concat(self._col_upper),
+            "integrality": _concat(self._col_integrality, int),
+        }
+
+
+class HighsSolver:
+    """
+    Solve a :class:`SparseBackendModel` with the HiGHS solver bundled in SciPy.
+    `options` are passed on to :func:`scipy.optimize.milp`.
+    """
+
+    name = "highs"
+    type = "highs"
+
+    def __init__(self):
+        self.options = {}
+
+    def solve(self, backend_model):
+        problem = backend_model.get_matrices()
+        if problem["A"].shape[0] > 0:
+            linear_constraints = LinearConstraint(
+                problem["A"], problem["row_lower"], problem["row_upper"]
+            )
+        else:
+            linear_constraints = None
+        return milp(
+            problem["c"],
+            integrality=problem["integrality"],
+            bounds=Bounds(problem["col_lower"], problem["col_upper"]),
+            constraints=linear_constraints,
+            options=self.options,
+        )
+
+
+def _get_backend_inputs(model_data, run_config):
+    inputs = model_data[
+        [
+            k
+            for k, v in model_data.data_vars.items()
+            if v.attrs["is_result"] == 0
+            or (
+                v.attrs.get("operate_param", 0) == 1 and run_config["mode"] == "operate"
+            )
+        ]
+    ]
+    cost_class = run_config["objective_options"].get("cost_class", {})
+    if "costs" in model_data.dims:
+        objective_cost_class = [
+            cost_class.get(i, np.nan) for i in model_data.costs.values
+        ]
+    else:
+        objective_cost_class = []
+    inputs["objective_cost_class"] = xr.DataArray(objective_cost_class, dims=("costs",))
+    inputs["bigM"] = run_config.get("bigM", 1e10)
+    return inputs
+
+
+def build_variables(backend_model, variable_definitions, profiler):
+    for var_name, var_config in variable_definitions.items():
+        with profiler.component("variable", var_name) as record:
+            with record.timer("subset_time"):
+                imask = backend_model.get_imask(var_name, var_config)
+            if imask is None:
+                continue
+            domain_lower, domain_upper, integrality = DOMAINS[var_config.domain]
+            num_cols = backend_model.num_cols
+            with record.timer("rule_time"):
+                lower, upper = get_capacity_bounds(
+                    backend_model, var_config.get("bounds", {})
+                )
+                backend_model.add_variable(
+                    var_name,
+                    imask,
+                    lower=np.fmax(lower.fillna(-np.inf), domain_lower),
+                    upper=np.fmin(upper.fillna(np.inf), domain_upper),
+                    integrality=integrality,
+                )
+            record["indices"] = backend_model.num_cols - num_cols
+
+
+def get_capacity_bounds(backend_model, bounds):
+    """
+    Vectorised equivalent of
+    :func:`calliope.backend.pyomo.constraints.capacity.get_capacity_bounds`.
+    Returns lower and upper bound arrays, NaN where there is no bound.
+    """
+
+    def _get_bound(bound):
+        if bounds.get(bound) is not None:
+            return backend_model.get_param(bounds.get(bound))
+        else:
+            return xr.DataArray(np.nan)
+
+    scale = _get_bound("scale").fillna(1)
+    _equals = _get_bound("equals")
+    _min = _get_bound("min")
+    _max = _get_bound("max")
+
+    lower = xr.where(_equals.notnull(), _equals * scale, _min) * scale
+    upper = xr.where(_equals.notnull(), _equals * scale, _max) * scale
+
+    return lower, upper
+
+
+def _load_rule_function(module, name):
+    try:
+        return getattr(module, name)
+    except AttributeError:
+        return None
+
+
+def build_expressions(backend_model, expression_definitions, profiler):
+    build_order_dict = {
+        expr: config.get("build_order", 0)
+        for expr, config in expression_definitions.items()
+    }
+    build_order = sorted(build_order_dict, key=build_order_dict.get)
+
+    for expr_name in build_order:
+        with profiler.component("expression", expr_name) as record:
+            with record.timer("subset_time"):
+                imask = backend_model.get_imask(
+                    expr_name, expression_definitions[expr_name]
+                )
+            if imask is None:
+                continue
+            expression_function = _load_rule_function(
+                constraints, f"{expr_name}_expression"
+            )
+            with record.timer("rule_time"):
+                if expression_function:
+                    expression = expression_function(backend_model)
+                else:
+                    expression = LinearExpression.from_constant(0.0)
+                backend_model.add_expression(
+                    expr_name, imask, expression.broadcast_like(imask)
+                )
+            if profiler.enabled:
+                record["indices"] = int(imask.sum())
+                record["nonzeros"] = int(
+                    (backend_model.expressions[expr_name].variables >= 0).sum()
+                )
+
+
+def build_constraints(backend_model, constraint_definitions, profiler):
+    for constraint_name, constraint_config in constraint_definitions.items():
+        if constraint_name in backend_model.inactive_constraints:
+            continue
+        with profiler.component("constraint", constraint_name) as record:
+            with record.timer("subset_time"):
+                imask = backend_model.get_imask(constraint_name, constraint_config)
+            if imask is None:
+                continue
+            constraint_function = _load_rule_function(
+                constraints, f"{constraint_name}_constraint"
+            )
+            if constraint_function is None:
+                raise exceptions.BackendError(
+                    f"Constraint `{constraint_name}` is not available in the "
+                    "sparse backend."
+                )
+            num_rows, num_terms = backend_model.num_rows, len(backend_model._rows)
+            with record.timer("rule_time"):
+                for expression, lower, upper in constraint_function(backend_model):
+                    backend_model.add_constraint(
+                        constraint_name, imask, expression, lower, upper
+                    )
+            record["indices"] = backend_model.num_rows - num_rows
+            record["nonzeros"] = sum(
+                len(rows) for rows in backend_model._rows[num_terms:]
+            )
+
+
+def build_objective(backend_model):
+    objective_function = (
+        "calliope.backend.sparse.objective." + backend_model.run_config["objective"]
+    )
+    load_function(objective_function)(backend_model)
+
+
+def build_model(backend_model):
+    """(Re)build all model components from the current backend inputs."""
+    backend_model.reset()
+    profiler = BuildProfiler(
+        enabled=backend_model.run_config.get("build_profile", False)
+    )
+    build_variables(backend_model, backend_model.subsets["variables"], profiler)
+    build_expressions(backend_model, backend_model.subsets["expressions"], profiler)
+    build_constraints(backend_model, backend_model.subsets["constraints"], profiler)
+    backend_model.build_profiler = profiler
+    build_objective(backend_model)
+    backend_model.needs_rebuild = False
+
+
+def generate_model(model_data):
+    """
+    Generate a sparse backend model.
+
+    """
+    backend_model = SparseBackendModel(model_data)
+    build_model(backend_model)
+
+    return backend_model
+
+
+def get_build_profile(backend_model):
+    """
+    Time, size and memory use of building each variable, expression and
+    constraint, as a pandas DataFrame, if the model was (re)built with
+    `run.build_profile` set to True. None otherwise.
+    """
+    profiler = backend_model.build_profiler
+    if profiler is not None and profiler.enabled:
+        return profiler.to_dataframe()
+    else:
+        return None
+
+
+def get_timeseries_params(backend_model, window_model_data, timeseries_data_vars):
+    """
+    Get the values of timeseries parameters for a new operate mode window,
+    indexed over the timesteps of the backend model. Does not modify the
+    backend model, so can be run while another window is being solved.
+    """
+    return {
+        var: window_model_data[var].assign_coords(
+            timesteps=backend_model.inputs.timesteps
+        )
+        for var in timeseries_data_vars
+    }
+
+
+def update_timeseries_params(
+    backend_model, window_model_data, timeseries_data_vars, param_values=None
+):
+    """
+    Replace the values of timeseries parameters with those of a new operate
+    mode window. The backend model keeps the timesteps of the window it was
+    built with; only the values associated with those timesteps change.
+
+    If `param_values` is given, they are used as already prepared with
+    `get_timeseries_params`.
+    """
+    if param_values is None:
+        param_values = get_timeseries_params(
+            backend_model, window_model_data, timeseries_data_vars
+        )
+    for var in timeseries_data_vars:
+        backend_model.inputs[var] = param_values[var]
+    backend_model.needs_rebuild = True
+
+
+def solve_model(
+    backend_model,
+    solver,
+    solver_io=None,
+    solver_options=None,
+    save_logs=False,
+    opt=None,
+    **solve_kwargs,
+):
+    """
+    Solve a sparse backend model with HiGHS and all necessary solver options.
+
+    Returns a `scipy.optimize.OptimizeResult` object
+    """
+    if solver != "highs":
+        exceptions.warn(
+            f"The sparse backend always uses the HiGHS solver; `{solver}` will "
+            "not be used in this run."
+        )
+    # Warm starts are requested whenever a model is rerun, but HiGHS cannot be
+    # given a starting solution via SciPy
+    if solve_kwargs.pop("warmstart", False) is True:
+        logger.debug(
+            "The sparse backend does not support warmstart, which may "
+            "impact performance."
+        )
+    if opt is None:
+        opt = HighsSolver()
+
+    if solver_options:
+        for k, v in solver_options.items():
+            opt.options[k] = v
+
+    if backend_model.needs_rebuild:
+        build_model(backend_model)
+
+    results = opt.solve(backend_model)
+    logger.debug(results.message)
+
+    return results, opt
+
+
+def get_solver_statistics(results):
+    """
+    Number of iterations and time taken by the solver. Neither is reported by
+    SciPy's HiGHS interface, so both are NaN.
+    """
+    return {"iterations": np.nan, "solver_time": np.nan}
+
+
+def shift_solution(backend_model, num_timesteps):
+    """
+    Equivalent of :func:`calliope.backend.pyomo.model.shift_solution`, to warm
+    start an operate mode window from the solution of the previous window.
+    As the sparse backend cannot be warm started, the solution is left as is.
+    """
+
+
+def load_results(backend_model, results, opt):
+    """Load results into the model instance, for access via get_result_array."""
+    termination = TERMINATION_CONDITIONS.get(results.status, "other")
+
+    if termination == "optimal" and results.x is not None:
+        backend_model.solution = results.x
+    else:
+        backend_model.solution = None
+        logger.critical("Problem status:")
+        logger.critical(results.message)
+        exceptions.BackendWarning("Model solution was non-optimal.")
+
+    return termination
+
+
+def get_result_array(backend_model, model_data, names=None):
+    """
+    From a sparse backend model, extract decision variable and expression
+    values and return them as an xarray Dataset, with the same layout as the
+    Pyomo backend results. If `names` is given, only the variables and
+    expressions it contains are extracted.
+    """
+    solution = backend_model.solution
+    all_variables = {
+        name: xr.where(
+            positions >= 0, solution[np.clip(positions, 0, None)], np.nan
+        ).astype(float)
+        for name, positions in backend_model.variables.items()
+        if names is None or name in names
+    }
+    all_variables.update(
+        {
+            name: expression.evaluate(solution).where(backend_model._imasks[name])
+            for name, expression in backend_model.expressions.items()
+            if names is None or name in names
+        }
+    )
+
+    return reorganise_xarray_dimensions(xr.Dataset(all_variables))
@@ -0,0 +1,50 @@
+"""
+Copyright (C) since 2013 Calliope contributors listed in AUTHORS.
+Licensed under the Apache 2.0 License (see LICENSE file).
+
+objective.py
+~~~~~~~~~~~~
+
+Objective functions, equivalent to :mod:`calliope.backend.pyomo.objective`.
+
+"""
+
+import numpy as np
+
+from calliope.backend.sparse.expression import LinearExpression
+
+
+def minmax_cost_optimization(backend_model):
+    """
+    Minimize or maximise total system cost for specified cost class or a set of
+    cost classes. See :func:`calliope.backend.pyomo.objective.minmax_cost_optimization`.
+    """
+    objective_options = backend_model.run_config["objective_options"]
+    backend_model.objective_sense = objective_options.get("sense", "minimize")
+
+    cost_class = backend_model.get_param("objective_cost_class").fillna(0)
+    objective = (backend_model.get_expression("cost") * cost_class).sum(
+        ["costs", "nodes", "techs"]
+    )
+
+    if backend_model.run_config.get("ensure_feasibility", False):
+        unmet_demand = (
+            backend_model.get_variable("unmet_demand")
+            - backend_model.get_variable("unused_supply")
+        ) * backend_model.get_param("timestep_weights")
+        unmet_demand = unmet_demand.sum(
+            ["carriers", "nodes", "timesteps"]
+        ) * backend_model.get_param("bigM")
+        if backend_model.objective_sense == "maximize":
+            unmet_demand = unmet_demand * -1
+        objective = objective + unmet_demand
+
+    backend_model.objective = objective
+
+
+def check_feasibility(backend_model):
+    """
+    Dummy objective, to check that there are no conflicting constraints.
+    """
+    backend_model.objective_sense = "minimize"
+    backend_model.objective = LinearExpression.from_constant(np.float64(1))
@@ -0,0 +1,361 @@
+"""
+Copyright (C) since 2013 Calliope contributors listed in AUTHORS.
+Licensed under the Apache 2.0 License (see LICENSE file).
+
+writer.py
+~~~~~~~~~
+
+Write a sparse backend model to an LP or MPS file, without building any Pyomo
+objects. Rows and columns are written a chunk at a time, so that only the
+names of one chunk are held in memory. Row and column names are the same as
+the symbolic solver labels of the Pyomo backend.
+
+"""
+
+import gzip
+import logging
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from pyomo.core.base.component_namer import index_repr
+from pyomo.core.base.label import cpxlp_label_from_name
+
+from calliope import exceptions
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 10000
+
+
+class ComponentNamer:
+    """
+    Names of the rows or columns of a sparse backend model, generated on
+    demand from their position in the coefficient matrix.
+
+    Parameters
+    ----------
+    components : dict
+        Component name to array(s) of row/column positions (-1 where the
+        component does not exist), as in `SparseBackendModel.variables` or
+        `SparseBackendModel.constraints`.
+    suffix : str, optional
+        Appended to each component name, e.g. `_constraint` for constraints.
+
+    """
+
+    def __init__(self, components, suffix=""):
+        self._blocks = []
+        for name, positions in components.items():
+            if not isinstance(positions, list):
+                positions = [positions]
+            for block in positions:
+                flat_positions = block.values.ravel()
+                flat_index = np.flatnonzero(flat_positions >= 0)
+                if len(flat_index) == 0:
+                    continue
+                self._blocks.append(
+                    (
+                        flat_positions[flat_index[0]],
+                        name + suffix,
+                        flat_index,
+                        block.shape,
+                        [_index_items(block.coords[dim]) for dim in block.dims],
+                    )
+                )
+        self._blocks.sort(key=lambda x: x[0])
+        self._starts = np.array([i[0] for i in self._blocks], dtype=int)
+
+    def __call__(self, positions):
+        """
+        Get the names of all `positions`, which must be valid positions of
+        the components.
+        """
+        positions = np.asarray(positions, dtype=int)
+        block_nums = np.searchsorted(self._starts, positions, side="right") - 1
+        names = np.empty(len(positions), dtype=object)
+        for block_num in np.unique(block_nums):
+            start, name, flat_index, shape, items = self._blocks[block_num]
+            in_block = block_nums == block_num
+            indices = np.unravel_index(flat_index[positions[in_block] - start], shape)
+            names[in_block] = [
+                cpxlp_label_from_name(
+                    name + index_repr(_pyomo_index(i[j] for i, j in zip(items, idx)))
+                )
+                for idx in zip(*indices)
+            ]
+        return names
+
+
+def _pyomo_index(items):
+    # Pyomo indexes one-dimensional components by item, not by 1-tuple
+    items = tuple(items)
+    return items[0] if len(items) == 1 else items
+
+
+def _index_items(coord):
+    # Timesteps are strings in the Pyomo backend (see `datetime_to_string`)
+    if coord.dtype.kind == "M":
+        return pd.DatetimeIndex(coord.values).strftime("%Y-%m-%d %H:%M").tolist()
+    else:
+        return coord.values.tolist()
+
+
+def _chunks(num_items, chunk_size):
+    for start in range(0, num_items, chunk_size):
+        yield start, min(start + chunk_size, num_items)
+
+
+def _no_negative_zero(values):
+    return np.where(values == 0, 0.0, values)
+
+
+def get_format(path, format=None):
+    """
+    Get the file format (`lp` or `mps`) and whether to gzip-compress the file.
+    """
+    path = str(path)
+    compress = path.endswith(".gz")
+    if format is None:
+        format = "mps" if path[: -3 if compress else None].endswith(".mps") else "lp"
+    if format not in ["lp", "mps"]:
+        raise exceptions.ModelError(
+            f"Cannot write a model to `{format}` format; use `lp` or `mps`."
+        )
+    return format, compress
+
+
+def write_model(backend_model, path, format=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Write a sparse backend model to file.
+
+    Parameters
+    ----------
+    backend_model : SparseBackendModel
+    path : str
+        If it ends in `.gz`, the file is gzip-compressed.
+    format : str, optional
+        `lp` or `mps`. If not given, it is inferred from the file extension,
+        defaulting to `lp`.
+    chunk_size : int, optional
+        Number of rows or columns to name and write at a time.
+
+    """
+    format, compress = get_format(path, format)
+    problem = backend_model.get_matrices()
+    problem["c"] = backend_model.get_objective_vector()
+    problem["objective_constant"] = float(backend_model.objective.constant.sum())
+    row_names = ComponentNamer(backend_model.constraints, suffix="_constraint")
+    col_names = ComponentNamer(backend_model.variables)
+
+    # Rows only bounded from below are written as `-expression <= -lower`, as
+    # Pyomo does for constraints with decision variables on both sides
+    lower_only = np.isfinite(problem["row_lower"]) & ~np.isfinite(problem["row_upper"])
+    problem["A"] = sparse.diags(np.where(lower_only, -1.0, 1.0)) @ problem["A"]
+    problem["row_upper"] = np.where(
+        lower_only, -problem["row_lower"], problem["row_upper"]
+    )
+    problem["row_lower"] = np.where(lower_only, -np.inf, problem["row_lower"])
+
+    # Like Pyomo, only write columns that are referenced in the problem
+    problem["A"] = problem["A"].tocsr()
+    problem["A"].eliminate_zeros()
+    problem["referenced"] = (
+        np.bincount(problem["A"].indices, minlength=backend_model.num_cols) > 0
+    ) | (problem["c"] != 0)
+    problem["binary"] = np.zeros(backend_model.num_cols, dtype=bool)
+    for var_name, positions in backend_model.variables.items():
+        if backend_model.subsets.variables[var_name].domain == "Binary":
+            problem["binary"][positions.values[positions.values >= 0]] = True
+
+    logger.debug(
+        f"Writing {backend_model.num_rows} rows and {backend_model.num_cols} "
+        f"columns to {format} file in chunks of {chunk_size}"
+    )
+    if compress:
+        f = gzip.open(path, "wt")
+    else:
+        f = open(path, "w")
+    with f:
+        if format == "lp":
+            _write_lp(f, backend_model, problem, row_names, col_names, chunk_size)
+        else:
+            _write_mps(f, backend_model, problem, row_names, col_names, chunk_size)
+
+
+def _row_labels(row_names, lower, upper):
+    """
+    Labels of rows, with the prefixes of Pyomo's LP and MPS writers.
+    Rows with both a (different) lower and upper bound are split in two.
+    Rows are expected to have at least an upper bound.
+
+    Returns
+    -------
+    list of (label, sense, rhs) tuples for each row, where sense is one of
+    `E`, `G` or `L` (=, >= and <=, respectively)
+    """
+    labels = []
+    for name, lb, ub in zip(row_names, lower, upper):
+        if lb == ub:
+            labels.append([(f"c_e_{name}_", "E", lb)])
+        elif np.isfinite(lb) and np.isfinite(ub):
+            labels.append([(f"r_l_{name}_", "G", lb), (f"r_u_{name}_", "L", ub)])
+        else:
+            labels.append([(f"c_u_{name}_", "L", ub)])
+    return labels
+
+
+def _write_lp(f, backend_model, problem, row_names, col_names, chunk_size):
+    c = problem["c"]
+    f.write("\\* Source Calliope model *\\\n\n")
+    f.write("min \n" if backend_model.objective_sense == "minimize" else "max \n")
+    f.write("obj:\n")
+    for start, end in _chunks(len(c), chunk_size):
+        cols = np.flatnonzero(c[start:end]) + start
+        for name, coeff in zip(col_names(cols), c[cols]):
+            f.write("%+.17g %s\n" % (coeff, name))
+    if problem["objective_constant"] != 0:
+        f.write("%+.17g ONE_VAR_CONSTANT\n" % problem["objective_constant"])
+    f.write("\ns.t.\n\n")
+
+    A = problem["A"]
+    bound_templates = {"E": "= %.17g\n\n", "G": ">= %.17g\n\n", "L": "<= %.17g\n\n"}
+    for start, end in _chunks(backend_model.num_rows, chunk_size):
+        block = A[start:end]
+        cols = np.unique(block.indices)
+        names = dict(zip(cols, col_names(cols)))
+        labels = _row_labels(
+            row_names(np.arange(start, end)),
+            _no_negative_zero(problem["row_lower"][start:end]),
+            _no_negative_zero(problem["row_upper"][start:end]),
+        )
+        for row, row_labels in enumerate(labels):
+            terms = slice(block.indptr[row], block.indptr[row + 1])
+            expr = "".join(
+                "%+.17g %s\n" % (coeff, names[col])
+                for col, coeff in zip(block.indices[terms], block.data[terms])
+            )
+            if not expr:  # Trivial constraint
+                expr = "+0 ONE_VAR_CONSTANT\n"
+            for label, sense, rhs in row_labels:
+                f.write(f"{label}:\n{expr}")
+                f.write(bound_templates[sense] % rhs)
+
+    f.write("c_e_ONE_VAR_CONSTANT: \nONE_VAR_CONSTANT = 1.0\n\n")
+
+    f.write("bounds\n")
+    integers = []
+    binaries = []
+    for start, end in _chunks(backend_model.num_cols, chunk_size):
+        cols = np.flatnonzero(problem["referenced"][start:end]) + start
+        names = col_names(cols)
+        lower = _no_negative_zero(problem["col_lower"][cols])
+        upper = _no_negative_zero(problem["col_upper"][cols])
+        for name, lb, ub in zip(names, lower, upper):
+            f.write("   %.17g <= " % lb if np.isfinite(lb) else "    -inf <= ")
+            f.write(name)
+            f.write(" <= %.17g\n" % ub if np.isfinite(ub) else " <= +inf\n")
+        integer = problem["integrality"][cols] == 1
+        binaries.extend(names[integer & problem["binary"][cols]])
+        integers.extend(names[integer & ~problem["binary"][cols]])
+    if integers:
+        f.write("general\n")
+        f.writelines(f"  {name}\n" for name in integers)
+    if binaries:
+        f.write("binary\n")
+        f.writelines(f"  {name}\n" for name in binaries)
+    f.write("end\n")
+
+
+def _write_mps(f, backend_model, problem, row_names, col_names, chunk_size):
+    f.write("* Source:     Calliope model\n* Format:     Free MPS\n*\n")
+    f.write("NAME unknown\n")
+    f.write("OBJSENSE\n")
+    f.write(" MIN\n" if backend_model.objective_sense == "minimize" else " MAX\n")
+
+    def _chunk_row_labels(start, end):
+        return _row_labels(
+            row_names(np.arange(start, end)),
+            _no_negative_zero(problem["row_lower"][start:end]),
+            _no_negative_zero(problem["row_upper"][start:end]),
+        )
+
+    f.write("ROWS\n N  obj\n")
+    for start, end in _chunks(backend_model.num_rows, chunk_size):
+        for row_labels in _chunk_row_labels(start, end):
+            f.writelines(f" {sense}  {label}\n" for label, sense, _ in row_labels)
+    if problem["objective_constant"] != 0:
+        f.write(" E  c_e_ONE_VAR_CONSTANT\n")
+
+    f.write("COLUMNS\n")
+    A = problem["A"].tocsc()
+    c = problem["c"]
+    for start, end in _chunks(backend_model.num_cols, chunk_size):
+        block = A[:, start:end]
+        rows = np.unique(block.indices)
+        labels = dict(
+            zip(
+                rows,
+                _row_labels(
+                    row_names(rows),
+                    _no_negative_zero(problem["row_lower"][rows]),
+                    _no_negative_zero(problem["row_upper"][rows]),
+                ),
+            )
+        )
+        cols = np.flatnonzero(problem["referenced"][start:end])
+        for col, name in zip(cols, col_names(cols + start)):
+            if c[col + start] != 0:
+                f.write("     %s obj %.17g\n" % (name, c[col + start]))
+            terms = slice(block.indptr[col], block.indptr[col + 1])
+            for row, coeff in zip(block.indices[terms], block.data[terms]):
+                f.writelines(
+                    "     %s %s %.17g\n" % (name, label, coeff)
+                    for label, _, _ in labels[row]
+                )
+    if problem["objective_constant"] != 0:
+        f.write("     ONE_VAR_CONSTANT obj %.17g\n" % problem["objective_constant"])
+        f.write("     ONE_VAR_CONSTANT c_e_ONE_VAR_CONSTANT 1\n")
+
+    f.write("RHS\n")
+    for start, end in _chunks(backend_model.num_rows, chunk_size):
+        for row_labels in _chunk_row_labels(start, end):
+            f.writelines(
+                "     RHS %s %.17g\n" % (label, rhs) for label, _, rhs in row_labels
+            )
+    if problem["objective_constant"] != 0:
+        f.write("     RHS c_e_ONE_VAR_CONSTANT 1\n")
+
+    f.write("BOUNDS\n")
+    for start, end in _chunks(backend_model.num_cols, chunk_size):
+        cols = np.flatnonzero(problem["referenced"][start:end]) + start
+        names = col_names(cols)
+        lower = _no_negative_zero(problem["col_lower"][cols])
+        upper = _no_negative_zero(problem["col_upper"][cols])
+        integer = problem["integrality"][cols] == 1
+        binary = problem["binary"][cols]
+        for name, lb, ub, is_int, is_bin in zip(names, lower, upper, integer, binary):
+            if is_bin and lb == 0 and ub == 1:
+                f.write(f" BV BOUND {name}\n")
+            elif is_int:
+                f.write(
+                    " LI BOUND %s %.17g\n" % (name, lb)
+                    if np.isfinite(lb)
+                    else f" LI BOUND {name} -10E20\n"
+                )
+                f.write(
+                    " UI BOUND %s %.17g\n" % (name, ub)
+                    if np.isfinite(ub)
+                    else f" UI BOUND {name} 10E20\n"
+                )
+            elif not np.isfinite(lb) and not np.isfinite(ub):
+                f.write(f" FR BOUND {name}\n")
+            else:
+                f.write(
+                    " LO BOUND %s %.17g\n" % (name, lb)
+                    if np.isfinite(lb)
+                    else f" MI BOUND {name}\n"
+                )
+                if np.isfinite(ub):
+                    f.write(" UP BOUND %s %.17g\n" % (name, ub))
+    f.write("ENDATA\n")
@@ -14,13 +14,14 @@ import functools
 import re
 import ast
 
+import numpy as np
 import xarray as xr
 import pandas as pd
 from calliope.core.attrdict import AttrDict
 from calliope.core.util.dataset import reorganise_xarray_dimensions
 
 
-def create_valid_subset(model_data, name, config):
+def create_valid_subset(model_data, name, config, mask_cache=None):
     """
     Returns the subset for which a given constraint, variable or
     expression is valid, based on the given configuration. See `config/subsets.yaml` for
@@ -34,42 +35,122 @@ def create_valid_subset(model_data, name, config):
         Name of the constraint, variable or expression
     config : dict
         Configuration for the constraint, variable or expression
+    mask_cache : MaskCache, optional
+        Masks already evaluated on `model_data`, to be shared when creating the
+        subsets of all model components. If not given, nothing is shared.
 
     Returns
     -------
     valid_subset : pandas.MultiIndex
 
     """
+    imask, timesteps = _create_factored_imask(model_data, name, config, mask_cache)
+    if imask is None:
+        return None
+    else:
+        return _get_valid_subset(imask, timesteps)
+
+
+def create_valid_imask(model_data, name, config, mask_cache=None):
+    """
+    Returns the boolean mask over the dimensions in `foreach` for which a given
+    constraint, variable or expression is valid. This is the array form of the
+    subset returned by `create_valid_subset`, for backends that work directly
+    on arrays rather than on the indices of the subset.
+
+    Parameters
+    ----------
+
+    model_data : xarray.Dataset (calliope.Model._model_data)
+    name : str
+        Name of the constraint, variable or expression
+    config : dict
+        Configuration for the constraint, variable or expression
+    mask_cache : MaskCache, optional
+        Masks already evaluated on `model_data`, see `create_valid_subset`.
+
+    Returns
+    -------
+    imask : xarray.DataArray or None
+        Boolean array, with dimensions in alphabetical order (`timesteps` last).
+        None if the subset would be empty.
+
+    """
+
+    imask, timesteps = _create_factored_imask(model_data, name, config, mask_cache)
+    if imask is not None and timesteps is not None:
+        # Dimensions are already ordered, with `timesteps` added last
+        imask = imask & timesteps
+    return imask
+
+
+def _create_factored_imask(model_data, name, config, mask_cache=None):
+    """
+    Returns the mask of `create_valid_imask`, factored into its time-invariant
+    part and the timesteps over which it applies, if nothing in `where` or
+    `subset` varies over timesteps. This avoids evaluating `where` and building
+    the subset on a full (nodes, techs, carriers, timesteps) array for most
+    timeseries components.
+
+    Returns
+    -------
+    imask : xarray.DataArray or None
+        Boolean array, with dimensions in alphabetical order (`timesteps` last).
+        None if the subset would be empty.
+    timesteps : xarray.DataArray or None
+        Boolean array of valid timesteps, by which `imask` is to be expanded.
+        None if `imask` already includes all dimensions in `foreach`.
+
+    """
+    if mask_cache is None:
+        mask_cache = MaskCache(model_data)
+
+    foreach = list(config.foreach)
+    if not all(i in model_data.dims for i in foreach):
+        # ignore constraints/variables if the set doesn't even exist (e.g. datesteps)
+        return None, None
+
+    where_array = config.get_key("where", default=[])
+    if where_array:
+        where_imask = _imask_where(model_data, name, where_array, mask_cache=mask_cache)
+
+    if (
+        "timesteps" in foreach
+        and len(foreach) > 1
+        and not (where_array and "timesteps" in getattr(where_imask, "dims", []))
+        and "timesteps" not in config.get("subset", {})
+    ):
+        timesteps = model_data.timesteps.notnull()
+        foreach = [i for i in foreach if i != "timesteps"]
+    else:
+        timesteps = None
 
     # Start with a mask that is True where the tech exists at a node (across all timesteps and for a each carrier and cost, where appropriate)
-    imask = _imask_foreach(model_data, config.foreach)
-    if imask is False:  # i.e. not all of 'foreach' are in model_data
-        return None
+    imask = mask_cache.foreach(foreach)
     # Add "where" info as imasks
-    where_array = config.get_key("where", default=[])
     if where_array:
-        imask = _imask_where(model_data, name, where_array, imask, "and_")
+        imask = _combine_imasks(where_imask, imask, "and_")
 
     # Add imask based on subsets
     imask = _subset_imask(name, config, imask)
 
     # Only build and return imask if there are some non-zero elements
-    if isinstance(imask, xr.DataArray) and imask.sum() != 0:
+    if (
+        isinstance(imask, xr.DataArray)
+        and imask.sum() != 0
+        and (timesteps is None or timesteps.any())
+    ):
         # Squeeze out any unwanted dimensions
-        if len(imask.dims) > len(config.foreach):
-            imask = imask.sum([i for i in imask.dims if i not in config.foreach]) > 0
+        if len(imask.dims) > len(foreach):
+            imask = imask.sum([i for i in imask.dims if i not in foreach]) > 0
         # We have a problem if we have too few dimensions at this point...
-        if len(imask.dims) < len(config.foreach):
+        if len(imask.dims) < len(foreach):
             raise ValueError(f"Missing dimension(s) in imask for set {name}")
 
-        valid_subset = _get_valid_subset(
-            reorganise_xarray_dimensions(imask).astype(bool)
-        )
-
-        return valid_subset
+        return reorganise_xarray_dimensions(imask).astype(bool), timesteps
 
     else:
-        return None
+        return None, None
 
 
 def _param_exists(model_data, param):
@@ -82,10 +163,19 @@ def _param_exists(model_data, param):
             return False
 
 
-def _val_is(model_data, param, val):
+def _val_is(model_data, param, val, configs=None):
+    """
+    Mask of where `param` equals `val`, `val` being the string representation
+    of a Python literal. `param` can also be a `run.` or `model.` configuration
+    option, in which case the configuration is read from `configs`
+    (a dict of AttrDicts, keyed by "run" and "model") if given.
+    """
     if param.startswith(("model.", "run.")):
         group = param.split(".")[0]
-        config = AttrDict.from_yaml_string(model_data.attrs[f"{group}_config"])
+        if configs is not None and group in configs:
+            config = configs[group]
+        else:
+            config = AttrDict.from_yaml_string(model_data.attrs[f"{group}_config"])
         # TODO: update to str.removeprefix() in Python 3.9+
         imask = config.get_key(param[len(f"{group}.") :], None) == ast.literal_eval(val)
     elif param in model_data.data_vars.keys():
@@ -96,12 +186,30 @@ def _val_is(model_data, param, val):
     return imask
 
 
-def _get_valid_subset(imask):
-    if len(imask.dims) == 1:
-        return imask[imask].coords.to_index()
+def _get_valid_subset(imask, timesteps=None):
+    """
+    Index of all True elements of `imask`, in the order of its dimensions.
+    If given, the index is expanded over all True elements of `timesteps`,
+    as its last level. The index is built from the integer positions of
+    elements, without stacking `imask`.
+    """
+    names = list(imask.dims)
+    levels = [imask.indexes[dim] for dim in names]
+    codes = list(np.nonzero(imask.values))
+    if timesteps is not None:
+        timestep_codes = np.flatnonzero(timesteps.values)
+        num_elements = len(codes[0])
+        codes = [np.repeat(i, len(timestep_codes)) for i in codes]
+        codes.append(np.tile(timestep_codes, num_elements))
+        names.append("timesteps")
+        levels.append(timesteps.indexes["timesteps"])
+
+    if len(names) == 1:
+        return levels[0][codes[0]]
     else:
-        mask_stacked = imask.stack(dim_0=imask.dims)
-        return mask_stacked[mask_stacked].coords.to_index()
+        return pd.MultiIndex(
+            levels=levels, codes=codes, names=names, verify_integrity=False
+        )
 
 
 def _subset_imask(set_name, set_config, imask):
@@ -136,59 +244,147 @@ VALID_HELPER_FUNCTIONS = {
 }
 
 
-def _imask_where(
-    model_data, set_name, where_array, initial_imask=None, initial_operator=None
-):
+_FUNCTION_STATEMENT = re.compile(r"(\w+)\((\w+)\)")
+_EQUALS_STATEMENT = re.compile(r"([\w\.]+)\=([\'\w\.\:\,]+)")
+
+# Compiled `where` arrays, keyed by the array as nested tuples
+_COMPILED_WHERE = {}
+
+
+def _as_tuple(where_array):
+    return tuple(_as_tuple(i) if isinstance(i, list) else i for i in where_array)
+
+
+def _compile_where(set_name, where_array):
     """
-    Example mask: [cost_purchase, and, [param(energy_cap_max), or, not inheritance(supply_plus)]]
-    i.e. a list of "param(...)", "inheritance(...)" and operators.
-    Sublists will be handled recursively.
-    "not" before param/inheritance will invert the mask
+    Compile a `where` array into a tree of hashable tuples, which is evaluated
+    by `MaskCache.evaluate`. Leaves are `("function", func, val)`,
+    `("equals", param, val)` and `("exists", param)`, inner nodes are
+    `("not", node)` and `(operator, left, right)`. Statements are combined
+    from left to right, in the order they appear in the array.
+
+    Identical statements and sublists compile to equal trees, so their masks
+    are evaluated only once per MaskCache.
     """
-    imasks = []
-    operators = []
+    key = _as_tuple(where_array)
+    if key not in _COMPILED_WHERE:
+        _COMPILED_WHERE[key] = _compile_where_tuple(set_name, key)
+    return _COMPILED_WHERE[key]
 
-    def __is_function(imask_string):
-        return re.search(r"(\w+)\((\w+)\)", imask_string)
 
-    def __is_equals_statement(imask_string):
-        return re.search(r"([\w\.]+)\=([\'\w\.\:\,]+)", imask_string)
+def _compile_where_tuple(set_name, where_tuple):
+    nodes = []
+    operators = []
 
-    for i in where_array:
-        if isinstance(i, list):
-            imasks.append(_imask_where(model_data, set_name, i))
+    for i in where_tuple:
+        if isinstance(i, tuple):
+            nodes.append(_compile_where_tuple(set_name, i))
         elif i in ["or", "and"]:
             operators.append(i)
         else:
             # If it's not one of the operators, it is either a function, a val=foo, or
             # a val on its own (indicating the value should just exist)
-
             _not = False
             if i.startswith("not "):
                 _not = True
                 i = i.replace("not ", "")
-            if __is_function(i) is not None:
-                func, val = __is_function(i).groups()
-                imask = VALID_HELPER_FUNCTIONS[func](model_data, val)
-            elif __is_equals_statement(i) is not None:
-                param, val = __is_equals_statement(i).groups()
-                imask = _val_is(model_data, param, val)
-            elif i in model_data.data_vars.keys():
-                imask = _param_exists(model_data, i)
+            if _FUNCTION_STATEMENT.search(i) is not None:
+                node = ("function", *_FUNCTION_STATEMENT.search(i).groups())
+            elif _EQUALS_STATEMENT.search(i) is not None:
+                node = ("equals", *_EQUALS_STATEMENT.search(i).groups())
             else:
-                imask = False  # TODO: this should differntiate between a valid parameter not being in model_data and an e.g. incorrectly spelled parameter
+                node = ("exists", i)
             # Separately check whether the condition should be inverted
             if _not is True:
-                imask = ~imask
-            imasks.append(imask)
-    if len(imasks) - 1 != len(operators):
+                node = ("not", node)
+            nodes.append(node)
+    if len(nodes) - 1 != len(operators):
         raise ValueError(
             f"'where' array for set `{set_name}` must be a list of statements comma separated by {{and, or}} operators."
         )
-    # Run through and combine all imasks using defined operators
-    imask = imasks[0]
-    for i in range(len(imasks) - 1):
-        imask = _combine_imasks(imask, imasks[i + 1], operators[i])
+    node = nodes[0]
+    for i in range(len(nodes) - 1):
+        node = (operators[i], node, nodes[i + 1])
+
+    return node
+
+
+class MaskCache:
+    """
+    Masks evaluated on one model_data Dataset, to be shared across the subsets
+    of all model components: the masks of all `where` statements and their
+    combinations (see `_compile_where`), and the initial masks over each
+    combination of `foreach` dimensions.
+
+    The run and model configuration are parsed from `model_data.attrs` once,
+    on creating the cache. Since the cached masks are not updated if
+    `model_data` changes, a new cache should be used for each model build.
+
+    """
+
+    def __init__(self, model_data):
+        self.model_data = model_data
+        self.configs = {
+            group: AttrDict.from_yaml_string(model_data.attrs[f"{group}_config"])
+            for group in ["run", "model"]
+            if f"{group}_config" in model_data.attrs
+        }
+        self._masks = {}
+
+    def foreach(self, foreach):
+        """
+        Copy of the initial mask over the `foreach` dimensions (see
+        `_imask_foreach`), which can be modified in place.
+        """
+        key = ("foreach", tuple(foreach))
+        if key not in self._masks:
+            self._masks[key] = _imask_foreach(self.model_data, foreach)
+        imask = self._masks[key]
+        if isinstance(imask, xr.DataArray):
+            # Shallow copy of the coordinates, to avoid copying their indices
+            imask = imask.copy(deep=False, data=imask.values.copy())
+        return imask
+
+    def evaluate(self, node):
+        """Mask of a compiled `where` tree. Masks should not be modified in place."""
+        if node not in self._masks:
+            self._masks[node] = self._evaluate(node)
+        return self._masks[node]
+
+    def _evaluate(self, node):
+        kind = node[0]
+        if kind == "function":
+            return VALID_HELPER_FUNCTIONS[node[1]](self.model_data, node[2])
+        elif kind == "equals":
+            return _val_is(self.model_data, node[1], node[2], self.configs)
+        elif kind == "exists":
+            if node[1] in self.model_data.data_vars.keys():
+                return _param_exists(self.model_data, node[1])
+            else:
+                return False  # TODO: this should differntiate between a valid parameter not being in model_data and an e.g. incorrectly spelled parameter
+        elif kind == "not":
+            return ~self.evaluate(node[1])
+        else:
+            return _combine_imasks(self.evaluate(node[1]), self.evaluate(node[2]), kind)
+
+
+def _imask_where(
+    model_data,
+    set_name,
+    where_array,
+    initial_imask=None,
+    initial_operator=None,
+    mask_cache=None,
+):
+    """
+    Example mask: [cost_purchase, and, [param(energy_cap_max), or, not inheritance(supply_plus)]]
+    i.e. a list of "param(...)", "inheritance(...)" and operators.
+    Sublists will be handled recursively.
+    "not" before param/inheritance will invert the mask
+    """
+    if mask_cache is None:
+        mask_cache = MaskCache(model_data)
+    imask = mask_cache.evaluate(_compile_where(set_name, where_array))
 
     if initial_imask is not None and initial_operator is not None:
         imask = _combine_imasks(imask, initial_imask, initial_operator)
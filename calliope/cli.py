@@ -23,6 +23,7 @@ import click
 from calliope import AttrDict, Model, examples, read_netcdf
 from calliope._version import __version__
 from calliope.core.util.generate_runs import generate
+from calliope.core.util.run_batch import run_batch as run_batch_models
 from calliope.core.util.logging import set_log_verbosity
 from calliope.exceptions import BackendError
 
@@ -187,7 +188,9 @@ def new(path, template, debug):
         shutil.copytree(source_path, path)
 
 
-def _run_setup_model(model_file, scenario, model_format, override_dict):
+def _run_setup_model(
+    model_file, scenario, model_format, override_dict, preprocessing_cache=True
+):
     """
     Build model in CLI commands. Returns ``model``, a ready-to-run
     calliope.Model instance.
@@ -207,7 +210,12 @@ def _run_setup_model(model_file, scenario, model_format, override_dict):
             )
 
     if model_format == "yaml":
-        model = Model(model_file, scenario=scenario, override_dict=override_dict)
+        model = Model(
+            model_file,
+            scenario=scenario,
+            override_dict=override_dict,
+            preprocessing_cache=preprocessing_cache,
+        )
     elif model_format == "netcdf":
         if scenario is not None or override_dict is not None:
             raise ValueError(
@@ -231,9 +239,22 @@ def _run_setup_model(model_file, scenario, model_format, override_dict):
 @click.option("--save_logs")
 @click.option(
     "--save_lp",
-    help="Build and save model to the given LP file. "
+    help="Build and save model to the given LP file (or MPS file, if the file "
+    "extension is `.mps`; add `.gz` to compress the file). "
     "When this is set, the model is not sent to a solver, and all other save options are ignored.",
 )
+@click.option(
+    "--save_build_profile",
+    help="Save the time, size and memory use of building each backend model "
+    "component to the given JSON file (turns on `run.build_profile`).",
+)
+@click.option(
+    "--no_preprocessing_cache",
+    is_flag=True,
+    default=False,
+    help="Preprocess the model even if it is in the preprocessing cache given "
+    "in `model.preprocessing_cache.path`, and do not add it to the cache.",
+)
 @_debug
 @_quiet
 @_pdb
@@ -249,6 +270,8 @@ def run(
     save_csv,
     save_logs,
     save_lp,
+    save_build_profile,
+    no_preprocessing_cache,
     debug,
     quiet,
     pdb,
@@ -272,7 +295,13 @@ def run(
 
     with format_exceptions(debug, pdb, profile, profile_filename, start_time):
 
-        model = _run_setup_model(model_file, scenario, model_format, override_dict)
+        model = _run_setup_model(
+            model_file,
+            scenario,
+            model_format,
+            override_dict,
+            preprocessing_cache=not no_preprocessing_cache,
+        )
         click.secho(model.info() + "\n")
 
         # Only save LP file
@@ -293,6 +322,8 @@ def run(
 
             if save_logs:
                 model.run_config["save_logs"] = save_logs
+            if save_build_profile:
+                model.run_config["build_profile"] = True
 
             if save_csv is None and save_netcdf is None:
                 click.secho(
@@ -322,12 +353,120 @@ def run(
             if save_netcdf:
                 click.secho("Saving NetCDF results to file: {}".format(save_netcdf))
                 model.to_netcdf(save_netcdf)
+            if save_build_profile:
+                click.secho(
+                    "Saving backend build profile to file: {}".format(
+                        save_build_profile
+                    )
+                )
+                model._timings["backend_build_profile"].to_json(
+                    save_build_profile, orient="records", indent=2
+                )
 
             print_end_time(start_time)
             if fail_when_infeasible and termination != "optimal":
                 raise BackendError("Problem is infeasible.")
 
 
+@cli.command(
+    name="run_batch",
+    short_help="Run multiple models in parallel processes on this machine.",
+)
+@click.argument("model_file")
+@click.option("--scenarios")
+@click.option("--override_dict")
+@click.option(
+    "--processes",
+    type=int,
+    help="Number of worker processes (default: number of processors).",
+)
+@click.option(
+    "--solver_threads",
+    type=int,
+    help="Number of threads each run may use in the solver.",
+)
+@click.option(
+    "--save_netcdf",
+    help="Save the results of all runs to one NetCDF file, along the "
+    "`scenario` dimension.",
+)
+@click.option(
+    "--out_dir",
+    help="Save the model data of each run to a NetCDF file in this directory.",
+)
+@click.option(
+    "--shared_base",
+    is_flag=True,
+    default=False,
+    help="Preprocess a base model once and share its model data between all "
+    "worker processes in memory-mapped files.",
+)
+@click.option("--base_scenario", help="Scenario to apply to the shared base model.")
+@click.option(
+    "--no_preprocessing_cache",
+    is_flag=True,
+    default=False,
+    help="Preprocess all models even if they are in the preprocessing cache given "
+    "in `model.preprocessing_cache.path`, and do not add them to the cache.",
+)
+@_debug
+@_quiet
+@_pdb
+def run_batch(
+    model_file,
+    scenarios,
+    override_dict,
+    processes,
+    solver_threads,
+    save_netcdf,
+    out_dir,
+    shared_base,
+    base_scenario,
+    no_preprocessing_cache,
+    debug,
+    quiet,
+    pdb,
+):
+    """
+    Run a batch of scenarios of a model in parallel worker processes.
+    If ``--scenarios`` is not given, use all scenarios in the model
+    configuration, and if no scenarios are given in the model configuration,
+    uses all individual overrides, one by one.
+
+    """
+    start_time = _cli_start(debug, quiet)
+
+    with format_exceptions(debug, pdb, start_time=start_time):
+        if save_netcdf is None and out_dir is None:
+            click.secho(
+                "\n!!!\nWARNING: No options to save results have been "
+                "specified.\nModels will run without saving results!\n!!!\n",
+                fg="red",
+                bold=True,
+            )
+        results, summary = run_batch_models(
+            model_file,
+            scenarios=scenarios,
+            override_dict=override_dict,
+            processes=processes,
+            solver_threads=solver_threads,
+            out_dir=out_dir,
+            combine=save_netcdf is not None,
+            shared_base=shared_base,
+            base_scenario=base_scenario,
+            preprocessing_cache=not no_preprocessing_cache,
+        )
+        click.secho("\n" + summary.to_string() + "\n")
+        if save_netcdf:
+            click.secho("Saving NetCDF results to file: {}".format(save_netcdf))
+            results.to_netcdf(save_netcdf)
+
+        print_end_time(start_time)
+        failed = summary.index[summary.error.notnull()]
+        if len(failed) > 0:
+            raise BackendError("Batch runs failed: {}".format(", ".join(failed)))
+
+
 @cli.command(
     name="generate_runs", short_help="Generate a script to run multiple models."
 )
@@ -9,12 +9,26 @@ Functions to read and save model results.
 
 """
 
+import gzip
+import logging
 import os
+import pickle
+import shutil
+import tempfile
 
+import netCDF4
+import numpy as np
 import xarray as xr
 
 from calliope._version import __version__
 from calliope import exceptions
+from calliope.backend.sparse import model as run_sparse
+from calliope.backend.sparse import writer as sparse_writer
+
+logger = logging.getLogger(__name__)
+
+# Units in which datetime coordinates are written by the NetCDF writers below
+DATETIME_UNITS = "seconds since 1970-01-01 00:00:00"
 
 
 def read_netcdf(path):
@@ -78,6 +92,286 @@ def save_netcdf(model_data, path, model=None):
         model_data.attrs = original_model_data_attrs
 
 
+class _NetCDFAppendWriter:
+    """
+    Writes results to a NetCDF file one block at a time, along the unlimited
+    dimension `dim`. Data variables without this dimension are repeated over
+    its items in each block, as when concatenating the blocks with
+    `xarray.concat`.
+
+    The file must already exist and have the unlimited dimension, with `size`
+    items written so far.
+
+    """
+
+    dim = None
+    dim_units = None
+
+    def __init__(self, path, size=0):
+        self.path = path
+        self.size = size
+        # Decoded coordinates of the other dimensions, to align results to
+        self._coords = {}
+
+    def append(self, results):
+        """
+        Append `results`, an xarray Dataset indexed over the items of `dim`
+        following those already written.
+        """
+        with netCDF4.Dataset(self.path, "a") as dataset:
+            item_slice = self._append_items(dataset, results[self.dim].values)
+            for name, var in results.data_vars.items():
+                if self.dim not in var.dims:
+                    var = var.expand_dims({self.dim: results[self.dim]})
+                if name not in dataset.variables:
+                    for dim in var.dims:
+                        if dim not in dataset.dimensions:
+                            self._coords[dim] = var[dim].values
+                    _create_variable(dataset, name, var, self.dim)
+                    # Missing from all blocks written so far
+                    _write_empty(dataset[name], self.dim, slice(0, item_slice.start))
+                nc_var = dataset[name]
+                var = var.transpose(*nc_var.dimensions)
+                # Align to the coordinates in the file, which come from the
+                # inputs or the first block in which the variable was written
+                var = var.reindex(
+                    {
+                        dim: self._get_coords(dataset, dim)
+                        for dim in nc_var.dimensions
+                        if dim != self.dim
+                    }
+                )
+                nc_var[_get_index(nc_var, self.dim, item_slice)] = var.values
+
+            for name in self._get_data_vars(dataset):
+                if name not in results.data_vars:
+                    _write_empty(dataset[name], self.dim, item_slice)
+
+    def _create_dim(self, dataset):
+        dataset.createDimension(self.dim, None)
+        nc_var = dataset.createVariable(self.dim, "i8", (self.dim,))
+        if self.dim_units is not None:
+            nc_var.units = self.dim_units
+            nc_var.calendar = "proleptic_gregorian"
+
+    def _append_items(self, dataset, values):
+        start = self.size
+        self.size += len(values)
+        if self.dim_units is not None:
+            values = values.astype("datetime64[s]").astype("int64")
+        dataset[self.dim][start : self.size] = values
+        return slice(start, self.size)
+
+    def _get_coords(self, dataset, dim):
+        if dim not in self._coords:
+            self._coords[dim] = dataset[dim][:]
+        return self._coords[dim]
+
+    def _get_data_vars(self, dataset):
+        return [
+            name
+            for name, nc_var in dataset.variables.items()
+            if self.dim in nc_var.dimensions and name != self.dim
+        ]
+
+
+class NetCDFTimestepWriter(_NetCDFAppendWriter):
+    """
+    Writes results to a NetCDF file one block of timesteps at a time, along an
+    unlimited `timesteps` dimension, so that results do not need to be held
+    in memory until the end of a run (e.g. in operate mode).
+
+    Data variables without a `timesteps` dimension are repeated over the
+    timesteps of each block, as when concatenating the blocks with
+    `xarray.concat`.
+
+    Parameters
+    ----------
+    path : str
+        NetCDF file to write to. Any existing file is overwritten.
+    num_timesteps : int, optional
+        If given, continue writing to an existing file after its first
+        `num_timesteps` timesteps, overwriting any later timesteps.
+
+    """
+
+    dim = "timesteps"
+    dim_units = DATETIME_UNITS
+
+    def __init__(self, path, num_timesteps=0):
+        super().__init__(path, num_timesteps)
+        if num_timesteps > 0:
+            return
+        with netCDF4.Dataset(path, "w", format="NETCDF4") as dataset:
+            self._create_dim(dataset)
+
+    @property
+    def num_timesteps(self):
+        return self.size
+
+    def open_dataset(self, timesteps=None):
+        """
+        Lazily open the results written so far as an xarray Dataset.
+        Data is only read from file when accessed, and not cached.
+
+        If `timesteps` are given, any timesteps that follow those written are
+        added to the file, with all results set to NaN. This matches the
+        timesteps to those of the model data, so that the results can be
+        merged with it without being loaded into memory.
+        """
+        if timesteps is not None and len(timesteps) > self.size:
+            with netCDF4.Dataset(self.path, "a") as dataset:
+                timestep_slice = self._append_items(dataset, timesteps[self.size :])
+                for name in self._get_data_vars(dataset):
+                    _write_empty(dataset[name], self.dim, timestep_slice)
+        return xr.open_dataset(self.path, cache=False)
+
+
+class NetCDFSporesWriter(_NetCDFAppendWriter):
+    """
+    Writes the results of a SPORES mode run to a NetCDF file one SPORE at a
+    time, along an unlimited `spores` dimension, so that the results of all
+    SPORES do not need to be held in memory until the end of the run.
+
+    The model inputs, which are the same for all SPORES, are written once,
+    when the file is created. Inputs which differ between SPORES (e.g. the
+    spores scores in `cost_energy_cap`) are appended along with the results.
+
+    Parameters
+    ----------
+    path : str
+        NetCDF file to write to. Any existing file is overwritten.
+    inputs : xarray.Dataset
+        Model inputs which are the same for all SPORES.
+
+    """
+
+    dim = "spores"
+
+    def __init__(self, path, inputs):
+        super().__init__(path)
+        save_netcdf(inputs, path)
+        with xr.open_dataset(path) as dataset:
+            self._coords = {k: v.values for k, v in dataset.coords.items()}
+        with netCDF4.Dataset(path, "a") as dataset:
+            self._create_dim(dataset)
+
+    def open_dataset(self):
+        """
+        Lazily open the results written so far as an xarray Dataset, without
+        the model inputs written when the file was created.
+        Data is only read from file when accessed, and not cached.
+        """
+        dataset = xr.open_dataset(self.path, cache=False)
+        results = dataset[
+            [k for k, v in dataset.data_vars.items() if self.dim in v.dims]
+        ]
+        results.attrs = {}
+        return results
+
+
+def _get_index(nc_var, dim, dim_slice):
+    return tuple(dim_slice if i == dim else slice(None) for i in nc_var.dimensions)
+
+
+def _write_empty(nc_var, dim, dim_slice):
+    # Unwritten parts of a variable whose unlimited dimension is not its first
+    # are not reliably read back as missing, so they are always written
+    shape = [
+        dim_slice.stop - dim_slice.start
+        if i == dim
+        else len(nc_var.group().dimensions[i])
+        for i in nc_var.dimensions
+    ]
+    if 0 in shape:
+        return
+    elif nc_var.dtype == str:
+        values = np.full(shape, "", dtype=object)
+    else:
+        values = np.full(shape, np.nan)
+    nc_var[_get_index(nc_var, dim, dim_slice)] = values
+
+
+def _create_variable(dataset, name, var, unlimited_dim):
+    for dim in var.dims:
+        if dim not in dataset.dimensions:
+            values = var[dim].values
+            dataset.createDimension(dim, len(values))
+            if values.dtype.kind in "OUS":
+                dataset.createVariable(dim, str, (dim,))[:] = values.astype(object)
+            elif values.dtype.kind == "M":
+                nc_coord = dataset.createVariable(dim, "i8", (dim,))
+                nc_coord.units = DATETIME_UNITS
+                nc_coord.calendar = "proleptic_gregorian"
+                nc_coord[:] = values.astype("datetime64[s]").astype("int64")
+            else:
+                dataset.createVariable(dim, values.dtype, (dim,))[:] = values
+
+    if var.dtype.kind in "OUS":
+        nc_var = dataset.createVariable(name, str, var.dims)
+    else:
+        # Stored as floats, so that missing values can be NaN
+        chunksizes = [
+            var.sizes[dim] if dim == unlimited_dim else len(dataset.dimensions[dim])
+            for dim in var.dims
+        ]
+        nc_var = dataset.createVariable(
+            name,
+            "f8",
+            var.dims,
+            zlib=True,
+            complevel=4,
+            fill_value=np.nan,
+            chunksizes=chunksizes,
+        )
+    nc_var.setncatts(
+        {
+            k: int(v) if isinstance(v, bool) else "None" if v is None else v
+            for k, v in var.attrs.items()
+        }
+    )
+
+
+def save_shared_dataset(dataset, path):
+    """
+    Save `dataset` to the directory `path`, such that it can be memory-mapped
+    by several processes with :func:`open_shared_dataset`. Each numeric data
+    variable is saved to its own `.npy` file; coordinates, attributes and all
+    other data variables are saved together in one pickle.
+    """
+    os.makedirs(path, exist_ok=True)
+    mapped = [k for k, v in dataset.data_vars.items() if v.dtype.kind in "biufcmM"]
+    for name in mapped:
+        np.save(os.path.join(path, name + ".npy"), dataset[name].values)
+    skeleton = dataset.drop_vars(mapped)
+    mapped_vars = {name: (dataset[name].dims, dataset[name].attrs) for name in mapped}
+    with open(os.path.join(path, "dataset.pkl"), "wb") as f:
+        pickle.dump(
+            (skeleton, mapped_vars, list(dataset.data_vars)),
+            f,
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+
+
+def open_shared_dataset(path):
+    """
+    Open a dataset saved with :func:`save_shared_dataset`. Numeric data
+    variables are memory-mapped read-only, so that the memory holding them
+    is shared between all processes which open the same dataset.
+    """
+    with open(os.path.join(path, "dataset.pkl"), "rb") as f:
+        skeleton, mapped_vars, names = pickle.load(f)
+    data_vars = {}
+    for name in names:
+        if name in mapped_vars:
+            dims, attrs = mapped_vars[name]
+            data = np.load(os.path.join(path, name + ".npy"), mmap_mode="r")
+            data_vars[name] = xr.Variable(dims, data, attrs)
+        else:
+            data_vars[name] = skeleton[name].variable
+    return xr.Dataset(data_vars, coords=skeleton.coords, attrs=skeleton.attrs)
+
+
 def save_csv(model_data, path, dropna=True):
     """
     If termination condition was not optimal, filters inputs only, and
@@ -107,11 +401,56 @@ def save_csv(model_data, path, dropna=True):
         series.to_csv(out_path, header=True)
 
 
-def save_lp(model, path):
-    if not model.run_config["backend"] == "pyomo":
-        raise IOError("Only the pyomo backend can save to LP.")
+def save_lp(model, path, format=None, chunk_size=None):
+    """
+    Save the optimisation problem of a model to an LP or MPS file, which is
+    gzip-compressed if `path` ends in `.gz`.
+
+    If the backend model has already been built, it is written as is, including
+    any changes made to it via the backend interface. Otherwise, in `plan` mode,
+    the problem is written straight from the model data by the array-native
+    sparse backend, without building Pyomo objects and a chunk of rows/columns
+    at a time. Row and column names match those of the Pyomo backend.
+
+    Parameters
+    ----------
+    format : str, optional
+        `lp` or `mps`. If not given, it is inferred from the file extension,
+        defaulting to `lp`.
+    chunk_size : int, optional
+        Number of rows/columns written at a time by the sparse backend writer.
+    """
+    backend = model.run_config["backend"]
+    if backend not in ["pyomo", "sparse"]:
+        raise IOError("Only the pyomo and sparse backends can save to LP.")
+    format, _ = sparse_writer.get_format(path, format)
+    if chunk_size is None:
+        chunk_size = sparse_writer.DEFAULT_CHUNK_SIZE
+
+    if not hasattr(model, "_backend_model") and model.run_config["mode"] == "plan":
+        try:
+            backend_model = run_sparse.generate_model(model._model_data)
+        except exceptions.BackendError as e:
+            logger.info(f"Building the Pyomo backend model to save to file: {e}")
+        else:
+            return sparse_writer.write_model(backend_model, path, format, chunk_size)
+
     if not hasattr(model, "_backend_model"):
         model.run(build_only=True)
-    model._backend_model.write(
-        path, format="lp", io_options={"symbolic_solver_labels": True}
-    )
+    if backend == "sparse":
+        sparse_writer.write_model(model._backend_model, path, format, chunk_size)
+    else:
+        _save_pyomo_model(model._backend_model, path, format)
+
+
+def _save_pyomo_model(backend_model, path, format):
+    format, compress = sparse_writer.get_format(path, format)
+    io_options = {"symbolic_solver_labels": True}
+    if not compress:
+        backend_model.write(path, format=format, io_options=io_options)
+        return
+    with tempfile.TemporaryDirectory() as tempdir:
+        temp_path = os.path.join(tempdir, f"model.{format}")
+        backend_model.write(temp_path, format=format, io_options=io_options)
+        with open(temp_path, "rb") as f_in, gzip.open(path, "wb") as f_out:
+            shutil.copyfileobj(f_in, f_out)
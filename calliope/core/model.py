@@ -19,7 +19,8 @@ from calliope.preprocess import (
     model_run_from_yaml,
     model_run_from_dict,
 )
-from calliope.preprocess.model_data import ModelDataFactory
+from calliope.preprocess.model_data import ModelDataFactory, ModelDataUpdater
+from calliope.preprocess.cache import get_preprocessing_cache
 from calliope.core.attrdict import AttrDict
 from calliope.core.util.logging import log_time
 from calliope.core.util.observed_dict import UpdateObserverDict
@@ -44,7 +45,16 @@ class Model(object):
 
     """
 
-    def __init__(self, config, model_data=None, debug=False, *args, **kwargs):
+    def __init__(
+        self,
+        config,
+        model_data=None,
+        debug=False,
+        *args,
+        preprocessing_cache=True,
+        base_model=None,
+        **kwargs,
+    ):
         """
         Returns a new Model from either the path to a YAML model
         configuration file or a dict fully specifying the model.
@@ -59,18 +69,58 @@ class Model(object):
             This is only used if `config` is explicitly set to None
             and is primarily used to re-create a Model instance from
             a model previously saved to a NetCDF file.
+        preprocessing_cache : bool, default = True
+            If False, do not load the preprocessed model from, or add it to,
+            the cache in `model.preprocessing_cache.path`.
+        base_model : Model, optional
+            Model built from the same model configuration, e.g. with a
+            different scenario or override dictionary. If the two models only
+            differ in parameter values, the model data of `base_model` is
+            updated with the differences rather than built from scratch.
+            Ignored if `debug` is True.
 
         """
         self._timings = {}
         # try to set logging output format assuming python interactive. Will
         # use CLI logging format if model called from CLI
         log_time(logger, self._timings, "model_creation", comment="Model: initialising")
-        if isinstance(config, str):
-            model_run, debug_data = model_run_from_yaml(config, *args, **kwargs)
-            self._init_from_model_run(model_run, debug_data, debug)
-        elif isinstance(config, dict):
-            model_run, debug_data = model_run_from_dict(config, *args, **kwargs)
-            self._init_from_model_run(model_run, debug_data, debug)
+        if isinstance(config, (str, dict)):
+            # Debug data is not cached
+            if preprocessing_cache and not debug:
+                cache, cache_key = get_preprocessing_cache(config, *args, **kwargs)
+            else:
+                cache, cache_key = None, None
+            preprocessed = None if cache is None else cache.load(cache_key)
+
+            if preprocessed is not None:
+                self._init_from_preprocessed(preprocessed)
+            else:
+                if base_model is not None and not debug:
+                    base_model_run = base_model._model_run
+                else:
+                    base_model, base_model_run = None, None
+                if isinstance(config, str):
+                    model_run, debug_data = model_run_from_yaml(
+                        config, *args, base_model_run=base_model_run, **kwargs
+                    )
+                else:
+                    model_run, debug_data = model_run_from_dict(
+                        config, *args, base_model_run=base_model_run, **kwargs
+                    )
+                self._init_from_model_run(model_run, debug_data, debug, base_model)
+                if cache is not None:
+                    cache.save(
+                        cache_key,
+                        {
+                            "model_run": self._model_run,
+                            "model_data": self._model_data,
+                            "model_data_pre_clustering": (
+                                self._model_data_pre_clustering
+                            ),
+                        },
+                    )
+                    self._model_data.attrs["preprocessing_cache"] = "miss"
+                    self.inputs.attrs["preprocessing_cache"] = "miss"
         elif model_data is not None and config is None:
             self._init_from_model_data(model_data)
         else:
@@ -82,7 +132,7 @@ class Model(object):
             )
         self._check_future_deprecation_warnings()
 
-    def _init_from_model_run(self, model_run, debug_data, debug):
+    def _init_from_model_run(self, model_run, debug_data, debug, base_model=None):
         self._model_run = model_run
         log_time(
             logger,
@@ -91,6 +141,16 @@ class Model(object):
             comment="Model: preprocessing stage 1 (model_run)",
         )
 
+        if base_model is not None and self._init_from_base_model(base_model):
+            self._init_config_observers(model_run)
+            log_time(
+                logger,
+                self._timings,
+                "model_data_creation",
+                comment="Model: preprocessing complete",
+            )
+            return
+
         model_data_factory = ModelDataFactory(model_run)
         (
             model_data_pre_clustering,
@@ -113,6 +173,70 @@ class Model(object):
             comment="Model: preprocessing stage 2 (model_data)",
         )
 
+        self._init_config_observers(model_run)
+
+        log_time(
+            logger,
+            self._timings,
+            "model_data_creation",
+            comment="Model: preprocessing complete",
+        )
+
+    def _init_from_base_model(self, base_model):
+        """
+        Update the model data of `base_model` to that of this model, if they
+        only differ in parameter values. Returns whether it was updated.
+        """
+        updater = ModelDataUpdater(self._model_run, base_model._model_run)
+        model_data = updater(base_model._model_data)
+        if model_data is None:
+            logger.info(
+                "Model: base model differs by more than parameter values, "
+                "building model_data from scratch"
+            )
+            return False
+
+        base_model_data_pre_clustering = getattr(
+            base_model, "_model_data_pre_clustering", None
+        )
+        if base_model_data_pre_clustering is None:
+            model_data_pre_clustering = None
+        else:
+            model_data_pre_clustering = updater(
+                base_model_data_pre_clustering, check=False
+            )
+            if model_data_pre_clustering is None:
+                return False
+
+        self._model_data_pre_clustering = model_data_pre_clustering
+        self._model_data = model_data
+        self._base_model_updated_vars = updater.updated_vars
+        self.inputs = self._model_data.filter_by_attrs(is_result=0)
+        log_time(
+            logger,
+            self._timings,
+            "model_data_updated_from_base",
+            comment="Model: preprocessing stage 2 (model_data, updated {} "
+            "variables of the base model)".format(len(updater.updated_vars)),
+        )
+        return True
+
+    def _init_from_preprocessed(self, preprocessed):
+        self._model_run = preprocessed["model_run"]
+        self._model_data_pre_clustering = preprocessed["model_data_pre_clustering"]
+        self._model_data = preprocessed["model_data"]
+        self._model_data.attrs["preprocessing_cache"] = "hit"
+        self.inputs = self._model_data.filter_by_attrs(is_result=0)
+        self._init_config_observers(self._model_run)
+
+        log_time(
+            logger,
+            self._timings,
+            "model_data_creation",
+            comment="Model: loaded preprocessed model from cache",
+        )
+
+    def _init_config_observers(self, model_run):
         # Ensure model and run attributes of _model_data update themselves
         model_config = {
             k: v for k, v in model_run.get("model", {}).items() if k != "file_allowed"
@@ -131,13 +255,6 @@ class Model(object):
             observer=self._model_data,
         )
 
-        log_time(
-            logger,
-            self._timings,
-            "model_data_creation",
-            comment="Model: preprocessing complete",
-        )
-
     def _init_from_model_data(self, model_data):
         if "_model_run" in model_data.attrs:
             self._model_run = AttrDict.from_yaml_string(model_data.attrs["_model_run"])
@@ -189,11 +306,19 @@ class Model(object):
             comment="Model: loaded model_data",
         )
 
-    def run(self, force_rerun=False, **kwargs):
+    def run(self, force_rerun=False, results=None, resume=False, **kwargs):
         """
         Run the model. If ``force_rerun`` is True, any existing results
         will be overwritten.
 
+        If ``results`` is given, it updates the ``run.results`` option, which
+        defines the results to keep (and any aggregation to apply to them),
+        e.g. ``results={"energy_cap": None, "carrier_prod": {"timesteps": "sum"}}``.
+
+        If ``resume`` is True, an operate mode run continues from the last
+        checkpoint saved in ``run.operation.checkpoint.path`` by a previous,
+        interrupted run of the same model, if there is one.
+
         Additional kwargs are passed to the backend.
 
         """
@@ -214,8 +339,11 @@ class Model(object):
                 "there exist non-uniform timesteps (e.g. from time masking)"
             )
 
+        if results is not None:
+            self.run_config["results"] = results
+
         results, self._backend_model, self._backend_model_opt, interface = run_backend(
-            self._model_data, self._timings, **kwargs
+            self._model_data, self._timings, resume=resume, **kwargs
         )
 
         # Add additional post-processed result variables to results
@@ -274,12 +402,26 @@ class Model(object):
         """
         io.save_csv(self._model_data, path, dropna)
 
-    def to_lp(self, path):
+    def to_lp(self, path, format=None, chunk_size=None):
         """
-        Save built model to LP format at the given ``path``. If the backend
-        model has not been built yet, it is built prior to saving.
+        Save built model to LP (or MPS) format at the given ``path``.
+        If the backend model has not been built yet, the file is written
+        straight from the model data, chunk by chunk, in ``plan`` mode,
+        and the backend model is built prior to saving otherwise.
+
+        Parameters
+        ----------
+        path : str
+            If it ends in ``.gz``, the file is gzip-compressed.
+        format : str, optional
+            ``lp`` or ``mps``. If not given, it is inferred from the
+            extension of ``path``, defaulting to ``lp``.
+        chunk_size : int, optional
+            Number of rows/columns written at a time when writing straight
+            from the model data.
+
         """
-        io.save_lp(self, path)
+        io.save_lp(self, path, format, chunk_size)
 
     def info(self):
         info_strings = []
@@ -0,0 +1,132 @@
+"""
+Copyright (C) since 2013 Calliope contributors listed in AUTHORS.
+Licensed under the Apache 2.0 License (see LICENSE file).
+
+cache.py
+~~~~~~~~
+
+On-disk, least recently used cache of pickled objects, e.g. built backend
+models or preprocessed model data.
+
+"""
+
+import contextlib
+import gc
+import glob
+import logging
+import os
+import pickle
+import tempfile
+
+import numpy as np
+
+from calliope import exceptions
+
+logger = logging.getLogger(__name__)
+
+
+@contextlib.contextmanager
+def _gc_disabled():
+    # (Un)pickling large models creates large numbers of small objects, which
+    # repeatedly trigger the garbage collector to no avail
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class PickleCache:
+    """
+    Least recently used cache of pickled objects in a directory.
+
+    Parameters
+    ----------
+    path : str
+        Directory in which to store objects. Created if it does not exist.
+    max_size : float, optional
+        Maximum total size of the cached objects, in bytes.
+        The least recently used objects are removed to keep within it.
+
+    """
+
+    suffix = ".pickle"
+    # Description of the cached objects, for log and warning messages
+    description = "object"
+
+    def __init__(self, path, max_size=np.inf):
+        self.path = path
+        self.max_size = max_size
+        os.makedirs(path, exist_ok=True)
+
+    def _get_filename(self, key):
+        return os.path.join(self.path, key + self.suffix)
+
+    def load(self, key):
+        """
+        Return the object cached under `key`, or None if there is none.
+        """
+        filename = self._get_filename(key)
+        try:
+            with open(filename, "rb") as f, _gc_disabled():
+                obj = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            logger.debug(
+                "Removing unreadable {} cache {}".format(self.description, filename)
+            )
+            os.remove(filename)
+            return None
+
+        # Mark as most recently used
+        os.utime(filename)
+        return obj
+
+    def save(self, key, obj):
+        """
+        Cache `obj` under `key`, then remove the least recently used objects
+        if the cache has grown larger than `max_size`.
+        """
+        fd, tmp_filename = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f, _gc_disabled():
+                pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, AttributeError, TypeError) as e:
+            os.remove(tmp_filename)
+            exceptions.warn(
+                "{} could not be cached: {}".format(self.description.capitalize(), e)
+            )
+            return
+        except BaseException:
+            os.remove(tmp_filename)
+            raise
+        # Replacing the file in one step means that other processes never
+        # read a partially written object
+        os.replace(tmp_filename, self._get_filename(key))
+        self.evict()
+
+    def evict(self):
+        """
+        Remove the least recently used objects until the cache is no larger
+        than `max_size`.
+        """
+        filenames = sorted(
+            glob.glob(os.path.join(self.path, "*" + self.suffix)),
+            key=os.path.getmtime,
+            reverse=True,
+        )
+        size = 0
+        for i, filename in enumerate(filenames):
+            size += os.path.getsize(filename)
+            if size > self.max_size:
+                for to_remove in filenames[i:]:
+                    logger.debug(
+                        "Removing {} cache {}".format(self.description, to_remove)
+                    )
+                    # May already have been removed by another process
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(to_remove)
+                break
@@ -11,7 +11,12 @@ Create the Calliope logger object and apply other logging tools/functionality
 
 import datetime
 import logging
+import os
 import sys
+import time
+from contextlib import contextmanager
+
+import pandas as pd
 
 _time_format = "%Y-%m-%d %H:%M:%S"
 
@@ -100,3 +105,82 @@ class LogWriter:
 
     def flush(self):
         pass
+
+
+def get_rss():
+    """
+    Resident set size of the current process, in bytes.
+    Returns NaN on platforms that do not provide `/proc/self/statm`.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return float("nan")
+
+
+class BuildProfiler:
+    """
+    Record the cost of building each variable, expression and constraint of a
+    backend model: the time taken to create its valid subset and to apply its
+    rule, its number of indices and nonzero coefficients, and the change in
+    memory use (RSS, in bytes) of the process while it was built.
+
+    Only used if the run configuration option ``build_profile`` is True,
+    otherwise the backend builds with ``enabled=False``, which times nothing
+    and keeps no records.
+
+    """
+
+    columns = [
+        "component_type",
+        "component",
+        "subset_time",
+        "rule_time",
+        "indices",
+        "nonzeros",
+        "rss_delta",
+    ]
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.records = []
+
+    @contextmanager
+    def component(self, component_type, name):
+        """
+        Context manager around building one component. Yields a dict, to which
+        the number of `indices` and `nonzeros` can be added, and the
+        `timer` of which measures the `subset_time` and `rule_time`.
+        """
+        record = _ComponentRecord(self.enabled, component_type, name)
+        rss = get_rss() if self.enabled else None
+        yield record
+        if self.enabled:
+            record["rss_delta"] = get_rss() - rss
+            self.records.append(dict(record))
+
+    def to_dataframe(self):
+        return pd.DataFrame(self.records, columns=self.columns)
+
+
+class _ComponentRecord(dict):
+    def __init__(self, enabled, component_type, name):
+        super().__init__(
+            component_type=component_type,
+            component=name,
+            subset_time=float("nan"),
+            rule_time=float("nan"),
+            indices=0,
+            nonzeros=float("nan"),
+        )
+        self.enabled = enabled
+
+    @contextmanager
+    def timer(self, key):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        yield
+        self[key] = time.perf_counter() - start
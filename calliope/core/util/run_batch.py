@@ -0,0 +1,399 @@
+"""
+Copyright (C) since 2013 Calliope contributors listed in AUTHORS.
+Licensed under the Apache 2.0 License (see LICENSE file).
+
+run_batch.py
+~~~~~~~~~~~~
+
+Run multiple versions of the same model in parallel processes on the local
+machine, collecting their results.
+
+"""
+
+import concurrent.futures
+import logging
+import os
+import pickle
+import tempfile
+import time
+
+import pandas as pd
+import xarray as xr
+
+from calliope.backend.checkpoint import CARRIED_OVER
+from calliope.core.attrdict import AttrDict
+from calliope.core.io import open_shared_dataset, save_shared_dataset
+from calliope.core.util.tools import relative_path
+
+logger = logging.getLogger(__name__)
+
+# Solver option setting the number of threads used by each solver
+SOLVER_THREADS_OPTIONS = {"gurobi": "Threads", "cplex": "threads", "cbc": "threads"}
+
+# Directory backed by shared memory, if available, in which to save the model
+# data of a shared base model
+SHARED_MEMORY_DIR = "/dev/shm"
+
+# Base model configuration, timeseries dataframes and shared base model,
+# loaded once in each worker process by `_init_batch_worker`
+_batch_worker = {}
+
+
+def get_batch_runs(config, scenarios=None, override_dicts=None):
+    """
+    Get the runs of a batch, as a dict with run names as keys and
+    ``(scenario, override_dict)`` tuples as values.
+
+    If neither ``scenarios`` nor ``override_dicts`` are given, use all
+    scenarios in the model configuration, and if no scenarios are given in
+    the model configuration, use all individual overrides, one by one.
+
+    """
+    if isinstance(scenarios, str):
+        scenarios = scenarios.split(";")
+    if not isinstance(override_dicts, (dict, type(None))):
+        override_dicts = {
+            "override_{}".format(i + 1): override
+            for i, override in enumerate(override_dicts)
+        }
+
+    if scenarios is None and override_dicts is None:
+        if "scenarios" in config:
+            scenarios = list(config.scenarios.keys())
+        else:
+            scenarios = list(config.overrides.keys())
+
+    runs = {scenario: (scenario, None) for scenario in scenarios or []}
+    runs.update(
+        {name: (None, override) for name, override in (override_dicts or {}).items()}
+    )
+
+    return runs
+
+
+def run_batch(
+    model_file,
+    scenarios=None,
+    override_dicts=None,
+    override_dict=None,
+    timeseries_dataframes=None,
+    processes=None,
+    solver_threads=None,
+    out_dir=None,
+    combine=True,
+    shared_base=False,
+    base_scenario=None,
+    preprocessing_cache=True,
+):
+    """
+    Run a batch of scenarios and/or overrides of a model in parallel processes.
+    The model configuration is loaded once, and each worker process runs
+    several models, so that Calliope and its dependencies are only imported
+    once per worker process.
+
+    Parameters
+    ----------
+    model_file : str
+        Path to YAML file with model configuration.
+    scenarios : str or list of str, optional
+        Scenarios to run, either as a list or as a semicolon-separated string.
+        Each scenario can either be a named scenario, or a comma-separated
+        list of individual overrides to be combined ad-hoc.
+    override_dicts : dict or list of dicts, optional
+        Override dictionaries to run, in addition to ``scenarios``. If a dict,
+        keys are run names. If a list, runs are named ``override_1``, ...
+    override_dict : dict or AttrDict or str, optional
+        Override dictionary applied to all runs. Applied after any run-specific
+        override dictionary.
+    timeseries_dataframes : dict, optional
+        Dictionary of timeseries dataframes, passed on to every run.
+    processes : int, optional
+        Number of worker processes. Defaults to the number of processors.
+    solver_threads : int, optional
+        Number of threads each run may use in the solver, if the solver
+        supports it (gurobi, cplex or cbc).
+    out_dir : str, optional
+        Directory in which to save the model data of each run to a NetCDF file,
+        as soon as the run is complete.
+    combine : bool, default = True
+        If True, return the results of all runs combined along the new
+        dimension ``scenario``, which is indexed over run names.
+    shared_base : bool, default = False
+        If True, preprocess a base model once and memory-map its model data in
+        all worker processes. Each run then only holds those arrays of its
+        model data which differ from the base model in memory of its own.
+        Runs which only differ from the base model in parameter values update
+        its model data rather than building their own from scratch.
+    base_scenario : str, optional
+        Scenario to apply to the shared base model, e.g. one that all runs
+        have in common.
+    preprocessing_cache : bool, default = True
+        If False, do not use the preprocessing cache given in
+        ``model.preprocessing_cache.path``.
+
+    Returns
+    -------
+    results : xarray.Dataset or None
+        Results of all runs, if ``combine`` is True.
+    summary : pandas.DataFrame
+        Indexed over run names, with the termination condition and objective
+        function value of each run, the time taken to preprocess and to run
+        the model, the worker process ID, the number of model data arrays
+        shared with the base model, whether the model data was updated from
+        that of the base model, and the error message of any run which failed.
+
+    """
+    config = AttrDict.from_yaml(model_file)
+    # Relative paths can no longer be resolved once the configuration is
+    # passed on without the path to the model file
+    if "timeseries_data_path" in config.get("model", {}):
+        config.model.timeseries_data_path = os.path.abspath(
+            relative_path(model_file, config.model.timeseries_data_path)
+        )
+    if isinstance(override_dict, str):
+        override_dict = AttrDict.from_yaml_string(override_dict)
+
+    runs = get_batch_runs(config, scenarios, override_dicts)
+    if out_dir is not None:
+        os.makedirs(out_dir, exist_ok=True)
+        # len(str(x)) gives us the number of digits in x, for padding
+        i_string = "{:0>" + str(len(str(len(runs)))) + "d}"
+        out_files = {
+            name: os.path.join(out_dir, f"out_{i_string.format(i + 1)}_{name}.nc")
+            for i, name in enumerate(runs)
+        }
+    else:
+        out_files = {name: None for name in runs}
+
+    shared_base_dir = None
+    if shared_base:
+        shared_base_dir = tempfile.TemporaryDirectory(
+            prefix="calliope_base_",
+            dir=SHARED_MEMORY_DIR if os.path.isdir(SHARED_MEMORY_DIR) else None,
+        )
+
+    results = {}
+    summary = {}
+    # The shared base model is removed even if the batch fails, as it is held
+    # in memory if saved to shared memory
+    try:
+        if shared_base_dir is not None:
+            _save_shared_base(
+                shared_base_dir.name,
+                config,
+                base_scenario,
+                override_dict,
+                timeseries_dataframes,
+                preprocessing_cache,
+            )
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=processes,
+            initializer=_init_batch_worker,
+            initargs=(
+                config,
+                timeseries_dataframes,
+                None if shared_base_dir is None else shared_base_dir.name,
+            ),
+        ) as executor:
+            futures = {
+                executor.submit(
+                    _run_batch_model,
+                    scenario,
+                    _combine_override_dicts(run_override_dict, override_dict),
+                    solver_threads,
+                    out_files[name],
+                    combine,
+                    preprocessing_cache,
+                ): name
+                for name, (scenario, run_override_dict) in runs.items()
+            }
+            for future in concurrent.futures.as_completed(futures):
+                name = futures[future]
+                summary[name], results[name] = future.result()
+                logger.info(
+                    "Batch run `{}` ({}/{}) complete in {:.2f} seconds: {}".format(
+                        name,
+                        len(summary),
+                        len(runs),
+                        summary[name]["preprocessing_time"] + summary[name]["run_time"],
+                        summary[name]["termination_condition"],
+                    )
+                )
+    finally:
+        if shared_base_dir is not None:
+            shared_base_dir.cleanup()
+
+    summary = pd.DataFrame.from_dict(summary, orient="index").reindex(list(runs))
+    summary.index.name = "scenario"
+
+    names = [name for name in runs if results[name] is not None]
+    if combine and names:
+        combined_results = xr.concat(
+            [results[name] for name in names],
+            dim=pd.Index(names, name="scenario"),
+            combine_attrs="drop_conflicts",
+        )
+    else:
+        combined_results = None
+
+    return combined_results, summary
+
+
+def _combine_override_dicts(*override_dicts):
+    combined = AttrDict()
+    for override_dict in override_dicts:
+        if override_dict:
+            combined.union(
+                AttrDict(override_dict), allow_override=True, allow_replacement=True
+            )
+    return combined or None
+
+
+def _copy_timeseries_dataframes(timeseries_dataframes):
+    # Timeseries are loaded into the dataframes in place, so each model gets
+    # its own (shallow) copy of them
+    if timeseries_dataframes is None:
+        return None
+    return {k: v.copy(deep=False) for k, v in timeseries_dataframes.items()}
+
+
+def _save_shared_base(
+    path, config, scenario, override_dict, timeseries_dataframes, preprocessing_cache
+):
+    from calliope.core.model import Model
+
+    model = Model(
+        config.copy(),
+        scenario=scenario,
+        override_dict=override_dict,
+        timeseries_dataframes=_copy_timeseries_dataframes(timeseries_dataframes),
+        preprocessing_cache=preprocessing_cache,
+    )
+    save_shared_dataset(model._model_data, path)
+    with open(os.path.join(path, "model_run.pkl"), "wb") as f:
+        pickle.dump(model._model_run, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _open_shared_base(path):
+    from calliope.core.model import Model
+
+    base_model = Model(config=None, model_data=open_shared_dataset(path))
+    with open(os.path.join(path, "model_run.pkl"), "rb") as f:
+        base_model._model_run = pickle.load(f)
+    return base_model
+
+
+def _init_batch_worker(config, timeseries_dataframes, shared_base_path):
+    _batch_worker.update(
+        config=config,
+        timeseries_dataframes=timeseries_dataframes,
+        shared_base=(
+            None if shared_base_path is None else _open_shared_base(shared_base_path)
+        ),
+    )
+
+
+def _use_shared_base(model, base):
+    """
+    Use the memory-mapped arrays of the `base` model data for all arrays of the
+    model data of `model` which are the same. Returns the number of shared
+    arrays.
+
+    If `model` was updated from the base model, its model data already holds
+    the memory-mapped arrays of all variables which were not updated. Otherwise,
+    its arrays are compared to those of the base model and replaced by the
+    latter if equal. Arrays which operate mode updates in place are never
+    shared, as the memory-mapped arrays are read-only.
+    """
+    model_data = model._model_data
+    names = [
+        name
+        for name in model_data.data_vars
+        if name in base.data_vars and name not in CARRIED_OVER
+    ]
+    updated_vars = getattr(model, "_base_model_updated_vars", None)
+    if updated_vars is not None:
+        return len([name for name in names if name not in updated_vars])
+
+    shared = [name for name in names if model_data[name].equals(base[name])]
+    for name in shared:
+        var = model_data[name].variable
+        model_data[name] = xr.Variable(var.dims, base[name].variable.data, var.attrs)
+    # Drop all other references to the replaced arrays
+    model.inputs = model_data.filter_by_attrs(is_result=0)
+    model._model_data_pre_clustering = None
+
+    return len(shared)
+
+
+def _run_batch_model(
+    scenario, override_dict, solver_threads, out_file, combine, preprocessing_cache
+):
+    """
+    Build and run one model of a batch in a worker process.
+    """
+    from calliope.core.model import Model
+
+    summary = {
+        "termination_condition": None,
+        "objective_function_value": None,
+        "preprocessing_time": 0.0,
+        "run_time": 0.0,
+        "worker": os.getpid(),
+        "shared_variables": 0,
+        "updated_from_base": False,
+        "error": None,
+    }
+    start = time.perf_counter()
+    try:
+        model = Model(
+            _batch_worker["config"].copy(),
+            scenario=scenario,
+            override_dict=override_dict,
+            timeseries_dataframes=_copy_timeseries_dataframes(
+                _batch_worker["timeseries_dataframes"]
+            ),
+            preprocessing_cache=preprocessing_cache,
+            base_model=_batch_worker["shared_base"],
+        )
+        if _batch_worker["shared_base"] is not None:
+            summary["updated_from_base"] = (
+                "model_data_updated_from_base" in model._timings
+            )
+            summary["shared_variables"] = _use_shared_base(
+                model, _batch_worker["shared_base"]._model_data
+            )
+        summary["preprocessing_time"] = time.perf_counter() - start
+
+        if solver_threads is not None:
+            _set_solver_threads(model, solver_threads)
+        start = time.perf_counter()
+        model.run()
+        summary["run_time"] = time.perf_counter() - start
+    except Exception as e:
+        summary["error"] = "{}: {}".format(type(e).__name__, e)
+        return summary, None
+
+    summary["termination_condition"] = model.results.attrs.get(
+        "termination_condition", None
+    )
+    summary["objective_function_value"] = model.results.attrs.get(
+        "objective_function_value", None
+    )
+    if out_file is not None:
+        model.to_netcdf(out_file)
+
+    return summary, model.results if combine else None
+
+
+def _set_solver_threads(model, solver_threads):
+    solver = model.run_config["solver"].replace("_persistent", "")
+    if solver in SOLVER_THREADS_OPTIONS:
+        solver_options = dict(model.run_config.get("solver_options", None) or {})
+        solver_options[SOLVER_THREADS_OPTIONS[solver]] = solver_threads
+        model.run_config["solver_options"] = solver_options
+    else:
+        logger.warning(
+            "The number of solver threads cannot be set for solver `{}`; "
+            "ignoring `solver_threads`.".format(solver)
+        )
@@ -55,7 +55,14 @@ class memoize_instancemethod(object):
             cache = obj.__cache
         except AttributeError:
             cache = obj.__cache = {}
-        key = (self.func, args[1:], frozenset(list(kw.items())))
+        # Keyed by the name of the method rather than the method itself, so
+        # that the cache can be pickled along with the instance
+        key = (
+            self.func.__module__,
+            self.func.__qualname__,
+            args[1:],
+            frozenset(list(kw.items())),
+        )
         try:
             res = cache[key]
         except KeyError:
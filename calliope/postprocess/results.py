@@ -14,11 +14,24 @@ import logging
 import xarray as xr
 import numpy as np
 
+from calliope import exceptions
 from calliope.core.util.logging import log_time
 from calliope.core.attrdict import AttrDict
 
 logger = logging.getLogger(__name__)
 
+# Results which are computed in post-processing (or combined from more than
+# one backend result), and the backend results they are computed from
+POSTPROCESSED_RESULTS = {
+    "capacity_factor": ("carrier_prod", "energy_cap"),
+    "systemwide_capacity_factor": ("carrier_prod", "energy_cap"),
+    "systemwide_levelised_cost": ("carrier_prod", "cost"),
+    "total_levelised_cost": ("carrier_prod", "cost"),
+    "unmet_demand": ("unmet_demand", "unused_supply"),
+}
+
+AGGREGATION_METHODS = ("sum", "mean", "min", "max")
+
 
 def postprocess_model_results(results, model_data, timings):
     """
@@ -44,17 +57,33 @@ def postprocess_model_results(results, model_data, timings):
     log_time(logger, timings, "post_process_start", comment="Postprocessing: started")
 
     run_config = AttrDict.from_yaml_string(model_data.attrs["run_config"])
-    results["capacity_factor"] = capacity_factor(results, model_data)
-    results["systemwide_capacity_factor"] = capacity_factor(
-        results, model_data, systemwide=True
-    )
-    results["systemwide_levelised_cost"] = systemwide_levelised_cost(
-        results, model_data
-    )
-    results["total_levelised_cost"] = systemwide_levelised_cost(
-        results, model_data, total=True
-    )
+    results_config = get_results_config(run_config)
+
+    def _postprocess(name):
+        # Only compute results that are kept and whose inputs are available.
+        # In operate mode, energy_cap is an input parameter
+        return (results_config is None or name in results_config) and all(
+            i in results.data_vars or (i == "energy_cap" and i in model_data.data_vars)
+            for i in POSTPROCESSED_RESULTS[name]
+        )
+
+    if _postprocess("capacity_factor"):
+        results["capacity_factor"] = capacity_factor(results, model_data)
+    if _postprocess("systemwide_capacity_factor"):
+        results["systemwide_capacity_factor"] = capacity_factor(
+            results, model_data, systemwide=True
+        )
+    if _postprocess("systemwide_levelised_cost"):
+        results["systemwide_levelised_cost"] = systemwide_levelised_cost(
+            results, model_data
+        )
+    if _postprocess("total_levelised_cost"):
+        results["total_levelised_cost"] = systemwide_levelised_cost(
+            results, model_data, total=True
+        )
     results = clean_results(results, run_config.get("zero_threshold", 0), timings)
+    if results_config is not None:
+        results = select_results(results, results_config)
 
     for var_data in results.data_vars.values():
         if "is_result" not in var_data.attrs.keys():
@@ -79,6 +108,103 @@ def postprocess_model_results(results, model_data, timings):
     return results
 
 
+def get_results_config(run_config):
+    """
+    Parse the `run.results` option, which defines the results to keep after
+    a model run.
+
+    Returns
+    -------
+    results_config : dict or None
+        Keys are the names of results to keep, values are dictionaries of
+        {dimension: aggregation method}, which are empty if the result is kept
+        in full. None if all results are to be kept.
+
+    """
+    results_config = run_config.get("results", None)
+    if results_config is None:
+        return None
+    elif isinstance(results_config, str):
+        results_config = [results_config]
+    if not isinstance(results_config, dict):
+        results_config = {name: None for name in results_config}
+
+    parsed_config = {}
+    for name, aggregation in results_config.items():
+        if aggregation is None:
+            aggregation = {}
+        elif not isinstance(aggregation, dict) or any(
+            how not in AGGREGATION_METHODS for how in aggregation.values()
+        ):
+            raise exceptions.ModelError(
+                "Invalid aggregation `{}` for result `{}` in `run.results`. Expected "
+                "a dictionary of dimensions and aggregation methods, with methods "
+                "from {}.".format(aggregation, name, list(AGGREGATION_METHODS))
+            )
+        parsed_config[name] = dict(aggregation)
+
+    return parsed_config
+
+
+def get_backend_result_names(run_config, required=()):
+    """
+    Get the names of the variables and expressions to extract from the backend
+    model after a model run, given the `run.results` option.
+
+    Parameters
+    ----------
+    run_config : AttrDict
+    required : iterable, optional
+        Results that are needed regardless of `run.results`, e.g. to pass
+        storage levels between operate mode windows.
+
+    Returns
+    -------
+    names : set or None
+        None if all results are to be extracted.
+
+    """
+    results_config = get_results_config(run_config)
+    if results_config is None:
+        return None
+
+    names = set(required)
+    for name in results_config:
+        names.update(POSTPROCESSED_RESULTS.get(name, (name,)))
+    return names
+
+
+def select_results(results, results_config):
+    """
+    Drop all results not defined in `results_config` and aggregate those that
+    are kept over the dimensions given in `results_config`.
+    Dimensions over which a result is not indexed are ignored.
+    Input data in the results Dataset (those with the attribute `is_result=0`)
+    are left untouched.
+    """
+    missing = set(results_config).difference(results.data_vars)
+    if missing:
+        exceptions.warn(
+            "Results defined in `run.results` that are not in the model results "
+            "and will be ignored: {}".format(sorted(missing))
+        )
+    to_drop = [
+        k
+        for k, v in results.data_vars.items()
+        if k not in results_config and v.attrs.get("is_result", 1) == 1
+    ]
+    results = results.drop_vars(to_drop)
+
+    for name, aggregation in results_config.items():
+        if name not in results.data_vars:
+            continue
+        for dim, how in aggregation.items():
+            if dim in results[name].dims:
+                results[name] = getattr(results[name], how)(dim)
+
+    return results
+
+
 def capacity_factor(results, model_data, systemwide=False):
     """
     # In operate mode, energy_cap is an input parameter
@@ -173,15 +299,7 @@ def clean_results(results, zero_threshold, timings):
     zero_threshold is a value set in model configuration. If not set, defaults
     to zero (i.e. doesn't do anything). Reasonable value = 1e-12
     """
-    threshold_applied = []
-    for k, v in results.data_vars.items():
-        # If there are any values in the data variable which fall below the
-        # threshold, note the data variable name and set those values to zero
-        if v.where(abs(v) < zero_threshold, drop=True).sum():
-            threshold_applied.append(k)
-            with np.errstate(invalid="ignore"):
-                v.values[abs(v.values) < zero_threshold] = 0
-            v.loc[{}] = v.values
+    threshold_applied = apply_zero_threshold(results, zero_threshold)
 
     if threshold_applied:
         comment = "All values < {} set to 0 in {}".format(
@@ -204,3 +322,25 @@ def clean_results(results, zero_threshold, timings):
         results = results.drop_vars("unused_supply")
 
     return results
+
+
+def apply_zero_threshold(results, zero_threshold):
+    """
+    Set all values in `results` with a magnitude below `zero_threshold` to zero,
+    in place. Returns the names of the data variables in which values were set
+    to zero.
+    """
+    threshold_applied = []
+    for k, v in results.data_vars.items():
+        # If there are any values in the data variable which fall below the
+        # threshold, note the data variable name and set those values to zero
+        if v.where(abs(v) < zero_threshold, drop=True).sum():
+            threshold_applied.append(k)
+            # Results read lazily from file would otherwise only be updated
+            # in a temporary copy
+            v.load()
+            with np.errstate(invalid="ignore"):
+                v.values[abs(v.values) < zero_threshold] = 0
+            v.loc[{}] = v.values
+
+    return threshold_applied
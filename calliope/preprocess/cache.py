@@ -0,0 +1,183 @@
+"""
+Copyright (C) since 2013 Calliope contributors listed in AUTHORS.
+Licensed under the Apache 2.0 License (see LICENSE file).
+
+cache.py
+~~~~~~~~
+
+On-disk cache of preprocessed models, so that a model whose configuration,
+overrides and timeseries data have not changed can be created again without
+preprocessing it.
+
+"""
+
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+import calliope
+from calliope.core.attrdict import AttrDict
+from calliope.core.util.cache import PickleCache
+from calliope.core.util.tools import relative_path
+
+logger = logging.getLogger(__name__)
+
+
+def get_preprocessing_cache(
+    config, timeseries_dataframes=None, scenario=None, override_dict=None
+):
+    """
+    Get the preprocessing cache given in `model.preprocessing_cache` of a
+    model configuration and the key under which to cache the model in it.
+    Arguments as for :func:`calliope.preprocess.model_run_from_yaml` and
+    :func:`calliope.preprocess.model_run_from_dict`.
+
+    Returns
+    -------
+    cache : PreprocessingCache or None
+        None if no cache directory is given, or if the model cannot be cached.
+    key : str or None
+
+    """
+    if isinstance(config, str):
+        config_path = config
+        config = AttrDict.from_yaml(config)
+    else:
+        config_path = None
+        config = AttrDict(config)
+    if isinstance(override_dict, str):
+        override_dict = AttrDict.from_yaml_string(override_dict)
+    override_dict = AttrDict(override_dict or {})
+
+    # Settings in `override_dict` take precedence, but those in scenarios are
+    # not considered, as scenarios are only applied during preprocessing
+    cache_config = dict(config.get_key("model.preprocessing_cache", None) or {})
+    cache_config.update(override_dict.get_key("model.preprocessing_cache", None) or {})
+    if cache_config.get("path", None) is None:
+        return None, None
+
+    key = get_fingerprint(
+        config, config_path, scenario, override_dict, timeseries_dataframes
+    )
+    if key is None:
+        return None, None
+    cache = PreprocessingCache(
+        cache_config["path"], cache_config.get("max_size", None) or np.inf
+    )
+    return cache, key
+
+
+def get_fingerprint(
+    config,
+    config_path=None,
+    scenario=None,
+    override_dict=None,
+    timeseries_dataframes=None,
+):
+    """
+    Content hash of everything used to preprocess a model: its configuration
+    with all imports resolved, the scenario and override dictionary applied to
+    it, the size and modification time of all timeseries files it refers to,
+    the contents of `timeseries_dataframes`, and the Calliope version.
+
+    Parameters
+    ----------
+    config : AttrDict
+        Model configuration, with imports resolved.
+    config_path : str, optional
+        Path to the model configuration file, relative to which
+        `model.timeseries_data_path` is interpreted.
+    scenario : str, optional
+    override_dict : str or dict or AttrDict, optional
+    timeseries_dataframes : dict, optional
+
+    Returns
+    -------
+    fingerprint : str or None
+        None if a timeseries file the model refers to does not exist, in which
+        case the model cannot be cached.
+
+    """
+    if isinstance(override_dict, str):
+        override_dict = AttrDict.from_yaml_string(override_dict)
+    override_dict = AttrDict(override_dict or {})
+
+    hasher = hashlib.sha256()
+    description = {
+        "config": _without_cache_config(config),
+        "scenario": scenario,
+        "override_dict": _without_cache_config(override_dict),
+        "calliope_version": calliope.__version__,
+    }
+    hasher.update(json.dumps(description, sort_keys=True, default=str).encode())
+
+    timeseries_data_path = override_dict.get_key(
+        "model.timeseries_data_path",
+        config.get("model", {}).get("timeseries_data_path", None),
+    )
+    timeseries_data_path = relative_path(config_path, timeseries_data_path or "")
+    for filename in sorted(_get_timeseries_files(config, override_dict)):
+        try:
+            stat = os.stat(os.path.join(timeseries_data_path, filename))
+        except OSError:
+            return None
+        hasher.update(
+            "{}:{}:{}".format(filename, stat.st_size, stat.st_mtime_ns).encode()
+        )
+
+    for source in [
+        config.get("model", {}).get("timeseries_data", None),
+        timeseries_dataframes,
+    ]:
+        for name, df in sorted((source or {}).items()):
+            hasher.update("{}:{}".format(name, list(df.columns)).encode())
+            hasher.update(pd.util.hash_pandas_object(df).values.tobytes())
+
+    return hasher.hexdigest()
+
+
+def _without_cache_config(config):
+    # The cache configuration has no effect on the preprocessed model, and
+    # dataframes in `model.timeseries_data` are hashed by their contents
+    config = AttrDict(config).copy()
+    for key in ["preprocessing_cache", "timeseries_data"]:
+        if key in config.get("model", {}):
+            del config["model"][key]
+    if config.get("model", None) == {}:
+        del config["model"]
+    return config.as_dict()
+
+
+def _get_timeseries_files(*configs):
+    # All `file=` references, including those in overrides which may not be
+    # applied, as parsed in `calliope.preprocess.model_run._get_names`
+    filenames = set()
+    for config in configs:
+        for v in AttrDict(config).as_dict_flat().values():
+            if isinstance(v, str) and v.startswith("file="):
+                filenames.add(v.split("=")[1].rsplit(":", 1)[0])
+    return filenames
+
+
+class PreprocessingCache(PickleCache):
+    """
+    Least recently used cache of pickled preprocessed models in a directory.
+
+    Parameters
+    ----------
+    path : str
+        Directory in which to store preprocessed models. Created if it does not
+        exist.
+    max_size : float, optional
+        Maximum total size of the cached preprocessed models, in bytes.
+        The least recently used preprocessed models are removed to keep
+        within it.
+
+    """
+
+    suffix = ".model.pickle"
+    description = "preprocessed model"
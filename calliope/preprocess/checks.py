@@ -150,12 +150,14 @@ def check_initial(config_model):
 
     # Check run configuration
     # Exclude solver_options and objective_options.cost_class from checks,
-    # as we don't know all possible options for all solvers
+    # as we don't know all possible options for all solvers.
+    # Exclude results, as its keys are the names of model results.
     for k in config_model["run"].keys_nested():
         if (
             k not in DEFAULTS["run"].keys_nested()
             and "solver_options" not in k
             and "objective_options.cost_class" not in k
+            and not k.startswith("results.")
         ):
             model_warnings.append(
                 "Unrecognised setting in run configuration: {}".format(k)
@@ -20,6 +20,7 @@ import pandas as pd
 import calliope
 from calliope import exceptions
 from calliope.core.attrdict import AttrDict
+from calliope.backend.checkpoint import CARRIED_OVER
 from calliope._version import __version__
 from calliope.preprocess import checks
 from calliope.preprocess import time
@@ -446,3 +447,230 @@ class ModelDataFactory:
             self.model_data
         )
         exceptions.print_warnings_and_raise_errors(warnings=warns, errors=errors)
+
+
+class ModelDataUpdater(ModelDataFactory):
+
+    # Technology settings which change the sets of the model, e.g. its carriers
+    STRUCTURAL_TECH_KEYS = (
+        "\\.(inheritance|allowed_\\w+|required_constraints|"
+        "essentials\\.(parent|carrier\\w*|primary_carrier\\w*))$"
+    )
+
+    # Attributes of the model data as built by `ModelDataFactory`, rather than
+    # added when the model is initialised or run
+    MODEL_DATA_ATTRS = [
+        "calliope_version",
+        "applied_overrides",
+        "scenario",
+        "defaults",
+        "allow_operate_mode",
+    ]
+
+    def __init__(self, model_run_dict, base_model_run_dict):
+        """
+        Take a Calliope model_run and the model_run of a base model built from
+        the same model configuration, e.g. without an override, and find the
+        data variables of the base model data which differ between the two.
+        Calling the updater with the model data of the base model then returns
+        it updated to match `model_run_dict`, rather than building the model
+        data again from scratch.
+
+        Only changes to parameter values can be applied to the base model
+        data. If the two differ in any other way, e.g. in their nodes,
+        technologies, carriers, model configuration or timeseries data, the
+        model data must be built from scratch and the updater returns None.
+
+        Parameters
+        ----------
+        model_run_dict : AttrDict
+            preprocessed model_run dictionary, as produced by
+            Calliope.preprocess.preprocess_model
+        base_model_run_dict : AttrDict
+            preprocessed model_run dictionary of the base model
+
+        """
+        self.model_run = model_run_dict
+        self.template_config = AttrDict.from_yaml(
+            os.path.join(
+                os.path.dirname(calliope.__file__), "config", "model_data_lookup.yaml"
+            )
+        )
+        self.model_data = xr.Dataset()
+        self.updated_vars = []
+
+        self.node_dict = self._get_changed_items(
+            model_run_dict.nodes, base_model_run_dict.nodes
+        )
+        self.tech_dict = self._get_changed_items(
+            model_run_dict.techs, base_model_run_dict.techs
+        )
+        if (
+            model_run_dict.timeseries_data is not base_model_run_dict.timeseries_data
+            or model_run_dict.model.as_dict() != base_model_run_dict.model.as_dict()
+            or self.node_dict is None
+            or self.tech_dict is None
+            or any(re.search(self.STRUCTURAL_TECH_KEYS, k) for k in self.tech_dict)
+        ):
+            self.structural_change = True
+            return
+
+        self.link_techs = self._get_link_techs(model_run_dict.nodes.as_dict_flat())
+        self.structural_change = self._has_values_as_dimension()
+        if not self.structural_change:
+            self._add_param_from_template()
+            # Changed items which are not parameters, e.g. `exists`
+            self.structural_change = bool(self.node_dict or self.tech_dict)
+
+    def __call__(self, model_data, check=True):
+        """
+        Return a copy of `model_data` of the base model, updated to match
+        this model, or None if it cannot be updated. If `check` is True, run
+        the final checks of the model data on the updated model data.
+        """
+        if self.structural_change:
+            return None
+
+        # Drop any results of the base model. Variables which are not updated
+        # share their data with the base model, except those which operate
+        # mode updates in place between windows
+        model_data = model_data.drop_vars(
+            [k for k, v in model_data.data_vars.items() if v.attrs.get("is_result", 0)]
+        ).copy(deep=False)
+        for var_name in CARRIED_OVER:
+            if var_name in model_data.data_vars:
+                model_data[var_name] = model_data[var_name].copy(deep=True)
+        model_data.attrs = {
+            k: v for k, v in model_data.attrs.items() if k in self.MODEL_DATA_ATTRS
+        }
+        model_data.attrs["applied_overrides"] = self.model_run["applied_overrides"]
+        model_data.attrs["scenario"] = self.model_run["scenario"]
+        # Items of new nodes, technologies or carriers cannot be added
+        for dim, coord in self.model_data.coords.items():
+            if dim not in model_data.dims or not coord.isin(model_data[dim]).all():
+                return None
+
+        self.updated_vars = list(self.model_data.data_vars.keys())
+        for var_name, var in self.model_data.data_vars.items():
+            if var_name in model_data.data_vars:
+                updated_var = self._update_var(var, model_data[var_name])
+                if updated_var is None:
+                    return None
+                model_data[var_name] = updated_var
+            else:
+                model_data[var_name] = self._new_var(var, model_data)
+
+        if check:
+            model_data, _, warns, errors = checks.check_model_data(model_data)
+            exceptions.print_warnings_and_raise_errors(warnings=warns, errors=errors)
+        return model_data
+
+    @classmethod
+    def _get_changed_items(cls, subdict, base_subdict):
+        """
+        Items of the flattened `subdict` whose values differ from those in
+        `base_subdict`, or None if any changed value refers to timeseries data
+        or is empty, or if items are added to anything but existing nodes,
+        technologies at nodes and links, or technologies.
+        """
+        items = subdict.as_dict_flat()
+        base_items = base_subdict.as_dict_flat()
+        base_owners = set(cls._get_owner(k) for k in base_items)
+        if any(
+            k not in items and not cls._empty_or_invalid(v)
+            for k, v in base_items.items()
+        ):
+            return None
+
+        changed = {}
+        for k, v in items.items():
+            if k in base_items and cls._equals(v, base_items[k]):
+                continue
+            if (
+                cls._empty_or_invalid(v)
+                or cls._is_timeseries(v)
+                or (k in base_items and cls._is_timeseries(base_items[k]))
+                or (k not in base_items and cls._get_owner(k) not in base_owners)
+            ):
+                return None
+            changed[k] = v
+        return changed
+
+    @staticmethod
+    def _get_owner(key):
+        # The node, technology at a node, technology at a node of a link, or
+        # technology that an item of `nodes` or `techs` belongs to
+        parts = key.split(".")
+        if len(parts) > 4 and parts[1] == "links":
+            return tuple(parts[:5])
+        elif len(parts) > 2 and parts[1] == "techs":
+            return tuple(parts[:3])
+        else:
+            return parts[0]
+
+    @staticmethod
+    def _is_timeseries(value):
+        return isinstance(value, str) and re.match("(file|df)=", value) is not None
+
+    @staticmethod
+    def _equals(value, base_value):
+        if isinstance(value, float) and isinstance(base_value, float):
+            return value == base_value or (np.isnan(value) and np.isnan(base_value))
+        return type(value) == type(base_value) and value == base_value
+
+    def _get_link_techs(self, node_dict):
+        link_data_dict = self._reformat_model_run_dict(
+            node_dict, ["links", "techs"], get_method="get", end="\\.({0}).*"
+        )
+        if not link_data_dict:
+            return pd.Series([None])
+        return pd.Series(
+            {
+                f"{tech}:{node_to}": tech
+                for (node, node_to, tech) in link_data_dict.keys()
+            },
+            dtype=object,
+        ).rename_axis("techs")
+
+    def _has_values_as_dimension(self):
+        # Changing these values changes the items of a data variable which are
+        # set, so the previously set items would need to be removed
+        for group_config in self.template_config.values():
+            if group_config.get("values_as_dimension", False):
+                kwargs = {
+                    k: v
+                    for k, v in group_config.items()
+                    if k in ["start", "end", "values_as_dimension"]
+                }
+                changed = self._reformat_model_run_dict(
+                    getattr(self, f"{group_config.model_run_subdict_name}_dict"),
+                    group_config.expected_nesting,
+                    get_method="get",
+                    **kwargs,
+                )
+                if changed:
+                    return True
+        return False
+
+    @staticmethod
+    def _update_var(var, base_var):
+        # Timeseries may have been clustered
+        if "timesteps" in base_var.dims or not set(var.dims).issubset(base_var.dims):
+            return None
+        updated_var = (
+            var.combine_first(base_var).transpose(*base_var.dims).reindex_like(base_var)
+        )
+        try:
+            updated_var = updated_var.astype(base_var.dtype)
+        except (ValueError, TypeError):
+            return None
+        updated_var.attrs = dict(base_var.attrs)
+        return updated_var
+
+    @staticmethod
+    def _new_var(var, model_data):
+        var = var.reindex({dim: model_data[dim] for dim in var.dims})
+        var = dataset.reorganise_xarray_dimensions(var)
+        var = time.update_dtypes(xr.Dataset({var.name: var}))[var.name]
+        var.attrs = {"parameters": 1, "is_result": 0}
+        return var
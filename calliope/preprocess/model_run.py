@@ -42,7 +42,11 @@ _DEFAULT_PALETTE = [
 
 
 def model_run_from_yaml(
-    model_file, timeseries_dataframes=None, scenario=None, override_dict=None
+    model_file,
+    timeseries_dataframes=None,
+    scenario=None,
+    override_dict=None,
+    base_model_run=None,
 ):
     """
     Generate processed ModelRun configuration from a
@@ -61,6 +65,10 @@ def model_run_from_yaml(
         comma-separated list of individual overrides to be combined
         ad-hoc, e.g. 'my_scenario_name' or 'override1,override2'.
     override_dict : dict or AttrDict, optional
+    base_model_run : AttrDict, optional
+        Processed model_run of a model built from the same model
+        configuration, whose timeseries data is reused if the model refers to
+        the same timeseries.
 
     """
     config = AttrDict.from_yaml(model_file)
@@ -80,11 +88,16 @@ def model_run_from_yaml(
         overrides,
         scenario,
         subsets,
+        base_model_run=base_model_run,
     )
 
 
 def model_run_from_dict(
-    config_dict, timeseries_dataframes=None, scenario=None, override_dict=None
+    config_dict,
+    timeseries_dataframes=None,
+    scenario=None,
+    override_dict=None,
+    base_model_run=None,
 ):
     """
     Generate processed ModelRun configuration from a
@@ -102,6 +115,10 @@ def model_run_from_dict(
         comma-separated list of individual overrides to be combined
         ad-hoc, e.g. 'my_scenario_name' or 'override1,override2'.
     override_dict : dict or AttrDict, optional
+    base_model_run : AttrDict, optional
+        Processed model_run of a model built from the same model
+        configuration, whose timeseries data is reused if the model refers to
+        the same timeseries.
 
     """
     if not isinstance(config_dict, AttrDict):
@@ -124,6 +141,7 @@ def model_run_from_dict(
         overrides,
         scenario,
         subsets,
+        base_model_run=base_model_run,
     )
 
 
@@ -677,6 +695,21 @@ def process_timeseries_data(config_model, model_run, timeseries_dataframes):
     return timeseries_data.rename_axis(index="timesteps"), constraint_tsvars
 
 
+def _has_same_timeseries(config, model_run, timeseries_dataframes, base_model_run):
+    """
+    Whether the timeseries data of `base_model_run` is that of a model with
+    the given configuration. Dataframes are not compared, so a model with
+    timeseries dataframes never has the same timeseries data.
+    """
+    if timeseries_dataframes is not None or config.model.get("timeseries_data"):
+        return False
+    if config.model.as_dict() != base_model_run.model.as_dict():
+        return False
+    return _get_names(model_run.nodes.as_dict_flat()) == _get_names(
+        base_model_run.nodes.as_dict_flat()
+    )
+
+
 def generate_model_run(
     config,
     timeseries_dataframes,
@@ -684,6 +717,7 @@ def generate_model_run(
     applied_overrides,
     scenario,
     subsets,
+    base_model_run=None,
 ):
     """
     Returns a processed model_run configuration AttrDict and a debug
@@ -695,6 +729,10 @@ def generate_model_run(
     timeseries_dataframes : dict
     debug_comments : AttrDict
     scenario : str
+    base_model_run : AttrDict, optional
+        If given and the model refers to the same timeseries files, with the
+        same model configuration, its timeseries data is reused rather than
+        loaded again.
     """
     model_run = AttrDict()
     model_run["scenario"] = scenario
@@ -725,10 +763,16 @@ def generate_model_run(
 
     # 5) Fully populate timeseries data
     # Raises ModelErrors if there are problems with timeseries data at this stage
-    (
-        model_run["timeseries_data"],
-        model_run["timeseries_vars"],
-    ) = process_timeseries_data(config, model_run, timeseries_dataframes)
+    if base_model_run is not None and _has_same_timeseries(
+        config, model_run, timeseries_dataframes, base_model_run
+    ):
+        model_run["timeseries_data"] = base_model_run["timeseries_data"]
+        model_run["timeseries_vars"] = base_model_run["timeseries_vars"]
+    else:
+        (
+            model_run["timeseries_data"],
+            model_run["timeseries_vars"],
+        ) = process_timeseries_data(config, model_run, timeseries_dataframes)
 
     # 6) Grab additional relevant bits from run and model config
     model_run["run"] = config["run"]
@@ -0,0 +1,145 @@
+import os
+import pickle
+import tempfile
+
+import pytest  # noqa: F401
+from pytest import approx
+
+from calliope.backend.cache import BackendModelCache, get_fingerprint
+from calliope.core.attrdict import AttrDict
+from calliope.test.common.util import build_test_model as build_model
+
+
+@pytest.fixture(scope="module")
+def model_data():
+    model = build_model({}, "simple_supply,two_hours,investment_costs")
+    return model._model_data
+
+
+def _run_config(model_data, **updates):
+    run_config = AttrDict.from_yaml_string(model_data.attrs["run_config"])
+    run_config.union(AttrDict(updates), allow_override=True)
+    return run_config
+
+
+class TestFingerprint:
+    def test_same_inputs(self, model_data):
+        assert get_fingerprint(model_data, _run_config(model_data)) == get_fingerprint(
+            model_data.copy(deep=True), _run_config(model_data)
+        )
+
+    @pytest.mark.parametrize(
+        "updates",
+        (
+            {"solver": "glpk"},
+            {"solver_options": {"mipgap": 0.01}},
+            {"results": ["energy_cap"]},
+            {"zero_threshold": 0},
+        ),
+    )
+    def test_ignored_run_config(self, model_data, updates):
+        assert get_fingerprint(model_data, _run_config(model_data)) == get_fingerprint(
+            model_data, _run_config(model_data, **updates)
+        )
+
+    @pytest.mark.parametrize(
+        "updates", ({"ensure_feasibility": True}, {"bigM": 1e6}, {"backend": "sparse"})
+    )
+    def test_run_config(self, model_data, updates):
+        assert get_fingerprint(model_data, _run_config(model_data)) != get_fingerprint(
+            model_data, _run_config(model_data, **updates)
+        )
+
+    def test_input_data(self, model_data):
+        updated_model_data = model_data.copy(deep=True)
+        updated_model_data.energy_cap_max.loc[{"nodes": "a"}] += 1
+        assert get_fingerprint(model_data, _run_config(model_data)) != get_fingerprint(
+            updated_model_data, _run_config(model_data)
+        )
+
+    def test_results_ignored(self, model_data):
+        updated_model_data = model_data.copy()
+        updated_model_data["energy_cap"] = model_data.energy_cap_max.copy()
+        updated_model_data["energy_cap"].attrs["is_result"] = 1
+        assert get_fingerprint(model_data, _run_config(model_data)) == get_fingerprint(
+            updated_model_data, _run_config(model_data)
+        )
+
+
+class TestBackendModelCache:
+    def test_load_missing(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            cache = BackendModelCache(os.path.join(tempdir, "cache"))
+            assert cache.load("foo") is None
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            cache = BackendModelCache(tempdir)
+            cache.save("foo", {"a": [1, 2, 3]})
+            assert cache.load("foo") == {"a": [1, 2, 3]}
+
+    def test_unreadable_removed(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            cache = BackendModelCache(tempdir)
+            with open(os.path.join(tempdir, "foo" + cache.suffix), "w") as f:
+                f.write("not a pickle")
+            assert cache.load("foo") is None
+            assert not os.listdir(tempdir)
+
+    def test_evict_least_recently_used(self):
+        size = len(pickle.dumps(list(range(100)), protocol=pickle.HIGHEST_PROTOCOL))
+        with tempfile.TemporaryDirectory() as tempdir:
+            cache = BackendModelCache(tempdir, max_size=2 * size)
+            for i, key in enumerate(["foo", "bar"]):
+                cache.save(key, list(range(100)))
+                os.utime(os.path.join(tempdir, key + cache.suffix), (i, i))
+            # Loading makes `foo` the most recently used
+            cache.load("foo")
+            cache.save("baz", list(range(100)))
+
+            assert sorted(os.listdir(tempdir)) == [
+                "baz" + cache.suffix,
+                "foo" + cache.suffix,
+            ]
+
+
+class TestRun:
+    @pytest.mark.parametrize(
+        "override",
+        ({}, {"run.backend": "sparse", "run.solver": "highs"}),
+    )
+    def test_cache_hit(self, override):
+        scenario = "simple_supply,two_hours,investment_costs"
+        with tempfile.TemporaryDirectory() as tempdir:
+            override = {**override, "run.backend_cache.path": tempdir}
+            m1 = build_model(override, scenario)
+            m1.run()
+            m2 = build_model(override, scenario)
+            m2.run()
+
+        assert m1.results.attrs["backend_cache"] == "miss"
+        assert m2.results.attrs["backend_cache"] == "hit"
+        assert m2.results.objective_function_value == approx(
+            m1.results.objective_function_value
+        )
+        assert m2.results.energy_cap.equals(m1.results.energy_cap)
+
+    def test_cache_miss_on_changed_inputs(self):
+        scenario = "simple_supply,two_hours,investment_costs"
+        with tempfile.TemporaryDirectory() as tempdir:
+            override = {"run.backend_cache.path": tempdir}
+            m1 = build_model(override, scenario)
+            m1.run()
+            m2 = build_model(
+                {**override, "techs.test_supply_elec.constraints.energy_cap_max": 8},
+                scenario,
+            )
+            m2.run()
+
+            assert m2.results.attrs["backend_cache"] == "miss"
+            assert len(os.listdir(tempdir)) == 2
+
+    def test_no_cache(self):
+        m = build_model({}, "simple_supply,two_hours,investment_costs")
+        m.run()
+        assert "backend_cache" not in m.results.attrs
@@ -0,0 +1,129 @@
+import os
+import tempfile
+
+import pytest  # noqa: F401
+import xarray as xr
+
+from calliope import exceptions
+from calliope.backend.checkpoint import OperateCheckpoint
+from calliope.core.attrdict import AttrDict
+from calliope.test.common.util import build_test_model as build_model
+from calliope.test.common.util import check_error_or_warning
+
+
+@pytest.fixture(scope="module")
+def model_data():
+    model = build_model({}, "simple_storage,two_hours,investment_costs")
+    return model._model_data
+
+
+@pytest.fixture
+def run_config(model_data):
+    run_config = AttrDict.from_yaml_string(model_data.attrs["run_config"])
+    run_config.set_key("operation.window", 1)
+    return run_config
+
+
+def _results(model_data, value):
+    storage = model_data.storage_cap_max.fillna(0) * 0 + value
+    return xr.Dataset(
+        {"storage": storage.expand_dims(timesteps=model_data.timesteps[:1].values)}
+    )
+
+
+class TestOperateCheckpoint:
+    def test_no_checkpoint(self, model_data, run_config):
+        with tempfile.TemporaryDirectory() as tempdir:
+            checkpoint = OperateCheckpoint(tempdir, model_data, run_config)
+            assert checkpoint.load() is None
+
+    def test_save_and_load(self, model_data, run_config):
+        updated_model_data = model_data.copy(deep=True)
+        updated_model_data["storage_initial"] = model_data.storage_cap_max * 0 + 0.5
+        with tempfile.TemporaryDirectory() as tempdir:
+            checkpoint = OperateCheckpoint(tempdir, model_data, run_config)
+            checkpoint.save(
+                1, updated_model_data, ["optimal"], results=[_results(model_data, 1)]
+            )
+            checkpoint.save(
+                2,
+                updated_model_data,
+                ["optimal", "feasible"],
+                results=[_results(model_data, 2)],
+            )
+
+            saved = OperateCheckpoint(tempdir, model_data, run_config).load()
+
+        assert saved["window"] == 2
+        assert saved["terminations"] == ["optimal", "feasible"]
+        assert saved["num_timesteps"] == 0
+        assert saved["carried_over"].storage_initial.equals(
+            updated_model_data.storage_initial
+        )
+        assert [i.storage.max().item() for i in saved["results"]] == [1, 2]
+
+    def test_results_after_last_state_ignored(self, model_data, run_config):
+        with tempfile.TemporaryDirectory() as tempdir:
+            checkpoint = OperateCheckpoint(tempdir, model_data, run_config)
+            checkpoint.save(
+                1, model_data, ["optimal"], results=[_results(model_data, 1)]
+            )
+            # As if the run were stopped between saving results and state
+            _results(model_data, 2).to_netcdf(
+                os.path.join(tempdir, "results_000002.nc")
+            )
+
+            saved = checkpoint.load()
+
+        assert saved["window"] == 1
+        assert len(saved["results"]) == 1
+
+    @pytest.mark.parametrize(
+        "updates", ({"operation.results_path": "foo.nc"}, {"solver": "cbc"})
+    )
+    def test_unrelated_run_config(self, model_data, run_config, updates):
+        with tempfile.TemporaryDirectory() as tempdir:
+            OperateCheckpoint(tempdir, model_data, run_config).save(
+                1, model_data, ["optimal"]
+            )
+            for k, v in updates.items():
+                run_config.set_key(k, v)
+            run_config.set_key("operation.checkpoint.frequency", 10)
+
+            assert OperateCheckpoint(tempdir, model_data, run_config).load()
+
+    def test_different_run(self, model_data, run_config):
+        with tempfile.TemporaryDirectory() as tempdir:
+            OperateCheckpoint(tempdir, model_data, run_config).save(
+                1, model_data, ["optimal"]
+            )
+            run_config.set_key("operation.window", 2)
+
+            with pytest.raises(exceptions.ModelError) as excinfo:
+                OperateCheckpoint(tempdir, model_data, run_config).load()
+
+        assert check_error_or_warning(
+            excinfo, "it was saved by a run with different model data"
+        )
+
+    def test_clear(self, model_data, run_config):
+        with tempfile.TemporaryDirectory() as tempdir:
+            checkpoint = OperateCheckpoint(tempdir, model_data, run_config)
+            checkpoint.save(
+                1, model_data, ["optimal"], results=[_results(model_data, 1)]
+            )
+            checkpoint.clear()
+
+            assert checkpoint.load() is None
+            assert not os.listdir(tempdir)
+
+
+def test_resume_plan_mode():
+    model = build_model({}, "simple_supply,two_hours,investment_costs")
+    with pytest.warns(exceptions.ModelWarning) as warning:
+        model.run(resume=True)
+
+    assert check_error_or_warning(
+        warning, "Only operate mode runs can be resumed from a checkpoint"
+    )
+    assert model.results.termination_condition == "optimal"
@@ -0,0 +1,152 @@
+import os
+import tempfile
+
+import numpy as np
+import pytest  # noqa: F401
+
+from calliope import exceptions
+from calliope.backend.pyomo import model as run_pyomo
+from calliope.test.common.util import build_test_model as build_model
+from calliope.test.common.util import check_error_or_warning
+
+SCENARIO = "simple_storage,operate,investment_costs"
+OVERRIDE = {"techs.test_storage.constraints.energy_cap_per_storage_cap_max": 1}
+
+
+def _run(override={}, **kwargs):
+    model = build_model({**OVERRIDE, **override}, SCENARIO)
+    model.run(**kwargs)
+    return model
+
+
+def _assert_same_results(model1, model2):
+    assert set(model1.results.data_vars) == set(model2.results.data_vars)
+    for name, var in model1.results.data_vars.items():
+        assert np.allclose(
+            var.values,
+            model2.results[name].transpose(*var.dims).values,
+            equal_nan=True,
+        )
+
+
+@pytest.fixture(scope="module")
+def serial_model():
+    return _run({"run.operation.pipeline": False})
+
+
+class TestOperate:
+    def test_warmstart(self, serial_model):
+        profile = serial_model._timings["operate_window_profile"]
+
+        # Windows in which the backend model is updated, rather than generated,
+        # are warm started from the solution of the previous window
+        assert profile.warmstart.tolist() == [False] + [True] * 6 + [False]
+        assert (profile.iterations >= 0).all()
+
+    def test_pipeline(self, serial_model):
+        model = _run({"run.operation.pipeline": True})
+        assert model.results.termination_condition == "optimal"
+        _assert_same_results(serial_model, model)
+
+    def test_results_path(self, serial_model):
+        with tempfile.TemporaryDirectory() as tempdir:
+            path = os.path.join(tempdir, "results.nc")
+            model = _run({"run.operation.results_path": path})
+
+            assert not model._model_data.storage.variable._in_memory
+            _assert_same_results(serial_model, model)
+            model._model_data.close()
+
+    def test_resume(self, serial_model, monkeypatch):
+        solve_model = run_pyomo.solve_model
+        num_solves = []
+
+        def _stop_at_fourth_window(*args, **kwargs):
+            num_solves.append(1)
+            if len(num_solves) == 4:
+                raise KeyboardInterrupt
+            return solve_model(*args, **kwargs)
+
+        with tempfile.TemporaryDirectory() as tempdir:
+            override = {
+                "run.operation.checkpoint.path": tempdir,
+                "run.operation.checkpoint.frequency": 2,
+            }
+            monkeypatch.setattr(run_pyomo, "solve_model", _stop_at_fourth_window)
+            with pytest.raises(KeyboardInterrupt):
+                _run(override)
+            monkeypatch.undo()
+            model = _run(override, resume=True)
+
+        assert "run_resumed" in model._timings
+        _assert_same_results(serial_model, model)
+
+    def test_parallel_blocks(self, serial_model):
+        model = _run(
+            {
+                "run.operation.parallel.blocks": 3,
+                "run.operation.parallel.processes": 2,
+                "run.operation.parallel.tolerance": 0,
+            }
+        )
+        profile = model._timings["operate_block_profile"]
+        blocks = profile[~profile.warmup]
+
+        assert model.results.operate_boundary_mismatch == 0
+        assert model.results.termination_condition == "optimal"
+        # The window before each block after the first is run to estimate the
+        # values carried over to it
+        assert profile.block[profile.warmup].tolist() == [1, 2]
+        assert (profile.first_window == profile.last_window)[profile.warmup].all()
+        # All blocks are run once, then only those after the first are rerun
+        assert (blocks.block[blocks.reconciliation == 0] == [0, 1, 2]).all()
+        assert 0 not in blocks.block[blocks.reconciliation > 0].values
+        _assert_same_results(serial_model, model)
+
+    def test_parallel_blocks_warmup(self, serial_model):
+        # Without the windows before each block, the values carried over to
+        # blocks are estimated as those at the start of the run
+        profiles = {}
+        for warmup_windows in [0, 1]:
+            model = _run(
+                {
+                    "run.operation.parallel.blocks": 3,
+                    "run.operation.parallel.processes": 2,
+                    "run.operation.parallel.tolerance": 0,
+                    "run.operation.parallel.warmup_windows": warmup_windows,
+                }
+            )
+            profiles[warmup_windows] = model._timings["operate_block_profile"]
+            _assert_same_results(serial_model, model)
+
+        assert not profiles[0].warmup.any()
+        assert profiles[0].reconciliation.max() > 0
+        assert profiles[1].reconciliation.max() == 0
+
+    def test_parallel_blocks_no_backend(self):
+        model = _run({"run.operation.parallel.blocks": 2})
+
+        with pytest.raises(exceptions.ModelError) as excinfo:
+            model.backend.access_model_inputs()
+        assert check_error_or_warning(excinfo, "The backend model is not available")
+
+    def test_parallel_blocks_mismatch(self):
+        override = {
+            "run.operation.parallel.blocks": 3,
+            "run.operation.parallel.processes": 2,
+            "run.operation.parallel.max_reconciliations": 0,
+            "run.operation.parallel.warmup_windows": 0,
+        }
+        with pytest.warns(exceptions.ModelWarning) as warning:
+            model = _run(override)
+
+        assert model.results.operate_boundary_mismatch > 1e-3
+        assert check_error_or_warning(
+            warning, "Values carried over between blocks of operate mode windows"
+        )
+
+    def test_parallel_blocks_resume(self):
+        with pytest.raises(exceptions.ModelError) as excinfo:
+            _run({"run.operation.parallel.blocks": 3}, resume=True)
+
+        assert check_error_or_warning(excinfo, "cannot be resumed")
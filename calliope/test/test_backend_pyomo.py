@@ -10,6 +10,7 @@ import logging
 
 import calliope.exceptions as exceptions
 from calliope.core.attrdict import AttrDict
+from calliope.backend.pyomo import model as run_pyomo
 from calliope.test.common.util import build_test_model as build_model
 from calliope.test.common.util import (
     check_error_or_warning,
@@ -60,6 +61,78 @@ class TestModel:
         timestep_0 = "2005-01-01 00:00"
         assert m._backend_model.timesteps.ord(timestep_0) == 1
 
+    def test_build_profile(self):
+        m = build_model(
+            {"run.build_profile": True}, "simple_supply,two_hours,investment_costs"
+        )
+        m.run(build_only=True)
+        profile = m._timings["backend_build_profile"].set_index(
+            ["component_type", "component"]
+        )
+        backend_model = m._backend_model
+
+        assert profile.loc[("variable", "energy_cap"), "indices"] == len(
+            backend_model.energy_cap
+        )
+        assert profile.loc[("constraint", "system_balance"), "indices"] == len(
+            backend_model.system_balance_constraint
+        )
+        # carrier_prod and carrier_con at each node, carrier and timestep
+        assert profile.loc[("constraint", "system_balance"), "nonzeros"] > len(
+            backend_model.system_balance_constraint
+        )
+        assert (profile.loc[profile.indices > 0, "rule_time"] >= 0).all()
+        # Components with no valid subset are still listed, without a build time
+        assert profile.loc[profile.indices == 0, "rule_time"].isnull().all()
+
+    def test_no_build_profile(self):
+        m = build_model({}, "simple_supply,two_hours,investment_costs")
+        m.run(build_only=True)
+        assert "backend_build_profile" not in m._timings
+
+    def test_update_timeseries_params(self):
+        m = build_model({}, "simple_supply,two_hours,investment_costs")
+        m.run(build_only=True)
+        window_model_data = m._model_data.copy(deep=True)
+        window_model_data.resource.loc[
+            {"nodes": "b", "techs": "test_demand_elec", "timesteps": "2005-01-01 01:00"}
+        ] = -4
+
+        updated_params = run_pyomo.update_timeseries_params(
+            m._backend_model, window_model_data, ["resource"]
+        )
+        idx = ("b", "test_demand_elec", "2005-01-01 01:00")
+        assert updated_params == {"resource": [idx]}
+        assert po.value(m._backend_model.resource[idx]) == -4
+
+    def test_shift_solution(self):
+        m = build_model({}, "simple_supply,two_hours,investment_costs")
+        m.run()
+        backend_model = m._backend_model
+        idx = ("electricity", "b", "test_supply_elec")
+        carrier_prod = [
+            backend_model.carrier_prod[(*idx, t)].value for t in backend_model.timesteps
+        ]
+        energy_cap = backend_model.energy_cap["b", "test_supply_elec"].value
+
+        run_pyomo.shift_solution(backend_model, 1)
+
+        # The value at the last timestep is kept
+        assert [
+            backend_model.carrier_prod[(*idx, t)].value for t in backend_model.timesteps
+        ] == carrier_prod[1:] + carrier_prod[-1:]
+        assert backend_model.energy_cap["b", "test_supply_elec"].value == energy_cap
+
+    def test_solve_profile(self):
+        m = build_model({}, "simple_supply,two_hours,investment_costs")
+        m.run()
+        profile = m._timings["solve_profile"]
+
+        assert len(profile) == 1
+        assert not profile.warmstart.item()
+        assert profile.iterations.item() >= 0
+        assert profile.solve_time.item() > 0
+
 
 @pytest.mark.xfail(reason="Not expecting operate mode to work at the moment")
 class TestChecks:
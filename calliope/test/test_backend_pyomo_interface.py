@@ -4,6 +4,8 @@ import pyomo.core as po
 
 import calliope
 import calliope.exceptions as exceptions
+from calliope.backend.pyomo import model as run_pyomo
+from calliope.backend.pyomo.interface import get_updated_params
 
 from calliope.test.common.util import build_test_model as build_model
 from calliope.test.common.util import check_error_or_warning
@@ -66,6 +68,19 @@ class TestUpdateParam:
             == 30
         )
 
+    def test_updated_params_recorded(self):
+        m = build_model({}, "simple_supply,two_hours,investment_costs")
+        m.run()
+        m.backend.update_param("energy_cap_max", {("b", "test_supply_elec"): 20})
+        m.backend.update_param("energy_cap_max", {("a", "test_supply_elec"): 30})
+
+        assert get_updated_params(m._backend_model) == {
+            "energy_cap_max": {("b", "test_supply_elec"), ("a", "test_supply_elec")}
+        }
+        with pytest.warns(exceptions.ModelWarning):
+            m.backend.rerun()
+        assert get_updated_params(m._backend_model) == {}
+
     def test_update_param_multiple_dim(self, model):
         """
         test that the function update_param works with multiple dimensions
@@ -202,6 +217,13 @@ class TestBackendRerun:
             excinfo, "The results of rerunning the backend model are only available"
         )
 
+    def test_rerun_warmstart(self, model):
+        with pytest.warns(exceptions.ModelWarning):
+            new_model = model.backend.rerun()
+
+        # Warm started from the solution of the first run
+        assert new_model._timings["solve_profile"].warmstart.all()
+
     def test_update_and_rerun(self, model):
         """
         test that the function rerun works
@@ -268,6 +290,97 @@ class TestBackendRerun:
         )
 
 
+class TestSweep:
+    def test_sweep(self, model):
+        sweep = model.backend.sweep(
+            {
+                "objective_cost_class": {"monetary": [1, 2]},
+                "energy_cap_max": {("b", "test_supply_elec"): [2, 4, 20]},
+            },
+            results=["energy_cap"],
+        )
+        energy_cap = sweep.energy_cap.loc[{"nodes": "b", "techs": "test_supply_elec"}]
+
+        assert set(sweep.data_vars) == {
+            "energy_cap",
+            "termination_condition",
+            "objective_function_value",
+        }
+        assert sweep.energy_cap_max.values.tolist() == [2, 4, 20]
+        assert (sweep.termination_condition == "optimal").all()
+        assert (energy_cap.sel(energy_cap_max=[2, 4]) <= [2, 4]).all()
+        assert sweep.objective_function_value.sel(
+            objective_cost_class=2
+        ).values == approx(
+            2 * sweep.objective_function_value.sel(objective_cost_class=1).values
+        )
+        # The Params are reset after the sweep
+        energy_cap_max = model._backend_model.energy_cap_max["b", "test_supply_elec"]
+        assert (
+            po.value(energy_cap_max)
+            == model.inputs.energy_cap_max.loc[
+                {"nodes": "b", "techs": "test_supply_elec"}
+            ]
+        )
+
+    def test_sweep_items_together(self, model):
+        sweep = model.backend.sweep(
+            {
+                "energy_cap_max": {
+                    ("a", "test_supply_elec"): [1, 10],
+                    ("b", "test_supply_elec"): [1, 10],
+                }
+            },
+            results=["energy_cap"],
+        )
+
+        assert sweep.energy_cap_max.values.tolist() == [0, 1]
+        # Demand cannot be met with both capacities limited to 1
+        assert sweep.termination_condition.values.tolist() != ["optimal"] * 2
+        assert sweep.termination_condition.sel(energy_cap_max=1) == "optimal"
+        assert sweep.energy_cap.sel(energy_cap_max=0).isnull().all()
+
+    def test_sweep_duplicate_values(self, model):
+        sweep = model.backend.sweep(
+            {"energy_cap_max": {("b", "test_supply_elec"): [10, 10, 20]}},
+            results=["energy_cap"],
+        )
+
+        # All points are kept, with their positions as coordinates
+        assert sweep.energy_cap_max.values.tolist() == [0, 1, 2]
+        assert (sweep.termination_condition == "optimal").all()
+
+    def test_sweep_reset_on_error(self, model, monkeypatch):
+        def _solve_model(*args, **kwargs):
+            raise RuntimeError("foo")
+
+        monkeypatch.setattr(run_pyomo, "solve_model", _solve_model)
+        with pytest.raises(RuntimeError):
+            model.backend.sweep({"energy_cap_max": {("b", "test_supply_elec"): [2, 4]}})
+
+        energy_cap_max = model._backend_model.energy_cap_max["b", "test_supply_elec"]
+        assert (
+            po.value(energy_cap_max)
+            == model.inputs.energy_cap_max.loc[
+                {"nodes": "b", "techs": "test_supply_elec"}
+            ]
+        )
+
+    def test_sweep_different_lengths(self, model):
+        with pytest.raises(exceptions.ModelError) as excinfo:
+            model.backend.sweep(
+                {
+                    "energy_cap_max": {
+                        ("a", "test_supply_elec"): [1, 10],
+                        ("b", "test_supply_elec"): [1],
+                    }
+                }
+            )
+        assert check_error_or_warning(
+            excinfo, "must be swept over the same number of values"
+        )
+
+
 class TestGetAllModelAttrs:
     def test_get_all_attrs(self, model):
         """Model attributes consist of variables, parameters, and sets"""
@@ -405,16 +518,10 @@ class TestRegeneratePersistentConstraints:
         m.run()
         return m
 
-    @pytest.mark.filterwarnings(
-        "ignore:(?s).*Updating the Pyomo parameter:calliope.exceptions.ModelWarning"
-    )
     def test_opt_exists(self, model_persistent):
         assert hasattr(model_persistent, "_backend_model_opt")
         assert model_persistent._backend_model_opt.name == "gurobi_persistent"
 
-    @pytest.mark.filterwarnings(
-        "ignore:(?s).*Updating the Pyomo parameter:calliope.exceptions.ModelWarning"
-    )
     def test_update_param_without_regeneration(self, model_persistent):
         model_persistent.backend.update_param(
             "energy_cap_max", {("b", "test_supply_elec"): 5}
@@ -422,12 +529,9 @@ class TestRegeneratePersistentConstraints:
         model2 = model_persistent.backend.rerun()
         assert (
             model2.results.energy_cap.loc[{"nodes": "b", "techs": "test_supply_elec"}]
-            == 10
+            == 5
         )
 
-    @pytest.mark.filterwarnings(
-        "ignore:(?s).*Updating the Pyomo parameter:calliope.exceptions.ModelWarning"
-    )
     def test_update_param_with_variable_regeneration(self, model_persistent):
         model_persistent.backend.update_param(
             "energy_cap_max",
@@ -445,9 +549,6 @@ class TestRegeneratePersistentConstraints:
         for i in [("b", "test_supply_elec"), ("a", "test_supply_elec")]:
             assert model2.results.energy_cap.loc[i] == 5
 
-    @pytest.mark.filterwarnings(
-        "ignore:(?s).*Updating the Pyomo parameter:calliope.exceptions.ModelWarning"
-    )
     def test_update_param_with_constraint_regeneration(self, model_persistent):
         model_persistent.backend.update_param(
             "resource", {("b", "test_demand_elec", "2005-01-01 01:00"): -4}
@@ -473,19 +574,13 @@ class TestRegeneratePersistentConstraints:
             == -4
         )
 
-    @pytest.mark.filterwarnings(
-        "ignore:(?s).*Updating the Pyomo parameter:calliope.exceptions.ModelWarning"
-    )
     def test_update_obj_without_regeneration(self, model_persistent):
         model_persistent.backend.update_param("objective_cost_class", {"monetary": 0.5})
         model2 = model_persistent.backend.rerun()
         assert model2._model_data.attrs["objective_function_value"] == approx(
-            model_persistent._model_data.attrs["objective_function_value"]
+            0.5 * model_persistent._model_data.attrs["objective_function_value"]
         )
 
-    @pytest.mark.filterwarnings(
-        "ignore:(?s).*Updating the Pyomo parameter:calliope.exceptions.ModelWarning"
-    )
     def test_update_obj_with_regeneration(self, model_persistent):
         model_persistent.backend.update_param("objective_cost_class", {"monetary": 0.5})
         model_persistent.backend.regenerate_persistent_solver(obj=True)
@@ -494,16 +589,26 @@ class TestRegeneratePersistentConstraints:
             0.5 * model_persistent._model_data.attrs["objective_function_value"]
         )
 
-    def test_regeneration_needed_warning(self, model_persistent):
-        with pytest.warns(exceptions.ModelWarning) as excinfo:
-            model_persistent.backend.update_param(
-                "objective_cost_class", {"monetary": 0.5}
-            )
-        assert check_error_or_warning(
-            excinfo, "Updating the Pyomo parameter won't affect the optimisation"
-        )
+    def test_update_persistent_solver(self, model_persistent):
+        idx = ("b", "test_demand_elec", "2005-01-01 01:00")
+        model_persistent.backend.update_param("resource", {idx: -4})
+        updated = model_persistent.backend.update_persistent_solver({"resource": [idx]})
+        num_constraints, num_variables = updated
+        model2 = model_persistent.backend.rerun()
+        assert num_constraints == 1
+        assert num_variables == 0
+        assert model2.results.required_resource.loc[idx] == -4
+
+    def test_dependencies_found_on_build(self, model_persistent):
+        backend_model = model_persistent._backend_model
+        assert getattr(backend_model, "__calliope_param_dependencies") is not None
 
     def test_fail_to_regenerate_non_persistent_solver(self, model):
         with pytest.raises(exceptions.ModelError) as excinfo:
             model.backend.regenerate_persistent_solver(obj=True)
         assert check_error_or_warning(excinfo, "Can only regenerate persistent solvers")
+
+    def test_fail_to_update_non_persistent_solver(self, model):
+        with pytest.raises(exceptions.ModelError) as excinfo:
+            model.backend.update_persistent_solver({"resource": []})
+        assert check_error_or_warning(excinfo, "Can only update persistent solvers")
@@ -1,9 +1,24 @@
+import gc
+import weakref
+
 import pytest  # noqa: F401
 
+import numpy as np
+import pandas as pd
 import pyomo.core as po
 
 from calliope.test.common.util import build_test_model as build_model
-from calliope.backend.pyomo.util import get_domain, get_param, invalid
+from calliope.backend.pyomo.util import (
+    get_domain,
+    get_param,
+    get_param_dependencies,
+    get_param_resolver,
+    get_primal_vector,
+    get_valid_members,
+    get_var,
+    invalid,
+)
+from calliope.backend.pyomo.interface import activate_pyomo_constraint
 
 
 @pytest.fixture(scope="class")
@@ -83,6 +98,222 @@ class TestGetParam:
             get_param(m._backend_model, "random_param", ("b", "test_supply_elec"))
 
 
+class TestParamResolver:
+    @pytest.fixture
+    def backend_model(self):
+        m = build_model({}, "simple_supply,two_hours,investment_costs")
+        m.run()
+        return m._backend_model
+
+    @pytest.mark.parametrize(
+        ("param", "kind"),
+        (
+            ("resource", "timeseries"),
+            ("energy_eff", "static"),
+            ("energy_cap_max", "static"),
+            ("parasitic_eff", "default"),
+        ),
+    )
+    def test_kind(self, backend_model, param, kind):
+        assert get_param_resolver(backend_model).kind(param) == kind
+
+    def test_cache_info(self, backend_model):
+        resolver = get_param_resolver(backend_model)
+        resolver.clear()
+        dims = ("b", "test_supply_elec", backend_model.timesteps.at(1))
+
+        assert po.value(get_param(backend_model, "energy_eff", dims)) == 0.9
+        assert resolver.cache_info() == (0, 1, 1)
+        assert po.value(get_param(backend_model, "energy_eff", dims)) == 0.9
+        assert resolver.cache_info() == (1, 1, 1)
+
+    def test_cached_lookup_follows_param_update(self, backend_model):
+        dims = ("b", "test_supply_elec")
+        assert po.value(get_param(backend_model, "energy_cap_max", dims)) == 10
+        backend_model.energy_cap_max.store_values({dims: 20})
+        assert po.value(get_param(backend_model, "energy_cap_max", dims)) == 20
+
+    def test_released_with_backend_model(self):
+        m = build_model({}, "simple_supply,two_hours,investment_costs")
+        m.run()
+        resolver = weakref.ref(get_param_resolver(m._backend_model))
+        del m
+        gc.collect()
+        assert resolver() is None
+
+
+class TestGetValidMembers:
+    @pytest.fixture(scope="class")
+    def backend_model(self):
+        m = build_model({}, "simple_supply,two_hours,investment_costs")
+        m.run()
+        return m._backend_model
+
+    def test_variable_members(self, backend_model):
+        timestep = backend_model.timesteps.at(1)
+        techs = get_valid_members(
+            backend_model, "carrier_prod", "techs", ("electricity", "a", timestep)
+        )
+        expected = [
+            tech
+            for tech in backend_model.techs
+            if ("electricity", "a", tech, timestep)
+            in backend_model.carrier_prod.index_set()
+        ]
+        assert sorted(techs) == sorted(expected)
+        assert "test_supply_elec" in techs
+        assert "test_demand_elec" not in techs
+
+    def test_param_members(self, backend_model):
+        carriers = get_valid_members(
+            backend_model, "carrier", "carriers", ("out", "test_supply_elec")
+        )
+        assert carriers == ["electricity"]
+
+    def test_multiple_dims(self, backend_model):
+        node_techs = get_valid_members(
+            backend_model, "cost", ("nodes", "techs"), ("monetary",)
+        )
+        assert sorted(node_techs) == sorted(
+            (node, tech) for cost, node, tech in backend_model.cost.keys()
+        )
+
+    def test_no_members(self, backend_model):
+        assert (
+            get_valid_members(
+                backend_model, "carrier", "carriers", ("in", "test_supply_elec")
+            )
+            == []
+        )
+
+    def test_missing_component(self, backend_model):
+        assert get_valid_members(backend_model, "foo", "techs", ("a",)) == []
+
+
+class TestGetVar:
+    @pytest.fixture(scope="class")
+    def backend_model(self):
+        m = build_model({}, "simple_storage,two_hours,investment_costs")
+        m.run()
+        return m._backend_model
+
+    @pytest.mark.parametrize(
+        ("component", "dims"),
+        (
+            ("energy_cap", ["nodes", "techs"]),
+            ("carrier_prod", ["carriers", "nodes", "techs", "timesteps"]),
+            ("storage", ["nodes", "techs", "timesteps"]),
+            ("carrier_con", ["carriers", "nodes", "techs", "timesteps"]),
+            ("cost", ["costs", "nodes", "techs"]),
+        ),
+    )
+    def test_get_var(self, backend_model, component, dims):
+        result = get_var(backend_model, component, dims=dims)
+        pyomo_component = getattr(backend_model, component)
+        expected = pd.Series(
+            {k: po.value(v) for k, v in pyomo_component.items()}
+        ).rename_axis(index=dims)
+
+        assert list(result.dims) == dims
+        for dim in dims:
+            assert result[dim].values.tolist() == list(
+                getattr(backend_model, dim).ordered_data()
+            )
+        assert result.notnull().sum() == len(pyomo_component)
+        assert np.allclose(
+            result.to_series().dropna().reindex(expected.index), expected
+        )
+
+    def test_get_var_dim_order(self, backend_model):
+        result = get_var(backend_model, "energy_cap", dims=["techs", "nodes"])
+        assert result.dims == ("techs", "nodes")
+
+    def test_primal_vector(self, backend_model):
+        primal = get_primal_vector(backend_model)
+        assert len(primal.values) == sum(
+            len(i) for i in backend_model.component_objects(ctype=po.Var)
+        )
+        assert np.allclose(
+            primal.get_values("energy_cap"),
+            [i.value for i in backend_model.energy_cap._data.values()],
+        )
+
+    def test_expression_without_variable_values(self):
+        m = build_model({}, "simple_supply,two_hours,investment_costs")
+        m.run(build_only=True)
+        cost = get_var(m._backend_model, "cost", dims=["costs", "nodes", "techs"])
+        assert cost.isnull().all()
+
+
+class TestParamDependencies:
+    @pytest.fixture
+    def backend_model(self):
+        m = build_model({}, "simple_supply,two_hours,investment_costs")
+        m.run(build_only=True)
+        return m._backend_model
+
+    def test_variable_bounds(self, backend_model):
+        dependencies = get_param_dependencies(backend_model, ["energy_cap_max"])
+        constraints, variables, objective = dependencies.get(
+            {"energy_cap_max": [("b", "test_supply_elec")]}
+        )
+        assert constraints == []
+        assert variables == [backend_model.energy_cap["b", "test_supply_elec"]]
+        assert objective is False
+
+    def test_constraints(self, backend_model):
+        idx = ("b", "test_demand_elec", "2005-01-01 01:00")
+        dependencies = get_param_dependencies(backend_model, ["resource"])
+        constraints, variables, objective = dependencies.get({"resource": [idx]})
+        assert constraints == [
+            backend_model.balance_demand_constraint[("electricity", *idx)]
+        ]
+        assert variables == []
+        assert objective is False
+
+    def test_objective(self, backend_model):
+        dependencies = get_param_dependencies(backend_model, ["cost_energy_cap"])
+        assert dependencies.get(
+            {"cost_energy_cap": [("monetary", "b", "test_supply_elec")]}
+        )[2]
+
+    def test_untracked_items(self, backend_model):
+        dependencies = get_param_dependencies(backend_model, ["resource"])
+        assert dependencies.get({"resource": [("foo", "bar", "baz")]}) == (
+            [],
+            [],
+            False,
+        )
+
+    def test_reused(self, backend_model):
+        dependencies = get_param_dependencies(
+            backend_model, ["resource", "energy_cap_max"]
+        )
+        assert get_param_dependencies(backend_model, ["resource"]) is dependencies
+        assert (
+            get_param_dependencies(backend_model, ["resource", "energy_eff"])
+            is not dependencies
+        )
+
+    def test_all_params(self, backend_model):
+        dependencies = get_param_dependencies(backend_model)
+        assert {"resource", "energy_cap_max", "cost_energy_cap"}.issubset(
+            dependencies.params
+        )
+        assert get_param_dependencies(backend_model, ["resource"]) is dependencies
+
+    def test_reset_on_deactivating_constraint(self, backend_model):
+        dependencies = get_param_dependencies(backend_model, ["resource"])
+        activate_pyomo_constraint(
+            backend_model, "balance_demand_constraint", active=False
+        )
+        idx = ("b", "test_demand_elec", "2005-01-01 01:00")
+        assert get_param_dependencies(backend_model, ["resource"]) is not dependencies
+        assert get_param_dependencies(backend_model, ["resource"]).get(
+            {"resource": [idx]}
+        ) == ([], [], False)
+
+
 class TestGetDomain:
     @pytest.mark.parametrize(
         "var, domain",
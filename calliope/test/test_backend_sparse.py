@@ -0,0 +1,263 @@
+import pytest  # pylint: disable=unused-import
+from pytest import approx
+import numpy as np
+
+import calliope.exceptions as exceptions
+
+from calliope.test.common.util import build_test_model as build_model
+from calliope.test.common.util import check_error_or_warning
+
+SPARSE = {"run.backend": "sparse", "run.solver": "highs"}
+
+
+def _run_both(override, scenario):
+    pyomo_model = build_model(override, scenario)
+    pyomo_model.run()
+    sparse_model = build_model({**override, **SPARSE}, scenario)
+    sparse_model.run()
+    return pyomo_model, sparse_model
+
+
+@pytest.fixture(scope="class")
+def model():
+    m = build_model(SPARSE, "simple_supply,two_hours,investment_costs")
+    m.run()
+    return m
+
+
+class TestCompareWithPyomo:
+    @pytest.mark.parametrize(
+        "scenario",
+        (
+            "simple_supply,one_day",
+            "simple_supply_and_supply_plus,two_hours",
+            "supply_purchase,two_hours",
+            "supply_export,two_hours",
+            "simple_conversion,two_hours",
+            "conversion_and_conversion_plus,two_hours",
+            "simple_storage,one_day",
+            "storage_discharge_depth,simple_storage,one_day",
+            "storage_milp,two_hours",
+        ),
+    )
+    def test_objective_function_value(self, scenario):
+        pyomo_model, sparse_model = _run_both({}, scenario + ",investment_costs")
+
+        assert sparse_model.results.termination_condition == "optimal"
+        assert sparse_model.results.objective_function_value == approx(
+            pyomo_model.results.objective_function_value
+        )
+
+    def test_result_layout(self):
+        pyomo_model, sparse_model = _run_both(
+            {}, "simple_storage,two_hours,investment_costs"
+        )
+        assert set(pyomo_model.results.data_vars) == set(sparse_model.results.data_vars)
+        for var in pyomo_model.results.data_vars:
+            assert pyomo_model.results[var].dims == sparse_model.results[var].dims
+
+        # Variables only exist where their subset is valid
+        assert (
+            pyomo_model.results.carrier_prod.notnull()
+            == sparse_model.results.carrier_prod.notnull()
+        ).all()
+
+    def test_unmet_demand(self):
+        override = {
+            "run.ensure_feasibility": True,
+            "techs.test_supply_elec.constraints.energy_cap_max": 2,
+        }
+        pyomo_model, sparse_model = _run_both(
+            override, "simple_supply,two_hours,investment_costs"
+        )
+        assert sparse_model.results.unmet_demand.sum() > 0
+        assert sparse_model.results.unmet_demand.sum().item() == approx(
+            pyomo_model.results.unmet_demand.sum().item()
+        )
+        assert sparse_model.results.objective_function_value == approx(
+            pyomo_model.results.objective_function_value
+        )
+
+    @pytest.mark.parametrize("solver", ("highs", "gurobi_persistent"))
+    def test_operate(self, solver):
+        override = {"techs.test_storage.constraints.energy_cap_per_storage_cap_max": 1}
+        pyomo_model = build_model(override, "simple_storage,operate,investment_costs")
+        pyomo_model.run()
+        sparse_model = build_model(
+            {**override, "run.backend": "sparse", "run.solver": solver},
+            "simple_storage,operate,investment_costs",
+        )
+        if solver == "highs":
+            sparse_model.run()
+        else:
+            # A persistent solver is only used with the Pyomo backend
+            with pytest.warns(exceptions.ModelWarning) as warning:
+                sparse_model.run()
+            assert check_error_or_warning(
+                warning, "The sparse backend always uses the HiGHS solver"
+            )
+
+        assert set(sparse_model.results.termination_condition.split(",")) == {"optimal"}
+        # Dispatch is degenerate, so only the costs are compared
+        assert sparse_model.results.cost.sum().item() == approx(
+            pyomo_model.results.cost.sum().item()
+        )
+
+
+class TestSolve:
+    def test_other_solver_warning(self):
+        m = build_model(
+            {"run.backend": "sparse"}, "simple_supply,two_hours,investment_costs"
+        )
+        with pytest.warns(exceptions.ModelWarning) as warning:
+            m.run()
+        assert check_error_or_warning(
+            warning, "The sparse backend always uses the HiGHS solver"
+        )
+        assert m.results.termination_condition == "optimal"
+
+    def test_infeasible(self):
+        m = build_model(
+            {**SPARSE, "techs.test_supply_elec.constraints.energy_cap_max": 1},
+            "simple_supply,two_hours,investment_costs",
+        )
+        m.run()
+        assert m.results.termination_condition == "infeasible"
+        with pytest.raises(ValueError):
+            m._backend_model.obj()
+
+    def test_inter_cluster_storage_not_available(self):
+        override = {
+            **SPARSE,
+            "model.subset_time": ["2005-01-01", "2005-01-04"],
+            "model.time": {
+                "function": "apply_clustering",
+                "function_options": {
+                    "clustering_func": "file=cluster_days.csv:a",
+                    "how": "mean",
+                    "storage_inter_cluster": True,
+                },
+            },
+        }
+        m = build_model(override, "simple_storage,investment_costs")
+        with pytest.raises(exceptions.BackendError) as error:
+            m.run()
+        assert check_error_or_warning(error, "not available in the sparse backend")
+
+    def test_clustered_storage(self):
+        override = {
+            "model.subset_time": ["2005-01-01", "2005-01-04"],
+            "model.time": {
+                "function": "apply_clustering",
+                "function_options": {
+                    "clustering_func": "file=cluster_days.csv:a",
+                    "how": "mean",
+                    "storage_inter_cluster": False,
+                },
+            },
+            "run.cyclic_storage": False,
+        }
+        pyomo_model, sparse_model = _run_both(
+            override, "simple_storage,investment_costs"
+        )
+        assert sparse_model.results.objective_function_value == approx(
+            pyomo_model.results.objective_function_value
+        )
+
+
+class TestInterface:
+    def test_access_model_inputs(self, model):
+        inputs = model.backend.access_model_inputs()
+        assert set(model.inputs.data_vars).symmetric_difference(inputs.data_vars) == {
+            "objective_cost_class"
+        }
+
+    def test_update_param_does_not_change_model_data(self, model):
+        model.backend.update_param("energy_cap_max", {("b", "test_supply_elec"): 20})
+
+        assert (
+            model._backend_model.inputs.energy_cap_max.loc["b", "test_supply_elec"]
+            == 20
+        )
+        assert model.inputs.energy_cap_max.loc["b", "test_supply_elec"] != 20
+
+    def test_update_unknown_param(self, model):
+        with pytest.raises(exceptions.ModelError) as error:
+            model.backend.update_param("foo", {("b", "test_supply_elec"): 20})
+        assert check_error_or_warning(
+            error, "Parameter `foo` not in the sparse backend"
+        )
+
+    def test_update_param_invalid_index(self, model):
+        with pytest.raises(KeyError) as error:
+            model.backend.update_param(
+                "energy_cap_max",
+                {("a", "test_supply_elec"): 21, ("b", "test_supply_foo"): 21},
+            )
+        assert check_error_or_warning(
+            error, "Index ('b', 'test_supply_foo') is not valid for parameter"
+        )
+        assert (
+            model._backend_model.inputs.energy_cap_max.loc["a", "test_supply_elec"]
+            != 21
+        )
+
+    def test_rerun(self):
+        m = build_model(SPARSE, "simple_supply,two_hours,investment_costs")
+        m.run()
+        m.backend.update_param(
+            "energy_cap_max",
+            {("a", "test_supply_elec"): 8, ("b", "test_supply_elec"): 6},
+        )
+        with pytest.warns(exceptions.ModelWarning):
+            new_model = m.backend.rerun()
+
+        energy_cap = new_model.results.energy_cap
+        assert energy_cap.loc["a", "test_supply_elec"] == approx(4)
+        assert energy_cap.loc["b", "test_supply_elec"] == approx(6)
+
+    def test_deactivate_constraint(self):
+        m = build_model(SPARSE, "simple_supply,two_hours,investment_costs")
+        m.run()
+        m.backend.activate_constraint("system_balance_constraint", active=False)
+        with pytest.warns(exceptions.ModelWarning):
+            new_model = m.backend.rerun()
+        assert new_model.results.objective_function_value == approx(0)
+        assert "system_balance" not in m._backend_model.constraints
+
+    def test_add_constraint_not_available(self, model):
+        with pytest.raises(exceptions.BackendError):
+            model.backend.add_constraint("foo", ["nodes"], lambda backend_model: None)
+
+    def test_get_all_model_attrs(self, model):
+        attrs = model.backend.get_all_model_attrs()
+
+        assert attrs.keys() == set(["Set", "Param", "Var", "Expression"])
+        assert "energy_cap" in attrs["Var"].keys()
+        assert "cost" in attrs["Expression"].keys()
+        assert "resource" in attrs["Param"].keys()
+        assert "carriers" in attrs["Set"]
+
+    def test_variable_positions(self, model):
+        # Each decision variable has a unique column in the coefficient matrix
+        positions = np.concatenate(
+            [v.values[v.values >= 0] for v in model._backend_model.variables.values()]
+        )
+        assert len(positions) == len(np.unique(positions))
+        assert len(positions) == model._backend_model.num_cols
+
+    def test_build_profile(self):
+        m = build_model(
+            {**SPARSE, "run.build_profile": True},
+            "simple_supply,two_hours,investment_costs",
+        )
+        m.run()
+        profile = m._timings["backend_build_profile"]
+        backend_model = m._backend_model
+        built = profile[profile.indices > 0]
+
+        variables = built[built.component_type == "variable"]
+        constraints = built[built.component_type == "constraint"]
+        assert variables.indices.sum() == backend_model.num_cols
+        assert constraints.indices.sum() == backend_model.num_rows
+        assert constraints.nonzeros.sum() == backend_model.get_matrices()["A"].nnz
@@ -8,6 +8,7 @@ import pandas as pd
 import calliope
 from calliope.backend.subsets import (
     create_valid_subset,
+    create_valid_imask,
     _param_exists,
     _inheritance,
     _val_is,
@@ -16,6 +17,9 @@ from calliope.backend.subsets import (
     _imask_where,
     _combine_imasks,
     _imask_foreach,
+    _compile_where,
+    _create_factored_imask,
+    MaskCache,
 )
 from calliope.core.util.observed_dict import UpdateObserverDict
 from calliope import AttrDict
@@ -149,6 +153,41 @@ class TestSubsets:
         assert len(idx) == imask.sum()
         assert all(imask.loc[i] == 1 for i in idx)  # 1 represents boolean True here
 
+    def test_get_valid_subset_timesteps(self, model_data):
+        imask = _imask_foreach(model_data, ["nodes", "techs"])
+        timesteps = model_data.timesteps.notnull()
+        idx = _get_valid_subset(imask, timesteps)
+        expected = _get_valid_subset(imask & timesteps)
+        assert idx.names == [*imask.dims, "timesteps"]
+        assert idx.equals(expected)
+
+    @pytest.mark.parametrize(
+        ("where", "factored"),
+        (
+            ([], True),
+            (["with_inf"], True),
+            (["run.foo=True", "and", "inheritance(bar)"], True),
+            (["timeseries"], False),
+            (["with_inf", "and", "not timeseries"], False),
+        ),
+    )
+    def test_create_factored_imask(self, model_data, where, factored):
+        model_data["timeseries"] = (
+            ["nodes", "techs", "timesteps"],
+            np.random.choice(a=[np.nan, 1], size=(2, 4, 2)),
+        )
+        config = AttrDict(
+            {"foreach": ["nodes", "techs", "carriers", "timesteps"], "where": where}
+        )
+        imask, timesteps = _create_factored_imask(model_data, "foo", config)
+        if imask is None:
+            return
+        assert (timesteps is not None) is factored
+        assert ("timesteps" in imask.dims) is not factored
+        subset = create_valid_subset(model_data, "foo", config)
+        assert subset.names == ["carriers", "nodes", "techs", "timesteps"]
+        assert len(subset) == create_valid_imask(model_data, "foo", config).sum()
+
     def test_subset_imask_no_squeeze(self, model_data, imask_subset_config):
         """
         Subset on nodes
@@ -288,6 +327,57 @@ class TestSubsets:
             _imask_where(model_data, "foo", ["node_tech", "inheritance(bar)"])
         assert check_error_or_warning(excinfo, "'where' array for set `foo` must")
 
+    def test_compile_where(self):
+        tree = _compile_where(
+            "foo", [["with_inf", "or", "inheritance(bar)"], "and", "not run.foo=True"]
+        )
+        assert tree == (
+            "and",
+            ("or", ("exists", "with_inf"), ("function", "inheritance", "bar")),
+            ("not", ("equals", "run.foo", "True")),
+        )
+
+    def test_compile_where_shared(self):
+        where_array = [["with_inf", "or", "inheritance(bar)"], "and", "node_tech"]
+        assert _compile_where("foo", where_array) is _compile_where(
+            "bar", [["with_inf", "or", "inheritance(bar)"], "and", "node_tech"]
+        )
+        assert _compile_where("foo", where_array)[1] == _compile_where(
+            "foo", ["with_inf", "or", "inheritance(bar)"]
+        )
+
+    def test_mask_cache_shares_masks(self, model_data):
+        mask_cache = MaskCache(model_data)
+        imask = _imask_where(
+            model_data, "foo", ["with_inf", "and", "node_tech"], mask_cache=mask_cache
+        )
+        imask_2 = _imask_where(
+            model_data, "bar", ["with_inf", "or", "run.foo=True"], mask_cache=mask_cache
+        )
+        assert mask_cache.evaluate(("exists", "with_inf")) is mask_cache.evaluate(
+            ("exists", "with_inf")
+        )
+        assert imask.equals(
+            _imask_where(model_data, "foo", ["with_inf", "and", "node_tech"])
+        )
+        assert imask_2.equals(
+            _imask_where(model_data, "bar", ["with_inf", "or", "run.foo=True"])
+        )
+
+    def test_mask_cache_config_parsed_once(self, model_data):
+        mask_cache = MaskCache(model_data)
+        model_data.attrs["run_config"] = "foo: false"
+        # The run configuration is read on creating the cache
+        assert mask_cache.evaluate(("equals", "run.foo", "True")) is True
+        assert MaskCache(model_data).evaluate(("equals", "run.foo", "True")) is False
+
+    def test_mask_cache_foreach_copy(self, model_data, imask_subset_config):
+        mask_cache = MaskCache(model_data)
+        foreach = ["nodes", "techs"]
+        imask = mask_cache.foreach(foreach)
+        _subset_imask("foo", imask_subset_config(foreach), imask)
+        assert mask_cache.foreach(foreach).equals(_imask_foreach(model_data, foreach))
+
     @pytest.mark.parametrize("model_name", ("urban_scale", "national_scale", "milp"))
     def test_create_valid_subset(self, model_name):
         model = getattr(calliope.examples, model_name)()
@@ -1,7 +1,9 @@
+import json
 import os
 import tempfile
 
 import pytest  # noqa: F401
+import xarray as xr
 from click.testing import CliRunner
 
 import calliope
@@ -117,6 +119,66 @@ class TestCLI:
             assert result.exit_code == 0
             assert os.path.isfile(os.path.join(tempdir, "output.lp"))
 
+    def test_run_save_build_profile(self):
+        runner = CliRunner()
+
+        with runner.isolated_filesystem() as tempdir:
+            result = runner.invoke(
+                cli.run,
+                [
+                    _MINIMAL_TEST_MODEL,
+                    "--scenario=investment_costs",
+                    "--save_build_profile=profile.json",
+                ],
+            )
+            assert result.exit_code == 0
+            with open(os.path.join(tempdir, "profile.json"), "r") as f:
+                profile = json.load(f)
+            assert {"component_type", "component", "rule_time"}.issubset(profile[0])
+            assert "system_balance" in [i["component"] for i in profile]
+
+    def test_run_no_preprocessing_cache(self):
+        runner = CliRunner()
+
+        with runner.isolated_filesystem() as tempdir:
+            cache_dir = os.path.join(tempdir, "cache")
+            args = [
+                _MINIMAL_TEST_MODEL,
+                "--scenario=investment_costs",
+                "--override_dict={{model.preprocessing_cache.path: {}}}".format(
+                    cache_dir
+                ),
+                "--save_lp=output.lp",
+            ]
+            result = runner.invoke(cli.run, args + ["--no_preprocessing_cache"])
+            assert result.exit_code == 0
+            assert not os.path.exists(cache_dir)
+
+            result = runner.invoke(cli.run, args)
+            assert result.exit_code == 0
+            assert len(os.listdir(cache_dir)) == 1
+
+    def test_run_batch(self):
+        runner = CliRunner()
+
+        with runner.isolated_filesystem() as tempdir:
+            result = runner.invoke(
+                cli.run_batch,
+                [
+                    _MINIMAL_TEST_MODEL,
+                    "--scenarios=investment_costs;investment_costs,one_day",
+                    "--processes=2",
+                    "--save_netcdf=output.nc",
+                ],
+            )
+            assert result.exit_code == 0
+            assert "investment_costs,one_day" in result.output
+            with xr.open_dataset(os.path.join(tempdir, "output.nc")) as results:
+                assert list(results.scenario.values) == [
+                    "investment_costs",
+                    "investment_costs,one_day",
+                ]
+
     def test_generate_runs_bash(self):
         runner = CliRunner()
 
@@ -2,9 +2,11 @@ import os
 
 import pytest
 import tempfile
+import numpy as np
 import pandas as pd
 
 import calliope
+from calliope.test.common.util import build_test_model as build_model
 from calliope.test.common.util import check_error_or_warning
 
 
@@ -30,3 +32,80 @@ class TestModel:
         model = calliope.Model(model_location)
 
         model.info()
+
+
+@pytest.fixture(scope="module")
+def full_model():
+    model = build_model({}, "simple_storage,two_hours,investment_costs")
+    model.run()
+    return model
+
+
+class TestResultSelection:
+    def test_whitelist(self, full_model):
+        model = build_model({}, "simple_storage,two_hours,investment_costs")
+        model.run(results=["energy_cap", "cost"])
+
+        assert set(model.results.data_vars) == {"energy_cap", "cost"}
+        assert model.run_config["results"] == ["energy_cap", "cost"]
+        assert model.results.energy_cap.equals(full_model.results.energy_cap)
+
+    def test_aggregate(self, full_model):
+        model = build_model(
+            {"run.results": {"carrier_prod": {"timesteps": "sum"}, "energy_cap": None}},
+            "simple_storage,two_hours,investment_costs",
+        )
+        model.run()
+
+        assert set(model.results.data_vars) == {"carrier_prod", "energy_cap"}
+        assert "timesteps" not in model.results.carrier_prod.dims
+        assert model.results.carrier_prod.equals(
+            full_model.results.carrier_prod.sum("timesteps")
+        )
+
+    def test_postprocessed_result(self, full_model):
+        model = build_model({}, "simple_storage,two_hours,investment_costs")
+        model.run(results={"systemwide_levelised_cost": None})
+
+        assert set(model.results.data_vars) == {"systemwide_levelised_cost"}
+        assert model.results.systemwide_levelised_cost.equals(
+            full_model.results.systemwide_levelised_cost
+        )
+
+    def test_postprocessing_skipped(self):
+        model = build_model({}, "simple_storage,two_hours,investment_costs")
+        model.run(results=["carrier_prod"])
+
+        assert set(model.results.data_vars) == {"carrier_prod"}
+
+    def test_invalid_aggregation(self):
+        model = build_model({}, "simple_storage,two_hours,investment_costs")
+        with pytest.raises(calliope.exceptions.ModelError) as excinfo:
+            model.run(results={"carrier_prod": {"timesteps": "median"}})
+        assert check_error_or_warning(
+            excinfo, "Invalid aggregation `{'timesteps': 'median'}` for result"
+        )
+
+    def test_unknown_result(self):
+        model = build_model({}, "simple_storage,two_hours,investment_costs")
+        with pytest.warns(calliope.exceptions.ModelWarning) as excinfo:
+            model.run(results=["energy_cap", "foo"])
+        assert check_error_or_warning(
+            excinfo, "not in the model results and will be ignored: ['foo']"
+        )
+        assert set(model.results.data_vars) == {"energy_cap"}
+
+    def test_sparse_backend(self):
+        override = {"run.backend": "sparse", "run.solver": "highs"}
+        scenario = "simple_storage,two_hours,investment_costs"
+        full_model = build_model(override, scenario)
+        full_model.run()
+        model = build_model(override, scenario)
+        model.run(results={"storage": {"timesteps": "max"}})
+
+        assert set(model.results.data_vars) == {"storage"}
+        assert np.allclose(
+            model.results.storage,
+            full_model.results.storage.max("timesteps"),
+            equal_nan=True,
+        )
@@ -558,6 +558,37 @@ class TestModelRun:
                 error, "`timeseries_dataframes` must be dict of pandas DataFrames."
             )
 
+    @pytest.mark.parametrize(
+        ("override", "reused"),
+        (
+            ({"techs.test_supply_elec.constraints.energy_cap_max": 8}, True),
+            ({"model.subset_time": ["2005-01-01", "2005-01-02"]}, False),
+            (
+                {"techs.test_demand_elec.constraints.resource": "file=demand_heat.csv"},
+                False,
+            ),
+        ),
+    )
+    def test_timeseries_data_from_base_model_run(self, override, reused):
+        """
+        Timeseries data is reused from a base model run if the same timeseries
+        are loaded and processed in the same way.
+        """
+        model_file = os.path.join(
+            os.path.dirname(__file__), "common", "test_model", "model.yaml"
+        )
+        base_model = calliope.Model(model_file, scenario="simple_supply,one_day")
+        model = calliope.Model(
+            model_file,
+            scenario="simple_supply,one_day",
+            override_dict=override,
+            base_model=base_model,
+        )
+
+        assert (
+            model._model_run.timeseries_data is base_model._model_run.timeseries_data
+        ) is reused
+
 
 class TestChecks:
     def test_unrecognised_config_keys(self):
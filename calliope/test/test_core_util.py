@@ -5,14 +5,22 @@ import datetime
 import os
 import tempfile
 
+import numpy as np
 import xarray as xr
 
 from calliope.core.util import dataset, observed_dict
 
 from calliope.core.util.tools import memoize, memoize_instancemethod
 
-from calliope.core.util.logging import log_time
+from calliope.core.util.logging import log_time, BuildProfiler
 from calliope.core.util.generate_runs import generate_runs
+from calliope.core.util.run_batch import (
+    get_batch_runs,
+    run_batch,
+    _open_shared_base,
+    _save_shared_base,
+    _use_shared_base,
+)
 from calliope.test.common.util import (
     python36_or_higher,
     check_error_or_warning,
@@ -26,6 +34,10 @@ _MODEL_URBAN = os.path.join(
     os.path.dirname(__file__), "..", "example_models", "urban_scale", "model.yaml"
 )
 
+_TEST_MODEL = os.path.join(
+    os.path.dirname(__file__), "common", "test_model", "model.yaml"
+)
+
 
 class TestDataset:
     @pytest.fixture()
@@ -148,6 +160,30 @@ class TestLogging:
             time_since_run_start=True,
         )
 
+    def test_build_profiler(self):
+        profiler = BuildProfiler()
+        with profiler.component("variable", "foo") as record:
+            with record.timer("subset_time"):
+                pass
+            record["indices"] = 2
+        with profiler.component("constraint", "bar") as record:
+            with record.timer("subset_time"):
+                pass
+        profile = profiler.to_dataframe()
+
+        assert profile.columns.tolist() == BuildProfiler.columns
+        assert profile.component.tolist() == ["foo", "bar"]
+        assert profile.indices.tolist() == [2, 0]
+        assert (profile.subset_time >= 0).all()
+        assert profile.rule_time.isnull().all()
+
+    def test_build_profiler_disabled(self):
+        profiler = BuildProfiler(enabled=False)
+        with profiler.component("variable", "foo") as record:
+            with record.timer("subset_time"):
+                pass
+        assert profiler.to_dataframe().empty
+
 
 class TestGenerateRuns:
     @python36_or_higher
@@ -178,6 +214,126 @@ class TestGenerateRuns:
         assert runs[0].endswith("--scenario milp --save_netcdf out_1_milp.nc")
 
 
+class TestRunBatch:
+    def test_get_batch_runs(self):
+        runs = get_batch_runs(
+            calliope.AttrDict(),
+            scenarios="run1;run2",
+            override_dicts=[{"run.solver": "glpk"}],
+        )
+        assert runs == {
+            "run1": ("run1", None),
+            "run2": ("run2", None),
+            "override_1": (None, {"run.solver": "glpk"}),
+        }
+
+    def test_get_batch_runs_from_config(self):
+        config = calliope.AttrDict.from_yaml(_MODEL_URBAN)
+        assert list(get_batch_runs(config)) == list(config.overrides.keys())
+
+    def test_run_batch(self):
+        scenarios = [
+            "simple_supply,two_hours,investment_costs",
+            "simple_supply,one_day,investment_costs",
+        ]
+        with tempfile.TemporaryDirectory() as tempdir:
+            results, summary = run_batch(
+                _TEST_MODEL,
+                scenarios=scenarios,
+                override_dicts={"no_scenario": {}},
+                override_dict={"run.solver": "cbc"},
+                processes=2,
+                solver_threads=1,
+                out_dir=tempdir,
+            )
+            model = calliope.read_netcdf(
+                os.path.join(tempdir, "out_2_" + scenarios[1] + ".nc")
+            )
+
+        assert list(summary.index) == scenarios + ["no_scenario"]
+        assert (summary.termination_condition[scenarios] == "optimal").all()
+        # The base model is not complete without a scenario
+        assert summary.error["no_scenario"].startswith("ModelError")
+        assert list(results.scenario.values) == scenarios
+        assert results.energy_cap.sel(scenario=scenarios[1], drop=True).equals(
+            model.results.energy_cap
+        )
+        assert model.run_config["solver_options"] == {"threads": 1}
+
+    def test_run_batch_shared_base(self):
+        scenarios = [
+            "simple_supply,two_hours,investment_costs",
+            "simple_supply,one_day,investment_costs",
+        ]
+        results, summary = run_batch(_TEST_MODEL, scenarios=scenarios, processes=2)
+        shared_results, shared_summary = run_batch(
+            _TEST_MODEL,
+            scenarios=scenarios,
+            processes=2,
+            shared_base=True,
+            base_scenario=scenarios[1],
+        )
+
+        assert (summary.shared_variables == 0).all()
+        # Only the run with the same timesteps as the base model can be
+        # updated from it
+        assert shared_summary.updated_from_base.tolist() == [False, True]
+        # The model data of the base scenario is all shared, apart from
+        # that which is updated on running the model
+        assert (
+            0
+            < shared_summary.shared_variables[scenarios[0]]
+            < shared_summary.shared_variables[scenarios[1]]
+        )
+        assert shared_results.equals(results)
+
+    def test_use_shared_base(self):
+        config = calliope.AttrDict.from_yaml(_TEST_MODEL)
+        config.model.timeseries_data_path = os.path.join(
+            os.path.dirname(_TEST_MODEL), config.model.timeseries_data_path
+        )
+        scenario = "simple_supply,two_hours,investment_costs"
+        with tempfile.TemporaryDirectory() as tempdir:
+            _save_shared_base(tempdir, config, scenario, None, None, False)
+            base = _open_shared_base(tempdir)
+            model = calliope.Model(
+                config.copy(),
+                scenario=scenario,
+                override_dict={"techs.test_supply_elec.constraints.energy_cap_max": 8},
+                preprocessing_cache=False,
+                base_model=base,
+            )
+            shared = _use_shared_base(model, base._model_data)
+
+            # Only the updated variable is held in memory by the model
+            assert model._base_model_updated_vars == ["energy_cap_max"]
+            assert shared == len(model._model_data.data_vars) - 1
+            assert np.shares_memory(
+                model._model_data.resource.values, base._model_data.resource.values
+            )
+            assert not model._model_data.resource.values.flags.writeable
+            model.run()
+            assert model.results.attrs["termination_condition"] == "optimal"
+
+    def test_run_batch_shared_base_removed_on_error(self, monkeypatch):
+        with tempfile.TemporaryDirectory() as tempdir:
+            monkeypatch.setattr(
+                "calliope.core.util.run_batch.SHARED_MEMORY_DIR", tempdir
+            )
+            with pytest.raises(calliope.exceptions.ModelError):
+                try:
+                    run_batch(
+                        _TEST_MODEL,
+                        scenarios=["simple_supply"],
+                        shared_base=True,
+                        base_scenario="foo",
+                    )
+                finally:
+                    # Removed as soon as the batch fails, rather than only once
+                    # the temporary directory is garbage collected
+                    assert not os.listdir(tempdir)
+
+
 class TestPandasExport:
     @pytest.fixture(scope="module")
     def model(self):
@@ -1,12 +1,21 @@
 from calliope import exceptions
+import os
 import shutil
+import tempfile
 
 import pytest
 from pytest import approx
 import pandas as pd
 import numpy as np
 import calliope
-from calliope.test.common.util import check_error_or_warning
+from calliope.backend.run import (
+    _get_changed_spores_scores,
+    _get_spores_batch_scores,
+    _init_spores_worker,
+    _run_spores_candidate,
+)
+from calliope.core.attrdict import AttrDict
+from calliope.test.common.util import build_test_model, check_error_or_warning
 
 
 class TestModelPreproccessing:
@@ -153,13 +162,14 @@ class TestNationalScaleExampleModelOperate:
     reason="SPORES mode will fail until the cost max group constraint can be reproduced"
 )
 class TestNationalScaleExampleModelSpores:
-    def example_tester(self, solver="cbc", solver_io=None):
+    def example_tester(self, solver="cbc", solver_io=None, **override_dict):
 
         model = calliope.examples.national_scale(
             override_dict={
                 "model.subset_time": ["2005-01-01", "2005-01-03"],
                 "run.solver": solver,
                 "run.solver_io": solver_io,
+                **override_dict,
             },
             scenario="spores",
         )
@@ -197,6 +207,22 @@ class TestNationalScaleExampleModelSpores:
     def test_nationalscale_example_results_cbc(self):
         self.example_tester()
 
+    def test_nationalscale_example_results_batches(self):
+        batches_data = self.example_tester(
+            **{"run.spores_options.batch_size": 2, "run.spores_options.seed": 0}
+        )
+        assert np.allclose(batches_data.spores, [0, 1, 2, 3])
+
+    def test_nationalscale_example_results_path(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            path = os.path.join(tempdir, "results.nc")
+            results_data = self.example_tester(
+                **{"run.spores_options.results_path": path}
+            )
+            assert np.allclose(results_data.spores, [0, 1, 2, 3])
+            assert not results_data.energy_cap.variable._in_memory
+            results_data.close()
+
     @pytest.mark.filterwarnings(
         "ignore:(?s).*`gurobi_persistent`.*:calliope.exceptions.ModelWarning"
     )
@@ -332,6 +358,59 @@ class TestNationalScaleExampleModelSpores:
         )
 
 
+class TestSporesScores:
+    def test_only_changed_scores(self):
+        idx = [("spores_score", "a", "pv"), ("spores_score", "b", "pv")]
+        new_idx = ("spores_score", "b", "ccgt")
+        scores = pd.Series(
+            [100, 0, 200],
+            index=pd.MultiIndex.from_tuples(
+                idx + [new_idx], names=["costs", "nodes", "techs"]
+            ),
+        )
+        applied_scores = {idx[0]: 100, idx[1]: 100}
+
+        assert _get_changed_spores_scores(scores, applied_scores) == {
+            idx[1]: 0,
+            new_idx: 200,
+        }
+
+    @pytest.mark.parametrize("batch_size", (1, 2, 3))
+    def test_batch_scores(self, batch_size):
+        scores = pd.Series([100, 0, 200, 300], index=["a", "b", "c", "d"])
+        batch = _get_spores_batch_scores(scores, batch_size, np.random.default_rng(0))
+
+        assert len(batch) == batch_size
+        assert batch[0].equals(scores)
+        # Each scored item is doubled in exactly one of the alternative scores
+        if batch_size > 1:
+            doubled = sum((i != scores).astype(int) for i in batch[1:])
+            assert doubled.tolist() == [1, 0, 1, 1]
+            assert all(((i == scores) | (i == scores * 2)).all() for i in batch)
+
+    def test_run_spores_candidate(self):
+        model = build_test_model({}, "simple_supply,two_hours,investment_costs")
+        model.run(build_only=True)
+        scores = (
+            model._model_data.cost_energy_cap.loc[{"costs": ["monetary"]}]
+            .to_series()
+            .dropna()
+        )
+        _init_spores_worker(
+            model._backend_model,
+            model._model_data,
+            AttrDict.from_yaml_string(model._model_data.attrs["run_config"]),
+            scores.to_dict(),
+        )
+        results, inputs = _run_spores_candidate(scores * 2)
+
+        assert results.attrs["termination_condition"] == "optimal"
+        assert np.allclose(
+            inputs.cost_energy_cap.loc[{"costs": "monetary"}].to_series().dropna(),
+            scores.droplevel("costs") * 2,
+        )
+
+
 class TestNationalScaleResampledExampleModelSenseChecks:
     def example_tester(self, solver="cbc", solver_io=None):
         override = {
@@ -1,10 +1,106 @@
+import gzip
 import os
+import re
 import tempfile
 
+import numpy as np
+import pandas as pd
 import pytest  # noqa: F401
+import xarray as xr
 
 import calliope
 from calliope import exceptions
+from calliope.core.io import (
+    NetCDFSporesWriter,
+    NetCDFTimestepWriter,
+    open_shared_dataset,
+    save_shared_dataset,
+)
+from calliope.postprocess.results import apply_zero_threshold
+from calliope.test.common.util import build_test_model
+from calliope.test.common.util import check_error_or_warning
+
+
+def _parse_problem_file(path, extension):
+    """
+    Parse a gzipped LP or free MPS file, as written by Pyomo, into the
+    objective function coefficients, the constraint matrix coefficients, the
+    sense and right-hand side of each row and the bounds of each column.
+    """
+    problem = {
+        "objective": {},
+        "coefficients": {},
+        "senses": {},
+        "rhs": {},
+        "bounds": {},
+    }
+    with gzip.open(path, "rt") as f:
+        lines = [line.strip() for line in f.read().splitlines()]
+
+    if extension == "lp":
+        section = row = None
+        for line in lines:
+            if line in ["min", "max", "s.t.", "bounds", "end"]:
+                section = line
+            elif not line or line.startswith("\\"):
+                row = None
+            elif section == "bounds":
+                lower, col, upper = re.fullmatch(
+                    r"(\S+) <= (\S+) <= (\S+)", line
+                ).groups()
+                problem["bounds"][col] = (float(lower), float(upper))
+            elif line.endswith(":"):
+                row = line[:-1]
+            elif re.fullmatch(r"[+-]\S+ \S+", line):
+                coeff, col = line.split(" ")
+                if row == "obj":
+                    problem["objective"][col] = float(coeff)
+                else:
+                    problem["coefficients"][(row, col)] = float(coeff)
+            else:
+                lhs, sense, rhs = re.fullmatch(
+                    r"(?:(\S+) )?(<=|>=|=) (\S+)", line
+                ).groups()
+                if lhs:
+                    problem["coefficients"][(row, lhs)] = 1.0
+                problem["senses"][row] = sense
+                problem["rhs"][row] = float(rhs)
+    else:
+        senses = {"E": "=", "L": "<=", "G": ">="}
+        section = None
+        for line in lines:
+            if line.startswith("*") or not line:
+                continue
+            elif line.isupper() and " " not in line:
+                section = line
+            elif section == "ROWS":
+                sense, row = line.split()
+                if sense != "N":
+                    problem["senses"][row] = senses[sense]
+            elif section == "COLUMNS":
+                col, row, coeff = line.split()
+                if row == "obj":
+                    problem["objective"][col] = float(coeff)
+                else:
+                    problem["coefficients"][(row, col)] = float(coeff)
+            elif section == "RHS":
+                _, row, rhs = line.split()
+                problem["rhs"][row] = float(rhs)
+            elif section == "BOUNDS":
+                bound_type, _, col, *value = line.split()
+                lower, upper = problem["bounds"].get(col, (0.0, np.inf))
+                value = float(value[0]) if value else None
+                if bound_type in ["LO", "FX"]:
+                    lower = value
+                if bound_type in ["UP", "FX"]:
+                    upper = value
+                if bound_type in ["MI", "FR"]:
+                    lower = -np.inf
+                if bound_type in ["PL", "FR"]:
+                    upper = np.inf
+                problem["bounds"][col] = (lower, upper)
+
+    return problem
 
 
 class TestIO:
@@ -112,6 +208,46 @@ class TestIO:
             with open(out_path, "r") as f:
                 assert "energy_cap(region1_ccgt)" in f.read()
 
+    def test_save_lp_without_building_backend(self):
+        model = calliope.examples.national_scale()
+        with tempfile.TemporaryDirectory() as tempdir:
+            out_path = os.path.join(tempdir, "model.lp")
+            model.to_lp(out_path)
+
+            with open(out_path, "r") as f:
+                assert "energy_cap(region1_ccgt)" in f.read()
+        assert not hasattr(model, "_backend_model")
+
+    @pytest.mark.parametrize("extension", ("lp", "mps"))
+    def test_streamed_lp_matches_pyomo(self, extension):
+        pyomo_model = build_test_model({}, "simple_storage,two_hours,investment_costs")
+        pyomo_model.run(build_only=True)
+        model = build_test_model({}, "simple_storage,two_hours,investment_costs")
+
+        with tempfile.TemporaryDirectory() as tempdir:
+            pyomo_path = os.path.join(tempdir, f"pyomo.{extension}.gz")
+            out_path = os.path.join(tempdir, f"model.{extension}.gz")
+            pyomo_model.to_lp(pyomo_path)
+            model.to_lp(out_path, chunk_size=5)
+
+            pyomo_problem = _parse_problem_file(pyomo_path, extension)
+            problem = _parse_problem_file(out_path, extension)
+
+        assert not hasattr(model, "_backend_model")
+        assert "storage(a_test_storage__2005_01_01_01_00_)" in problem["bounds"]
+        for component in ["senses", "bounds"]:
+            assert problem[component] == pyomo_problem[component]
+        for component in ["objective", "coefficients", "rhs"]:
+            assert problem[component].keys() == pyomo_problem[component].keys()
+            assert problem[component] == pytest.approx(pyomo_problem[component])
+
+    def test_save_lp_invalid_format(self):
+        model = build_test_model({}, "simple_supply,two_hours,investment_costs")
+        with tempfile.TemporaryDirectory() as tempdir:
+            with pytest.raises(exceptions.ModelError) as excinfo:
+                model.to_lp(os.path.join(tempdir, "model.lp"), format="nl")
+        assert check_error_or_warning(excinfo, "Cannot write a model to `nl` format")
+
     @pytest.mark.skip(
         reason="SPORES mode will fail until the cost max group constraint can be reproduced"
     )
@@ -132,3 +268,195 @@ class TestIO:
             for i in ["0", "1", "2", "3"]:
                 assert os.path.isfile(os.path.join(tempdir, "output", f"spore_{i}.nc"))
             assert not os.path.isfile(os.path.join(tempdir, "output.nc"))
+
+
+class TestNetCDFTimestepWriter:
+    timesteps = pd.date_range("2005-01-01", periods=6, freq="H")
+
+    def _block(self, start, end, value=1):
+        timesteps = self.timesteps[start:end]
+        return xr.Dataset(
+            {
+                "carrier_prod": (
+                    ("nodes", "timesteps"),
+                    np.random.rand(2, len(timesteps)),
+                    {"is_result": 1},
+                ),
+                "cost": (("nodes",), [value, 2 * value], {"is_result": 1}),
+            },
+            coords={"nodes": ["a", "b"], "timesteps": timesteps},
+        )
+
+    def test_append(self):
+        blocks = [self._block(0, 2, 1), self._block(2, 6, 2)]
+        with tempfile.TemporaryDirectory() as tempdir:
+            writer = NetCDFTimestepWriter(os.path.join(tempdir, "results.nc"))
+            for block in blocks:
+                writer.append(block)
+            results = writer.open_dataset()
+
+            assert not results.carrier_prod.variable._in_memory
+            xr.testing.assert_allclose(results, xr.concat(blocks, dim="timesteps"))
+            assert results.carrier_prod.attrs["is_result"] == 1
+            results.close()
+
+    def test_missing_variables(self):
+        blocks = [
+            self._block(0, 2),
+            xr.Dataset(coords={"timesteps": self.timesteps[2:4]}),
+            self._block(4, 6),
+        ]
+        with tempfile.TemporaryDirectory() as tempdir:
+            writer = NetCDFTimestepWriter(os.path.join(tempdir, "results.nc"))
+            for block in blocks:
+                writer.append(block)
+            results = writer.open_dataset()
+
+            assert results.cost.isnull().sum() == 4
+            assert results.carrier_prod.isel(timesteps=[2, 3]).isnull().all()
+            xr.testing.assert_allclose(
+                results.carrier_prod.isel(timesteps=[4, 5]),
+                blocks[-1].carrier_prod,
+            )
+            results.close()
+
+    def test_pad_timesteps(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            writer = NetCDFTimestepWriter(os.path.join(tempdir, "results.nc"))
+            writer.append(self._block(0, 4))
+            results = writer.open_dataset(self.timesteps.values)
+
+            assert results.timesteps.to_index().equals(self.timesteps)
+            assert results.carrier_prod.isel(timesteps=[4, 5]).isnull().all()
+            assert not results.carrier_prod.variable._in_memory
+            results.close()
+
+    def test_continue_writing(self):
+        blocks = [self._block(0, 2), self._block(2, 4), self._block(4, 6)]
+        with tempfile.TemporaryDirectory() as tempdir:
+            path = os.path.join(tempdir, "results.nc")
+            writer = NetCDFTimestepWriter(path)
+            writer.append(blocks[0])
+            writer.append(self._block(2, 4))
+            # e.g. when resuming a run after its first block
+            writer = NetCDFTimestepWriter(path, num_timesteps=2)
+            writer.append(blocks[1])
+            writer.append(blocks[2])
+            results = writer.open_dataset()
+
+            xr.testing.assert_allclose(results, xr.concat(blocks, dim="timesteps"))
+            results.close()
+
+    def test_zero_threshold_lazy_results(self):
+        block = self._block(0, 2)
+        block.carrier_prod.loc[{"nodes": "a"}] = 1e-12
+        with tempfile.TemporaryDirectory() as tempdir:
+            writer = NetCDFTimestepWriter(os.path.join(tempdir, "results.nc"))
+            writer.append(block)
+            results = writer.open_dataset()
+
+            assert apply_zero_threshold(results, 1e-10) == ["carrier_prod"]
+            assert (results.carrier_prod.loc[{"nodes": "a"}] == 0).all()
+            results.close()
+
+
+class TestNetCDFSporesWriter:
+    timesteps = pd.date_range("2005-01-01", periods=4, freq="H")
+
+    @pytest.fixture
+    def inputs(self):
+        return xr.Dataset(
+            {
+                "resource": (
+                    ("nodes", "timesteps"),
+                    np.random.rand(2, 4),
+                    {"is_result": 0},
+                )
+            },
+            coords={"nodes": ["a", "b"], "timesteps": self.timesteps},
+            attrs={"run_config": "foo"},
+        )
+
+    def _spore(self, spore, value=1):
+        return xr.Dataset(
+            {
+                "carrier_prod": (
+                    ("timesteps", "nodes"),
+                    np.random.rand(4, 2),
+                    {"is_result": 1},
+                ),
+                "cost_energy_cap": (
+                    ("costs", "nodes"),
+                    [[value, 2 * value]],
+                    {"is_result": 0},
+                ),
+            },
+            # Nodes in a different order to the inputs
+            coords={"nodes": ["b", "a"], "timesteps": self.timesteps, "costs": ["x"]},
+        ).assign_coords(spores=("spores", [spore]))
+
+    def test_append(self, inputs):
+        spores = [self._spore(0, 1), self._spore(1, 2)]
+        with tempfile.TemporaryDirectory() as tempdir:
+            path = os.path.join(tempdir, "results.nc")
+            writer = NetCDFSporesWriter(path, inputs)
+            for spore in spores:
+                writer.append(spore)
+            results = writer.open_dataset()
+
+            assert not results.carrier_prod.variable._in_memory
+            assert set(results.data_vars) == {"carrier_prod", "cost_energy_cap"}
+            assert results.attrs == {}
+            xr.testing.assert_allclose(
+                results, xr.concat(spores, dim="spores").reindex_like(results)
+            )
+            results.close()
+
+            # Inputs are only written once, without a `spores` dimension
+            with xr.open_dataset(path) as saved:
+                xr.testing.assert_allclose(saved.resource, inputs.resource)
+                assert saved.attrs["run_config"] == "foo"
+
+    def test_dims_not_in_inputs(self, inputs):
+        spore = self._spore(0)
+        with tempfile.TemporaryDirectory() as tempdir:
+            writer = NetCDFSporesWriter(
+                os.path.join(tempdir, "results.nc"), inputs[["nodes"]]
+            )
+            writer.append(spore)
+            writer.append(self._spore(1).isel(timesteps=[1, 2]))
+            results = writer.open_dataset()
+
+            assert results.timesteps.to_index().equals(self.timesteps)
+            first_spore = results.carrier_prod.sel(spores=0, drop=True)
+            xr.testing.assert_allclose(
+                first_spore, spore.carrier_prod.reindex_like(first_spore)
+            )
+            assert results.carrier_prod.sel(spores=1).isnull().sum() == 4
+            results.close()
+
+
+class TestSharedDataset:
+    def test_save_and_open(self):
+        model_data = build_test_model(
+            {}, "simple_supply,two_hours,investment_costs"
+        )._model_data
+        with tempfile.TemporaryDirectory() as tempdir:
+            save_shared_dataset(model_data, tempdir)
+            shared = open_shared_dataset(tempdir)
+
+            assert shared.identical(model_data)
+            assert list(shared.data_vars) == list(model_data.data_vars)
+            assert os.path.isfile(os.path.join(tempdir, "resource.npy"))
+            # Non-numeric arrays are not memory-mapped
+            assert not os.path.isfile(os.path.join(tempdir, "name.npy"))
+
+    def test_read_only(self):
+        dataset = xr.Dataset({"foo": ("bar", np.arange(3.0))})
+        with tempfile.TemporaryDirectory() as tempdir:
+            save_shared_dataset(dataset, tempdir)
+            shared = open_shared_dataset(tempdir)
+            with pytest.raises(ValueError):
+                shared.foo.values[0] = 10
+
+            assert open_shared_dataset(tempdir).foo.values.tolist() == [0, 1, 2]
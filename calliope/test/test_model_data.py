@@ -6,12 +6,13 @@ import numpy as np
 import pandas as pd
 
 import calliope
-from calliope.preprocess.model_data import ModelDataFactory
+from calliope.preprocess.model_data import ModelDataFactory, ModelDataUpdater
 from calliope.core.attrdict import AttrDict
 from calliope._version import __version__
 import calliope.exceptions as exceptions
 
 from calliope.preprocess import model_run_from_yaml
+from calliope.test.common.util import build_test_model as build_model
 from calliope.test.common.util import check_error_or_warning
 
 
@@ -425,3 +426,108 @@ class TestModelData:
         assert "\ncost_energy_cap" in attr_dict["defaults"]
         assert "\nenergy_cap_max" in attr_dict["defaults"]
         assert "\navailable_area" in attr_dict["defaults"]
+
+
+class TestModelDataUpdater:
+    SCENARIO = "simple_supply,two_hours,investment_costs"
+
+    @pytest.fixture(scope="class")
+    def base_model(self):
+        # The base model is run, so that its results must be dropped
+        model = build_model({}, TestModelDataUpdater.SCENARIO)
+        model.run()
+        return model
+
+    def _build(self, override, base_model):
+        return calliope.Model(
+            os.path.join(
+                os.path.dirname(calliope.__file__),
+                "test",
+                "common",
+                "test_model",
+                "model.yaml",
+            ),
+            scenario=self.SCENARIO,
+            override_dict=override,
+            base_model=base_model,
+        )
+
+    @pytest.mark.parametrize(
+        "override",
+        (
+            {"techs.test_supply_elec.constraints.energy_cap_max": 8},
+            {"nodes.a.techs.test_supply_elec.constraints.energy_cap_max": 8},
+            {"techs.test_supply_elec.costs.monetary.energy_cap": 20},
+            {"techs.test_supply_elec.costs.monetary.om_prod": 1},
+            {"techs.test_supply_elec.constraints.energy_cap_max_systemwide": 15},
+            {"techs.test_transmission_elec.constraints.energy_cap_max": 3},
+            {"techs.test_supply_elec.essentials.name": "foo"},
+            {"run.ensure_feasibility": True},
+        ),
+    )
+    def test_updated(self, base_model, override):
+        model = self._build(override, base_model)
+
+        assert "model_data_updated_from_base" in model._timings
+        expected = build_model(override, self.SCENARIO)
+        assert model._model_data.equals(expected._model_data)
+        assert "energy_cap" not in model._model_data
+
+    @pytest.mark.parametrize(
+        "override",
+        (
+            {"techs.test_supply_elec.constraints.resource": 100},
+            {"techs.test_supply_elec.essentials.carrier_out": "heat"},
+            {"techs.test_supply_elec.exists": False},
+            {"nodes.b.techs.test_conversion": {}},
+            {"techs.test_demand_elec.constraints.resource": "file=demand_heat.csv"},
+            {"model.subset_time": ["2005-01-01 00:00", "2005-01-01 02:00"]},
+        ),
+    )
+    def test_rebuilt(self, base_model, override):
+        model = self._build(override, base_model)
+
+        assert "model_data_updated_from_base" not in model._timings
+        expected = build_model(override, self.SCENARIO)
+        assert model._model_data.equals(expected._model_data)
+
+    def test_updated_vars(self, base_model):
+        override = {
+            "techs.test_supply_elec.constraints.energy_cap_max": 8,
+            "techs.test_supply_elec.costs.monetary.energy_cap": 20,
+        }
+        model = self._build(override, None)
+        updater = ModelDataUpdater(model._model_run, base_model._model_run)
+
+        # Timeseries data is only reused if the model is built from the base
+        assert updater(base_model._model_data) is None
+
+        model = self._build(override, base_model)
+        updater = ModelDataUpdater(model._model_run, base_model._model_run)
+        updater(base_model._model_data)
+        assert sorted(updater.updated_vars) == ["cost_energy_cap", "energy_cap_max"]
+
+    def test_shared_data(self, base_model):
+        override = {"techs.test_supply_elec.constraints.energy_cap_max": 8}
+        model = self._build(override, base_model)
+        model_data = model._model_data
+        base_model_data = base_model._model_data
+
+        # Only the updated variables are copied from the base model data
+        assert not np.shares_memory(
+            model_data.energy_cap_max.values, base_model_data.energy_cap_max.values
+        )
+        assert np.shares_memory(
+            model_data.resource.values, base_model_data.resource.values
+        )
+
+    def test_run(self, base_model):
+        override = {"techs.test_supply_elec.costs.monetary.energy_cap": 20}
+        model = self._build(override, base_model)
+        model.run()
+        expected = build_model(override, self.SCENARIO)
+        expected.run()
+
+        assert model.results.objective_function_value == pytest.approx(
+            expected.results.objective_function_value
+        )
@@ -0,0 +1,128 @@
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+import pytest  # noqa: F401
+from pytest import approx
+
+import calliope
+from calliope.core.attrdict import AttrDict
+from calliope.preprocess.cache import get_fingerprint
+from calliope.test.common.util import build_test_model as build_model
+
+_TEST_MODEL_DIR = os.path.join(os.path.dirname(__file__), "common", "test_model")
+_SCENARIO = "simple_supply,two_hours,investment_costs"
+
+
+@pytest.fixture(scope="module")
+def model_dir():
+    # A copy of the test model, so that its timeseries files can be modified
+    with tempfile.TemporaryDirectory() as tempdir:
+        path = os.path.join(tempdir, "test_model")
+        shutil.copytree(_TEST_MODEL_DIR, path)
+        yield path
+
+
+def _fingerprint(model_dir, **kwargs):
+    model_file = os.path.join(model_dir, "model.yaml")
+    return get_fingerprint(AttrDict.from_yaml(model_file), model_file, **kwargs)
+
+
+class TestFingerprint:
+    def test_same_inputs(self, model_dir):
+        assert _fingerprint(model_dir, scenario=_SCENARIO) == _fingerprint(
+            model_dir, scenario=_SCENARIO
+        )
+
+    @pytest.mark.parametrize(
+        "kwargs",
+        (
+            {"scenario": "simple_supply,one_day,investment_costs"},
+            {"override_dict": {"run.ensure_feasibility": True}},
+            {"timeseries_dataframes": {"demand": pd.DataFrame({"a": [1.0, 2.0]})}},
+        ),
+    )
+    def test_different_inputs(self, model_dir, kwargs):
+        assert _fingerprint(model_dir, scenario=_SCENARIO) != _fingerprint(
+            model_dir, **{"scenario": _SCENARIO, **kwargs}
+        )
+
+    def test_timeseries_dataframes_contents(self, model_dir):
+        fingerprints = [
+            _fingerprint(
+                model_dir, timeseries_dataframes={"demand": pd.DataFrame({"a": data})}
+            )
+            for data in [[1.0, 2.0], [1.0, 3.0]]
+        ]
+        assert fingerprints[0] != fingerprints[1]
+
+    def test_cache_config_ignored(self, model_dir):
+        override = {"model.preprocessing_cache": {"path": "foo", "max_size": 1}}
+        assert _fingerprint(model_dir) == _fingerprint(
+            model_dir, override_dict=override
+        )
+
+    def test_timeseries_file_modified(self, model_dir):
+        fingerprint = _fingerprint(model_dir)
+        demand_file = os.path.join(model_dir, "timeseries_data", "demand_elec.csv")
+        stat = os.stat(demand_file)
+        os.utime(demand_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+        assert _fingerprint(model_dir) != fingerprint
+
+    def test_missing_timeseries_file(self, model_dir):
+        override = {"techs.test_demand_elec.constraints.resource": "file=foo.csv"}
+        assert _fingerprint(model_dir, override_dict=override) is None
+
+
+class TestModel:
+    def test_no_cache(self):
+        model = build_model({}, _SCENARIO)
+        assert "preprocessing_cache" not in model.inputs.attrs
+
+    def test_cache_hit(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            override = {"model.preprocessing_cache.path": tempdir}
+            m1 = build_model(override, _SCENARIO)
+            m2 = build_model(override, _SCENARIO)
+
+            assert len(os.listdir(tempdir)) == 1
+
+        assert m1.inputs.attrs["preprocessing_cache"] == "miss"
+        assert m2.inputs.attrs["preprocessing_cache"] == "hit"
+        assert m2._model_data.equals(m1._model_data)
+        assert m2.run_config == m1.run_config
+
+        m1.run()
+        m2.run()
+        assert m2.results.objective_function_value == approx(
+            m1.results.objective_function_value
+        )
+
+    def test_cache_miss_on_changed_inputs(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            override = {"model.preprocessing_cache.path": tempdir}
+            build_model(override, _SCENARIO)
+            model = build_model(
+                {**override, "techs.test_supply_elec.constraints.energy_cap_max": 8},
+                _SCENARIO,
+            )
+
+            assert model.inputs.attrs["preprocessing_cache"] == "miss"
+            assert len(os.listdir(tempdir)) == 2
+
+    @pytest.mark.parametrize(
+        "kwargs", ({"preprocessing_cache": False}, {"debug": True})
+    )
+    def test_cache_bypassed(self, kwargs):
+        with tempfile.TemporaryDirectory() as tempdir:
+            model = calliope.Model(
+                os.path.join(_TEST_MODEL_DIR, "model.yaml"),
+                scenario=_SCENARIO,
+                override_dict={"model.preprocessing_cache.path": tempdir},
+                **kwargs,
+            )
+
+            assert not os.listdir(tempdir)
+        assert "preprocessing_cache" not in model.inputs.attrs